@@ -5,31 +5,91 @@ managing the vector store, and performing efficient similarity searches. Utiliti
 and constants related to the ColBERT model configuration are also provided.
 
 Exports:
+- BM25Index: In-memory BM25 implementation of a BaseLexicalIndex, for hybrid retrieval.
+- CachedEmbeddingModel: Wrapper that caches the document embeddings of a model on disk.
 - CassandraDatabase: Implementation of a BaseDatabase using Cassandra for storage.
 - ColbertEmbeddingModel: Class for generating and managing token embeddings using the ColBERT model.
 - ColbertVectorStore: Implementation of a BaseVectorStore.
 - ColbertRetriever: Retriever class for executing ColBERT searches within a vector store.
+- QueryBatcher: asyncio micro-batcher that encodes concurrent queries in shared forward passes.
 - DEFAULT_COLBERT_MODEL: The default identifier for the ColBERT model.
 - DEFAULT_COLBERT_DIM: The default dimensionality for ColBERT model embeddings.
 - Chunk: Data class for representing a chunk of embedded text.
+
+The classes are imported lazily on first access, so that `import ragstack_colbert` stays cheap for
+processes that only need some of them. `import_timings()` reports the time spent in those imports.
 """
 
-from .cassandra_database import CassandraDatabase
-from .colbert_embedding_model import ColbertEmbeddingModel
-from .colbert_retriever import ColbertRetriever
-from .colbert_vector_store import ColbertVectorStore
+import importlib
+import time
+from typing import TYPE_CHECKING, Any, Dict, List
+
 from .constant import DEFAULT_COLBERT_DIM, DEFAULT_COLBERT_MODEL
 from .objects import Chunk, Embedding, Metadata, Vector
 
+if TYPE_CHECKING:
+    from .bm25_index import BM25Index
+    from .cached_embedding_model import CachedEmbeddingModel
+    from .cassandra_database import CassandraDatabase
+    from .colbert_embedding_model import ColbertEmbeddingModel
+    from .colbert_retriever import ColbertRetriever
+    from .colbert_vector_store import ColbertVectorStore
+    from .query_batcher import QueryBatcher
+
+# exports resolved on first access, so that importing the package does not import torch,
+# colbert or cassio until they are needed
+_LAZY_EXPORTS = {
+    "BM25Index": ".bm25_index",
+    "CachedEmbeddingModel": ".cached_embedding_model",
+    "CassandraDatabase": ".cassandra_database",
+    "ColbertEmbeddingModel": ".colbert_embedding_model",
+    "ColbertRetriever": ".colbert_retriever",
+    "ColbertVectorStore": ".colbert_vector_store",
+    "QueryBatcher": ".query_batcher",
+}
+
+_import_timings: Dict[str, float] = {}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name, __name__)
+    _import_timings.setdefault(module_name[1:], time.perf_counter() - start)
+
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
+
+def import_timings() -> Dict[str, float]:
+    """
+    Returns the time in seconds spent importing each lazily exported module, including the
+    third-party packages (torch, colbert, cassio) it pulled in first.
+    """
+    return dict(_import_timings)
+
+
 __all__ = [
+    "BM25Index",
+    "CachedEmbeddingModel",
     "CassandraDatabase",
     "ColbertEmbeddingModel",
     "ColbertRetriever",
     "ColbertVectorStore",
+    "QueryBatcher",
     "DEFAULT_COLBERT_DIM",
     "DEFAULT_COLBERT_MODEL",
     "Chunk",
     "Embedding",
     "Metadata",
     "Vector",
+    "import_timings",
 ]
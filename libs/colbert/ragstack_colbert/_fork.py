@@ -0,0 +1,31 @@
+"""
+Helpers for objects that must be reinitialized in a child process after a fork.
+"""
+
+import os
+import weakref
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def register_after_fork(obj: T, reinit: Callable[[T], None]) -> None:
+    """
+    Calls `reinit(obj)` in the child process after a fork, for as long as `obj` is alive. Used to
+    recreate the locks and thread pools, which must not be inherited from the parent process.
+
+    Parameters:
+        obj (T): The object to reinitialize. Only a weak reference to it is kept.
+        reinit (Callable[[T], None]): The function reinitializing the object.
+    """
+    if not hasattr(os, "register_at_fork"):
+        return
+
+    ref = weakref.ref(obj)
+
+    def _after_in_child() -> None:
+        instance: Optional[T] = ref()
+        if instance is not None:
+            reinit(instance)
+
+    os.register_at_fork(after_in_child=_after_in_child)
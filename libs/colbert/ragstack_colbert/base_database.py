@@ -6,7 +6,7 @@ embeddings, specifically designed to work with ColBERT or similar embedding mode
 from abc import ABC, abstractmethod
 from typing import List, Optional, Tuple
 
-from .objects import Chunk, Vector
+from .objects import Chunk, Metadata, Vector
 
 
 class BaseDatabase(ABC):
@@ -69,31 +69,53 @@ class BaseDatabase(ABC):
         """
 
     @abstractmethod
-    async def search_relevant_chunks(self, vector: Vector, n: int) -> List[Chunk]:
+    async def search_relevant_chunks(
+        self, vector: Vector, n: int, metadata_filter: Optional[Metadata] = None
+    ) -> List[Chunk]:
         """
         Retrieves 'n' ANN results for an embedded token vector.
 
+        Parameters:
+            vector (Vector): The embedded token vector to search with.
+            n (int): The number of ANN results to retrieve.
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all
+                                                  of these key/value pairs are returned.
+
         Returns:
             A list of Chunks with only `doc_id` and `chunk_id` set.
             Fewer than 'n' results may be returned.
         """
 
     @abstractmethod
-    async def get_chunk_embedding(self, doc_id: str, chunk_id: int) -> Chunk:
+    async def get_chunk_embedding(
+        self, doc_id: str, chunk_id: int, metadata_filter: Optional[Metadata] = None
+    ) -> Chunk:
         """
         Retrieve the embedding data for a chunk.
 
+        Parameters:
+            metadata_filter (Optional[Metadata]): If set and the chunk metadata does not contain all
+                                                  of these key/value pairs, the embedding is empty.
+
         Returns:
             A chunk with `doc_id`, `chunk_id`, and `embedding` set.
         """
 
     @abstractmethod
     async def get_chunk_data(
-        self, doc_id: str, chunk_id: int, include_embedding: Optional[bool]
-    ) -> Chunk:
+        self,
+        doc_id: str,
+        chunk_id: int,
+        include_embedding: Optional[bool],
+        metadata_filter: Optional[Metadata] = None,
+    ) -> Optional[Chunk]:
         """
         Retrieve the text and metadata for a chunk.
 
+        Parameters:
+            metadata_filter (Optional[Metadata]): If set and the chunk metadata does not contain all
+                                                  of these key/value pairs, None is returned.
+
         Returns:
             A chunk with `doc_id`, `chunk_id`, `text`, `metadata`, and optionally `embedding` set.
         """
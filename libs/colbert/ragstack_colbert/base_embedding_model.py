@@ -2,11 +2,16 @@
 This module defines an abstract base class (ABC) for generating token-based embeddings for text.
 """
 
+import asyncio
+import functools
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, TypeVar
 
 from .objects import Embedding
 
+T = TypeVar("T")
+
 
 class BaseEmbeddingModel(ABC):
     """
@@ -15,6 +20,9 @@ class BaseEmbeddingModel(ABC):
     This class defines the interface for models that generate embeddings for text chunks and queries.
     It's designed to be subclassed by specific token embedding implementations, such as ColBERT token
     embeddings. Subclasses must implement the `embed_chunks` and `embed_query` abstract methods.
+
+    The async methods run the synchronous ones on the executor returned by `_get_executor`, so that
+    the forward pass does not block the event loop.
     """
 
     @abstractmethod
@@ -50,3 +58,106 @@ class BaseEmbeddingModel(ABC):
         Returns:
             Embedding: A vector embedding representation of the query text
         """
+
+    def embed_queries(
+        self,
+        queries: List[str],
+        full_length_search: Optional[bool] = False,
+        query_maxlen: int = -1,
+    ) -> List[Embedding]:
+        """
+        Embeds several query texts. The default implementation calls `embed_query` for each query;
+        implementations that can encode a batch of queries in one pass should override it.
+
+        Parameters:
+            queries (List[str]): The query texts to encode.
+            full_length_search (Optional[bool]): Indicates whether to encode the queries for a full-length search.
+                                                  Defaults to False.
+            query_maxlen (int): The fixed length for the query token embeddings. If -1, uses a dynamically calculated value.
+
+        Returns:
+            List[Embedding]: The vector embeddings of the queries, in the order of the input list
+        """
+        return [
+            self.embed_query(
+                query=query,
+                full_length_search=full_length_search,
+                query_maxlen=query_maxlen,
+            )
+            for query in queries
+        ]
+
+    def _get_executor(self) -> Optional[Executor]:
+        """
+        Returns the executor used by the async methods. Defaults to None, the default executor of the
+        running event loop.
+        """
+        return None
+
+    async def _run_in_executor(self, func: Callable[..., T], **kwargs: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), functools.partial(func, **kwargs)
+        )
+
+    async def aembed_texts(self, texts: List[str]) -> List[Embedding]:
+        """
+        Embeds a list of texts into their corresponding vector embedding representations, without
+        blocking the event loop.
+
+        Parameters:
+            texts (List[str]): A list of string texts.
+
+        Returns:
+            List[Embedding]: A list of embeddings, in the order of the input list
+        """
+        return await self._run_in_executor(self.embed_texts, texts=texts)
+
+    async def aembed_query(
+        self,
+        query: str,
+        full_length_search: Optional[bool] = False,
+        query_maxlen: int = -1,
+    ) -> Embedding:
+        """
+        Embeds a single query text into its vector representation, without blocking the event loop.
+
+        Parameters:
+            query (str): The query text to encode.
+            full_length_search (Optional[bool]): Indicates whether to encode the query for a full-length search.
+                                                  Defaults to False.
+            query_maxlen (int): The fixed length for the query token embedding. If -1, uses a dynamically calculated value.
+
+        Returns:
+            Embedding: A vector embedding representation of the query text
+        """
+        return await self._run_in_executor(
+            self.embed_query,
+            query=query,
+            full_length_search=full_length_search,
+            query_maxlen=query_maxlen,
+        )
+
+    async def aembed_queries(
+        self,
+        queries: List[str],
+        full_length_search: Optional[bool] = False,
+        query_maxlen: int = -1,
+    ) -> List[Embedding]:
+        """
+        Embeds several query texts, without blocking the event loop.
+
+        Parameters:
+            queries (List[str]): The query texts to encode.
+            full_length_search (Optional[bool]): Indicates whether to encode the queries for a full-length search.
+                                                  Defaults to False.
+            query_maxlen (int): The fixed length for the query token embeddings. If -1, uses a dynamically calculated value.
+
+        Returns:
+            List[Embedding]: The vector embeddings of the queries, in the order of the input list
+        """
+        return await self._run_in_executor(
+            self.embed_queries,
+            queries=queries,
+            full_length_search=full_length_search,
+            query_maxlen=query_maxlen,
+        )
@@ -0,0 +1,63 @@
+"""
+This module defines the abstract base class for a lexical (keyword) index over text chunks, used
+alongside token ANN search to build the ColBERT rerank pool.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+from .objects import Chunk
+
+
+class BaseLexicalIndex(ABC):
+    """
+    Abstract base class (ABC) for a lexical index of text chunks, such as a BM25 inverted index.
+
+    A lexical index is maintained alongside the database by the vector store, and is searched by
+    the retriever with the raw query text. Its results are merged into (or restrict) the set of
+    candidate chunks that are reranked with ColBERT max-similarity.
+    """
+
+    @abstractmethod
+    def add_chunks(self, chunks: List[Chunk]) -> None:
+        """
+        Indexes the text of a list of chunks. Chunks already in the index are replaced.
+
+        Parameters:
+            chunks (List[Chunk]): A list of `Chunk` instances with `text` set.
+        """
+
+    @abstractmethod
+    def delete_chunks(self, doc_ids: List[str]) -> None:
+        """
+        Removes all the chunks of the given documents from the index.
+
+        Parameters:
+            doc_ids (List[str]): A list of document identifiers.
+        """
+
+    @abstractmethod
+    def search(self, query_text: str, k: int) -> List[Tuple[Chunk, float]]:
+        """
+        Retrieves the 'k' chunks that best match the query text lexically.
+
+        Returns:
+            A list of (Chunk, score) tuples, best first. The Chunks only have `doc_id` and
+            `chunk_id` set. Fewer than 'k' results may be returned.
+        """
+
+    async def asearch(self, query_text: str, k: int) -> List[Tuple[Chunk, float]]:
+        """
+        Retrieves the 'k' chunks that best match the query text lexically.
+
+        The default implementation runs `search` in the default executor, so that it overlaps
+        with database I/O issued from the event loop.
+
+        Returns:
+            A list of (Chunk, score) tuples, best first. The Chunks only have `doc_id` and
+            `chunk_id` set. Fewer than 'k' results may be returned.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.search, query_text, k
+        )
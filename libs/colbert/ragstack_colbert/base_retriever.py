@@ -6,7 +6,7 @@ embeddings, specifically designed to work with ColBERT or similar embedding mode
 from abc import ABC, abstractmethod
 from typing import Any, List, Optional, Tuple
 
-from .objects import Chunk, Embedding
+from .objects import Chunk, Embedding, Metadata
 
 
 class BaseRetriever(ABC):
@@ -22,6 +22,7 @@ class BaseRetriever(ABC):
         query_embedding: Embedding,
         k: Optional[int] = None,
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
         **kwargs: Any
     ) -> List[Tuple[Chunk, float]]:
         """
@@ -33,6 +34,8 @@ class BaseRetriever(ABC):
             k (Optional[int]): The number of top results to retrieve.
             include_embedding (Optional[bool]): Optional (default False) flag to include the
                                                 embedding vectors in the returned chunks
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all of
+                                                  these key/value pairs are returned.
             **kwargs (Any): Additional parameters that implementations might require for customized
                             retrieval operations.
 
@@ -48,6 +51,7 @@ class BaseRetriever(ABC):
         query_embedding: Embedding,
         k: Optional[int] = None,
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
         **kwargs: Any
     ) -> List[Tuple[Chunk, float]]:
         """
@@ -59,6 +63,8 @@ class BaseRetriever(ABC):
             k (Optional[int]): The number of top results to retrieve.
             include_embedding (Optional[bool]): Optional (default False) flag to include the
                                                 embedding vectors in the returned chunks
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all of
+                                                  these key/value pairs are returned.
             **kwargs (Any): Additional parameters that implementations might require for customized
                             retrieval operations.
 
@@ -75,6 +81,7 @@ class BaseRetriever(ABC):
         k: Optional[int] = None,
         query_maxlen: Optional[int] = None,
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
         **kwargs: Any
     ) -> List[Tuple[Chunk, float]]:
         """
@@ -88,6 +95,8 @@ class BaseRetriever(ABC):
                                           maxlen will be dynamically generated.
             include_embedding (Optional[bool]): Optional (default False) flag to include the
                                                 embedding vectors in the returned chunks
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all of
+                                                  these key/value pairs are returned.
             **kwargs (Any): Additional parameters that implementations might require for customized
                             retrieval operations.
 
@@ -104,6 +113,7 @@ class BaseRetriever(ABC):
         k: Optional[int] = None,
         query_maxlen: Optional[int] = None,
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
         **kwargs: Any
     ) -> List[Tuple[Chunk, float]]:
         """
@@ -117,6 +127,8 @@ class BaseRetriever(ABC):
                                           maxlen will be dynamically generated.
             include_embedding (Optional[bool]): Optional (default False) flag to include the
                                                 embedding vectors in the returned chunks
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all of
+                                                  these key/value pairs are returned.
             **kwargs (Any): Additional parameters that implementations might require for customized
                             retrieval operations.
 
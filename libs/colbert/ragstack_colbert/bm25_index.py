@@ -0,0 +1,163 @@
+"""
+This module provides an in-memory BM25 inverted index implementing BaseLexicalIndex. The index can
+be saved to and loaded from a local JSON file.
+"""
+
+import heapq
+import json
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from .base_lexical_index import BaseLexicalIndex
+from .objects import Chunk
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase word tokens. Underscores are kept inside tokens, so identifiers
+    like `nebula_voyager` are indexed as a single term.
+    """
+    return _TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class BM25Index(BaseLexicalIndex):
+    """
+    An in-memory BM25 index over text chunks.
+
+    Attributes:
+        k1 (float): BM25 term frequency saturation parameter.
+        b (float): BM25 length normalization parameter.
+    """
+
+    def __init__(self, k1: Optional[float] = 1.2, b: Optional[float] = 0.75):
+        """
+        Initializes an empty index.
+
+        Parameters:
+            k1 (Optional[float]): BM25 term frequency saturation parameter. Defaults to 1.2.
+            b (Optional[float]): BM25 length normalization parameter. Defaults to 0.75.
+        """
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self._terms: Dict[Tuple[str, int], Dict[str, int]] = {}
+        self._lengths: Dict[Tuple[str, int], int] = {}
+        self._doc_chunks: Dict[str, Set[int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _remove(self, key: Tuple[str, int]) -> None:
+        for term in self._terms.pop(key, {}):
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if len(postings) == 0:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(key, 0)
+
+    def _add(self, key: Tuple[str, int], term_counts: Dict[str, int]) -> None:
+        self._remove(key)
+        self._terms[key] = term_counts
+        for term, count in term_counts.items():
+            self._postings.setdefault(term, {})[key] = count
+        length = sum(term_counts.values())
+        self._lengths[key] = length
+        self._total_length += length
+        self._doc_chunks.setdefault(key[0], set()).add(key[1])
+
+    def add_chunks(self, chunks: List[Chunk]) -> None:
+        """
+        Indexes the text of a list of chunks. Chunks already in the index are replaced.
+
+        Parameters:
+            chunks (List[Chunk]): A list of `Chunk` instances with `text` set.
+        """
+        term_counts = [
+            ((chunk.doc_id, chunk.chunk_id), dict(Counter(tokenize(chunk.text))))
+            for chunk in chunks
+        ]
+        with self._lock:
+            for key, counts in term_counts:
+                self._add(key, counts)
+
+    def delete_chunks(self, doc_ids: List[str]) -> None:
+        """
+        Removes all the chunks of the given documents from the index.
+
+        Parameters:
+            doc_ids (List[str]): A list of document identifiers.
+        """
+        with self._lock:
+            for doc_id in doc_ids:
+                for chunk_id in self._doc_chunks.pop(doc_id, set()):
+                    self._remove((doc_id, chunk_id))
+
+    def search(self, query_text: str, k: int) -> List[Tuple[Chunk, float]]:
+        """
+        Retrieves the 'k' chunks with the highest BM25 score for the query text.
+
+        Returns:
+            A list of (Chunk, score) tuples, best first. The Chunks only have `doc_id` and
+            `chunk_id` set. Chunks that share no term with the query are not returned.
+        """
+        terms = set(tokenize(query_text))
+
+        with self._lock:
+            num_chunks = len(self._lengths)
+            if num_chunks == 0:
+                return []
+            avg_length = self._total_length / num_chunks
+
+            scores: Dict[Tuple[str, int], float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(
+                    1 + (num_chunks - len(postings) + 0.5) / (len(postings) + 0.5)
+                )
+                for key, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[key] / avg_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            (Chunk(doc_id=doc_id, chunk_id=chunk_id), score)
+            for (doc_id, chunk_id), score in top
+        ]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to a local JSON file.
+        """
+        with self._lock:
+            data = {
+                "k1": self.k1,
+                "b": self.b,
+                "chunks": [
+                    [doc_id, chunk_id, terms]
+                    for (doc_id, chunk_id), terms in self._terms.items()
+                ],
+            }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """
+        Reads an index previously written with `save`.
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        index = cls(k1=data["k1"], b=data["b"])
+        for doc_id, chunk_id, terms in data["chunks"]:
+            index._add((doc_id, chunk_id), terms)
+        return index
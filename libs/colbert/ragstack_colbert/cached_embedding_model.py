@@ -0,0 +1,246 @@
+"""
+This module provides a persistent, content-addressed cache for document embeddings.
+
+`CachedEmbeddingModel` wraps a `BaseEmbeddingModel` and stores the token embeddings of every text it
+embeds in a SQLite file, keyed by the SHA-256 of the model namespace (for ColBERT: the checkpoint, the
+`doc_maxlen` and the encoder backend) and the text. Rebuilding an index from the same corpus then only
+encodes the texts that changed. Embeddings are stored as float16, which halves the size of the cache.
+The embeddings encoded by the wrapped model are rounded the same way before they are returned, so that a
+text has the same embedding whether it was found in the cache or not.
+
+Query embeddings are not cached.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .base_embedding_model import BaseEmbeddingModel
+from .objects import Embedding
+
+# SQLite limits the number of host parameters of a statement (999 before 3.32)
+_LOOKUP_BATCH_SIZE = 500
+
+
+def _encode(embedding: Embedding) -> np.ndarray:
+    """The float16 matrix of an embedding, as stored in the cache."""
+    if hasattr(embedding, "cpu"):
+        # torch tensors, possibly on a GPU
+        embedding = embedding.cpu()
+    return np.asarray(embedding, dtype=np.float16)
+
+
+def _decode(matrix: np.ndarray) -> Embedding:
+    """The embedding of a stored float16 matrix."""
+    return matrix.astype(np.float32).tolist()
+
+DEFAULT_CACHE_MAX_BYTES = 10 * 2**30
+
+
+class CachedEmbeddingModel(BaseEmbeddingModel):
+    """
+    A `BaseEmbeddingModel` that caches the document embeddings of another model on disk, with
+    least-recently-used eviction once the cache exceeds `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        embedding_model: BaseEmbeddingModel,
+        path: str,
+        namespace: Optional[str] = None,
+        max_bytes: Optional[int] = DEFAULT_CACHE_MAX_BYTES,
+    ):
+        """
+        Initializes the cache, creating the SQLite file if needed.
+
+        Parameters:
+            embedding_model (BaseEmbeddingModel): The model that embeds the texts missing from the cache.
+            path (str): The path of the SQLite cache file.
+            namespace (Optional[str]): Identifies the model configuration in the cache keys, so that one file
+                                       can hold the embeddings of several models. Defaults to the
+                                       `cache_namespace` of the model.
+            max_bytes (Optional[int]): The maximum total size of the stored embeddings. The least recently
+                                       used embeddings are evicted beyond it. Defaults to 10 GiB; None
+                                       disables eviction.
+        """
+        if namespace is None:
+            namespace = getattr(embedding_model, "cache_namespace", None)
+            if namespace is None:
+                raise ValueError(
+                    f"{type(embedding_model).__name__} has no `cache_namespace`, a `namespace` must be given."
+                )
+
+        self._embedding_model = embedding_model
+        self._namespace = namespace
+        self._max_bytes = max_bytes
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    num_tokens INTEGER NOT NULL,
+                    dim INTEGER NOT NULL,
+                    data BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        The number of cache hits, misses and evicted embeddings since the cache was opened.
+        """
+        return {"hits": self._hits, "misses": self._misses, "evictions": self._evictions}
+
+    def close(self) -> None:
+        """
+        Closes the cache file.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self._namespace}\0{text}".encode("utf-8")).digest()
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, Embedding]:
+        found: Dict[bytes, Embedding] = {}
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_BATCH_SIZE):
+                batch = keys[i : i + _LOOKUP_BATCH_SIZE]
+                rows = self._connection.execute(
+                    "SELECT key, num_tokens, dim, data FROM embeddings "
+                    f"WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for key, num_tokens, dim, data in rows:
+                    matrix = np.frombuffer(data, dtype=np.float16).reshape(num_tokens, dim)
+                    found[key] = _decode(matrix)
+
+            if found:
+                with self._connection:
+                    self._connection.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+        return found
+
+    def _store(self, matrices: Dict[bytes, np.ndarray]) -> None:
+        now = time.time()
+        rows = [
+            (key, matrix.shape[0], matrix.shape[1], matrix.tobytes(), now)
+            for key, matrix in matrices.items()
+        ]
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, num_tokens, dim, data, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            if self._max_bytes is not None:
+                self._evict()
+
+    def _evict(self) -> None:
+        (total_bytes,) = self._connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM embeddings"
+        ).fetchone()
+        if total_bytes <= self._max_bytes:
+            return
+
+        evicted = []
+        rows = self._connection.execute(
+            "SELECT key, LENGTH(data) FROM embeddings ORDER BY last_used, rowid"
+        )
+        for key, size in rows:
+            if total_bytes <= self._max_bytes:
+                break
+            evicted.append((key,))
+            total_bytes -= size
+
+        self._connection.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+        self._evictions += len(evicted)
+        logging.debug(f"evicted {len(evicted)} embeddings from the embedding cache")
+
+    # implements the Abstract Class Method
+    def embed_texts(self, texts: List[str]) -> List[Embedding]:
+        """
+        Embeds a list of texts, reading the embeddings of the texts already seen from the cache, and
+        embedding the others in a single call to the wrapped model.
+
+        Parameters:
+            texts (List[str]): A list of string texts.
+
+        Returns:
+            List[Embedding]: A list of embeddings, in the order of the input list, rounded to float16
+                             precision whether they were cached or not.
+        """
+        keys = [self._key(text) for text in texts]
+        embeddings = self._lookup(list(set(keys)))
+
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in embeddings:
+                missing[key] = text
+
+        self._hits += len(texts) - sum(1 for key in keys if key in missing)
+        self._misses += len(missing)
+
+        if missing:
+            new_embeddings = self._embedding_model.embed_texts(texts=list(missing.values()))
+            matrices = {key: _encode(embedding) for key, embedding in zip(missing, new_embeddings)}
+            self._store(matrices)
+            # returned like the cache hits: rounded to float16, as lists
+            embeddings.update((key, _decode(matrix)) for key, matrix in matrices.items())
+
+        return [embeddings[key] for key in keys]
+
+    # implements the Abstract Class Method
+    def embed_query(
+        self,
+        query: str,
+        full_length_search: Optional[bool] = False,
+        query_maxlen: int = -1,
+    ) -> Embedding:
+        """
+        Embeds a single query text with the wrapped model. Queries are not cached.
+        """
+        return self._embedding_model.embed_query(
+            query=query, full_length_search=full_length_search, query_maxlen=query_maxlen
+        )
+
+    def embed_queries(
+        self,
+        queries: List[str],
+        full_length_search: Optional[bool] = False,
+        query_maxlen: int = -1,
+    ) -> List[Embedding]:
+        """
+        Embeds several query texts with the wrapped model. Queries are not cached.
+        """
+        return self._embedding_model.embed_queries(
+            queries=queries, full_length_search=full_length_search, query_maxlen=query_maxlen
+        )
+
+    def _get_executor(self) -> Optional[Executor]:
+        return self._embedding_model._get_executor()
@@ -16,7 +16,7 @@ from cassio.table.tables import ClusteredMetadataVectorCassandraTable
 
 from .base_database import BaseDatabase
 from .constant import DEFAULT_COLBERT_DIM
-from .objects import Chunk, Vector
+from .objects import Chunk, Metadata, Vector
 
 
 class CassandraDatabase(BaseDatabase):
@@ -26,6 +26,11 @@ class CassandraDatabase(BaseDatabase):
     a Cassandra database, specifically designed for handling vector embeddings generated by ColBERT.
 
     The table schema and custom index for ANN queries are automatically created if they do not exist.
+
+    Chunk metadata is written both on the text row and on every embedding row of a chunk, so that
+    metadata filters can be pushed down into the ANN queries as predicates on the indexed metadata.
+    Embedding rows written by earlier versions carry no metadata, and so never match a filtered
+    search; re-add those documents to make them filterable.
     """
 
     _table: ClusteredMetadataVectorCassandraTable
@@ -145,6 +150,7 @@ class CassandraDatabase(BaseDatabase):
                         partition_id=doc_id,
                         row_id=(chunk_id, embedding_id),
                         vector=vector,
+                        metadata=chunk.metadata,
                     )
                 except Exception as exp:
                     self._log_insert_error(doc_id=doc_id, chunk_id=chunk_id, embedding_id=-1, exp=exp)
@@ -181,7 +187,10 @@ class CassandraDatabase(BaseDatabase):
                     )
                 else:
                     await self._table.aput(
-                        partition_id=doc_id, row_id=row_id, vector=vector
+                        partition_id=doc_id,
+                        row_id=row_id,
+                        vector=vector,
+                        metadata=metadata,
                     )
             except Exception as e:
                 exp = e
@@ -225,6 +234,7 @@ class CassandraDatabase(BaseDatabase):
                     doc_id=doc_id,
                     chunk_id=chunk_id,
                     embedding_id=index,
+                    metadata=metadata,
                     vector=vector,
                 ))
                 tasks_per_chunk[(doc_id, chunk_id)] += 1
@@ -329,10 +339,19 @@ class CassandraDatabase(BaseDatabase):
 
         return success
 
-    async def search_relevant_chunks(self, vector: Vector, n: int) -> List[Chunk]:
+    async def search_relevant_chunks(
+        self, vector: Vector, n: int, metadata_filter: Optional[Metadata] = None
+    ) -> List[Chunk]:
         """
         Retrieves 'n' ANN results for an embedded token vector.
 
+        Parameters:
+            vector (Vector): The embedded token vector to search with.
+            n (int): The number of ANN results to retrieve.
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all
+                                                  of these key/value pairs are returned. The filter
+                                                  is applied by the database as part of the ANN query.
+
         Returns:
             A list of Chunks with only `doc_id` and `chunk_id` set.
             Fewer than 'n' results may be returned.
@@ -341,7 +360,12 @@ class CassandraDatabase(BaseDatabase):
         chunks: Set[Chunk] = set()
 
         # TODO: only return partition_id and row_id after cassio supports this
-        rows = await self._table.aann_search(vector=vector, n=n)
+        if metadata_filter:
+            rows = await self._table.aann_search(
+                vector=vector, n=n, metadata=metadata_filter
+            )
+        else:
+            rows = await self._table.aann_search(vector=vector, n=n)
         for row in rows:
             chunks.add(
                 Chunk(
@@ -351,33 +375,59 @@ class CassandraDatabase(BaseDatabase):
             )
         return list(chunks)
 
-    async def get_chunk_embedding(self, doc_id: str, chunk_id: int) -> Chunk:
+    async def get_chunk_embedding(
+        self, doc_id: str, chunk_id: int, metadata_filter: Optional[Metadata] = None
+    ) -> Chunk:
         """
         Retrieve the embedding data for a chunk.
 
+        Parameters:
+            metadata_filter (Optional[Metadata]): If set and the chunk metadata does not contain all
+                                                  of these key/value pairs, the embedding is empty.
+
         Returns:
             A chunk with `doc_id`, `chunk_id`, and `embedding` set.
         """
 
         row_id = (chunk_id, Predicate(PredicateOperator.GT, -1))
-        rows = await self._table.aget_partition(partition_id=doc_id, row_id=row_id)
+        if metadata_filter:
+            rows = await self._table.aget_partition(
+                partition_id=doc_id, row_id=row_id, metadata=metadata_filter
+            )
+        else:
+            rows = await self._table.aget_partition(partition_id=doc_id, row_id=row_id)
 
         embedding = [row["vector"] for row in rows]
 
         return Chunk(doc_id=doc_id, chunk_id=chunk_id, embedding=embedding)
 
     async def get_chunk_data(
-        self, doc_id: str, chunk_id: int, include_embedding: Optional[bool] = False
-    ) -> Chunk:
+        self,
+        doc_id: str,
+        chunk_id: int,
+        include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
+    ) -> Optional[Chunk]:
         """
         Retrieve the text and metadata for a chunk.
 
+        Parameters:
+            metadata_filter (Optional[Metadata]): If set and the chunk metadata does not contain all
+                                                  of these key/value pairs, None is returned.
+
         Returns:
             A chunk with `doc_id`, `chunk_id`, `text`, and `metadata` set.
         """
 
         row_id = (chunk_id, Predicate(PredicateOperator.EQ, -1))
-        row = await self._table.aget(partition_id=doc_id, row_id=row_id)
+        if metadata_filter:
+            row = await self._table.aget(
+                partition_id=doc_id, row_id=row_id, metadata=metadata_filter
+            )
+            if row is None:
+                return None
+        else:
+            row = await self._table.aget(partition_id=doc_id, row_id=row_id)
 
         if include_embedding is True:
             embedded_chunk = await self.get_chunk_embedding(
@@ -7,15 +7,20 @@ The core component, ColbertEmbeddingModel, leverages pre-trained ColBERT models
 for high-relevancy retrieval tasks, with support for both CPU and GPU computing environments.
 """
 
+import importlib
 import logging
-from typing import List, Optional
-
-from colbert.infra import ColBERTConfig
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
+from ._fork import register_after_fork
 from .base_embedding_model import BaseEmbeddingModel
 from .constant import DEFAULT_COLBERT_MODEL
 from .objects import Chunk, Embedding
-from .text_encoder import TextEncoder
+
+if TYPE_CHECKING:
+    from .text_encoder import TextEncoder
 
 
 class ColbertEmbeddingModel(BaseEmbeddingModel):
@@ -25,10 +30,20 @@ class ColbertEmbeddingModel(BaseEmbeddingModel):
     retrieval tasks. It leverages a pre-trained ColBERT model and supports distributed computing environments.
 
     The class supports both GPU and CPU operations, with GPU usage recommended for performance efficiency.
+
+    The checkpoint is loaded on first use (or by `warmup()`) rather than on construction, unless `lazy_load`
+    is False. torch and colbert are only imported at that point.
+
+    `embed_query` is thread-safe, so a single loaded model can serve queries from a thread pool. The async
+    methods run on a dedicated executor of `async_workers` threads; torch releases the GIL during the forward
+    pass, so the event loop keeps running while a batch is encoded.
     """
 
     _query_maxlen: int
     _chunk_batch_size: int
+    _text_encoder: Optional["TextEncoder"]
+    _timings: Dict[str, float]
+    _executor: Optional[ThreadPoolExecutor]
 
     def __init__(
         self,
@@ -40,6 +55,13 @@ class ColbertEmbeddingModel(BaseEmbeddingModel):
         query_maxlen: Optional[int] = None,
         verbose: Optional[int] = 3,  # 3 is the default on ColBERT checkpoint
         chunk_batch_size: Optional[int] = 640,
+        encoder_backend: Optional[str] = "torch",
+        onnx_model_dir: Optional[str] = None,
+        lazy_load: Optional[bool] = True,
+        async_workers: Optional[int] = 2,
+        shared_weights: Optional[bool] = False,
+        shared_weights_dir: Optional[str] = None,
+        weights_dtype: Optional[str] = "float32",
         **kwargs,
     ):
         """
@@ -55,6 +77,25 @@ class ColbertEmbeddingModel(BaseEmbeddingModel):
             query_maxlen (Optional[int]): Maximum length of query tokens for embedding.
             verbose (Optional[int]): Verbosity level for logging.
             chunk_batch_size (Optional[int]): The number of chunks to batch during embedding. Defaults to 640.
+            encoder_backend (Optional[str]): The inference backend: "torch" (the default), "onnx" to run an ONNX
+                                             Runtime export of the checkpoint on CPU, or "onnx_int8" to also
+                                             apply int8 dynamic quantization. The ONNX backends need the `onnx` extra.
+            onnx_model_dir (Optional[str]): Where the exported ONNX models are cached.
+                                            Defaults to `~/.cache/ragstack_colbert/onnx`.
+            lazy_load (Optional[bool]): If True (the default), the checkpoint is loaded on first use instead of
+                                        during construction.
+            async_workers (Optional[int]): The number of threads of the executor used by the async methods.
+                                           Defaults to 2.
+            shared_weights (Optional[bool]): If True, the checkpoint weights are memory-mapped read-only from a
+                                             file written by the first process that loads them, so that all the
+                                             worker processes of a host share one copy. Only applies on CPU.
+            shared_weights_dir (Optional[str]): Where the shared weights files are written.
+                                                Defaults to `~/.cache/ragstack_colbert/weights`.
+            weights_dtype (Optional[str]): The dtype of the checkpoint weights on CPU: "float32" (the default),
+                                           "bfloat16" or "float16", which halve the memory of the model. Both
+                                           document and query embeddings are still returned as float32. Use
+                                           `ragstack_colbert.weights_dtype.validate_weights_dtype` to check the
+                                           accuracy on your data. Only supported by the torch backend.
             **kwargs: Additional keyword arguments for future extensions.
         """
 
@@ -63,15 +104,120 @@ class ColbertEmbeddingModel(BaseEmbeddingModel):
 
         self._query_maxlen = query_maxlen
         self._chunk_batch_size = chunk_batch_size
+        self._config_kwargs = {
+            "doc_maxlen": doc_maxlen,
+            "nbits": nbits,
+            "kmeans_niters": kmeans_niters,
+            "nranks": nranks,
+            "checkpoint": checkpoint,
+        }
+        self._encoder_kwargs = {
+            "verbose": verbose,
+            "backend": encoder_backend,
+            "onnx_model_dir": onnx_model_dir,
+            "shared_weights": shared_weights,
+            "shared_weights_dir": shared_weights_dir,
+            "weights_dtype": weights_dtype,
+        }
+        self._text_encoder = None
+        self._load_lock = threading.Lock()
+        self._timings = {}
+        self._async_workers = async_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        register_after_fork(self, ColbertEmbeddingModel._reinit_after_fork)
+
+        if not lazy_load:
+            self._load()
+
+    def _reinit_after_fork(self) -> None:
+        # the threads of the executor are not carried over to the child process, and the locks
+        # may have been held by one of them at the time of the fork
+        self._load_lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._executor = None
+
+    def _load(self) -> "TextEncoder":
+        with self._load_lock:
+            if self._text_encoder is not None:
+                return self._text_encoder
+
+            start = time.perf_counter()
+            colbert_infra = importlib.import_module("colbert.infra")
+            text_encoder = importlib.import_module(".text_encoder", __package__)
+            loaded = time.perf_counter()
+            self._timings["import_seconds"] = loaded - start
+
+            colbert_config = colbert_infra.ColBERTConfig(**self._config_kwargs)
+            self._text_encoder = text_encoder.TextEncoder(
+                config=colbert_config, **self._encoder_kwargs
+            )
+            self._timings["load_seconds"] = time.perf_counter() - loaded
+
+            logging.info(
+                f"loaded ColBERT checkpoint {self._config_kwargs['checkpoint']} in "
+                f"{self._timings['load_seconds']:.2f}s "
+                f"(imports took {self._timings['import_seconds']:.2f}s)"
+            )
+            return self._text_encoder
+
+    @property
+    def _encoder(self) -> "TextEncoder":
+        if self._text_encoder is None:
+            return self._load()
+        return self._text_encoder
 
-        colbert_config = ColBERTConfig(
-            doc_maxlen=doc_maxlen,
-            nbits=nbits,
-            kmeans_niters=kmeans_niters,
-            nranks=nranks,
-            checkpoint=checkpoint,
+    @property
+    def is_loaded(self) -> bool:
+        return self._text_encoder is not None
+
+    @property
+    def cache_namespace(self) -> str:
+        """
+        Identifies the settings that determine the document embeddings, for `CachedEmbeddingModel`.
+        """
+        return (
+            f"{self._config_kwargs['checkpoint']}"
+            f"|doc_maxlen={self._config_kwargs['doc_maxlen']}"
+            f"|backend={self._encoder_kwargs['backend']}"
+            f"|weights_dtype={self._encoder_kwargs['weights_dtype']}"
         )
-        self._encoder = TextEncoder(config=colbert_config, verbose=verbose)
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._async_workers, thread_name_prefix="colbert-embedding"
+                )
+            return self._executor
+
+    def close(self) -> None:
+        """
+        Shuts down the executor used by the async methods.
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def warmup(self) -> Dict[str, Any]:
+        """
+        Loads the checkpoint if needed, then embeds a dummy query and a dummy text so that lazily
+        initialized kernels and allocations are ready before the first real request.
+
+        Returns:
+            Dict[str, Any]: The timings in seconds: `import_seconds` and `load_seconds` (from the
+                            first load, whether it happened here or earlier) and `warmup_seconds`.
+        """
+        self._load()
+
+        start = time.perf_counter()
+        self.embed_query(query="warmup query")
+        self.embed_texts(texts=["warmup text"])
+        self._timings["warmup_seconds"] = time.perf_counter() - start
+
+        logging.info(f"ColBERT embedding model warmed up: {self._timings}")
+        return dict(self._timings)
 
     # implements the Abstract Class Method
     def embed_texts(self, texts: List[str]) -> List[Embedding]:
@@ -128,3 +274,31 @@ class ColbertEmbeddingModel(BaseEmbeddingModel):
         return self._encoder.encode_query(
             text=query, query_maxlen=query_maxlen, full_length_search=full_length_search
         )
+
+    def embed_queries(
+        self,
+        queries: List[str],
+        full_length_search: Optional[bool] = False,
+        query_maxlen: Optional[int] = None,
+    ) -> List[Embedding]:
+        """
+        Embeds several query texts, encoding the queries of the same token length in a single forward pass.
+
+        Parameters:
+            queries (List[str]): The query strings to encode.
+            full_length_search (Optional[bool]): Indicates whether to encode the queries for a full-length search.
+                                                  Defaults to False.
+            query_maxlen (int): The fixed length for the query token embeddings. If None, uses a dynamically
+                                calculated value for each query.
+
+        Returns:
+            List[Embedding]: The vector embeddings of the queries, in the order of the input list
+        """
+
+        if query_maxlen is None:
+            query_maxlen = -1
+
+        query_maxlen = max(query_maxlen, self._query_maxlen)
+        return self._encoder.encode_queries(
+            texts=queries, query_maxlen=query_maxlen, full_length_search=full_length_search
+        )
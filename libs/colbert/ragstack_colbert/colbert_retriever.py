@@ -17,8 +17,11 @@ import torch
 
 from .base_database import BaseDatabase
 from .base_embedding_model import BaseEmbeddingModel
+from .base_lexical_index import BaseLexicalIndex
 from .base_retriever import BaseRetriever
-from .objects import Chunk, Embedding, Vector
+from .objects import Chunk, Embedding, Metadata, Vector
+from .query_batcher import QueryBatcher
+from .scoring import SCORING_PRECISIONS, MaxSimScorer, select_precision
 
 
 def all_gpus_support_fp16(is_cuda: Optional[bool] = False):
@@ -116,6 +119,9 @@ class ColbertRetriever(BaseRetriever):
         is_cuda (bool): A flag indicating whether to use CUDA (GPU) for computation.
         is_fp16 (bool): A flag indicating whether to half-precision floating point operations on CUDA (GPU).
                         Has no effect on CPU computation.
+        scoring_precision (str): The precision used to score candidate chunks. See `ragstack_colbert.scoring`.
+        lexical_index (Optional[BaseLexicalIndex]): An optional lexical index searched with the query text.
+        query_batcher (Optional[QueryBatcher]): An optional batcher that `atext_search` uses to encode queries.
 
     Note:
         The class is designed to work with a GPU for optimal performance but will automatically fall back to CPU
@@ -126,6 +132,11 @@ class ColbertRetriever(BaseRetriever):
     _embedding_model: BaseEmbeddingModel
     _is_cuda: bool
     _is_fp16: bool
+    _scorer: MaxSimScorer
+    _lexical_index: Optional[BaseLexicalIndex]
+    _lexical_mode: str
+    _lexical_k: int
+    _query_batcher: Optional[QueryBatcher]
 
     class Config:
         arbitrary_types_allowed = True
@@ -134,6 +145,14 @@ class ColbertRetriever(BaseRetriever):
         self,
         database: BaseDatabase,
         embedding_model: BaseEmbeddingModel,
+        scoring_precision: Optional[str] = None,
+        scoring_tolerance: Optional[float] = 0.01,
+        scoring_threads: Optional[int] = None,
+        scoring_shards: Optional[int] = 1,
+        lexical_index: Optional[BaseLexicalIndex] = None,
+        lexical_mode: Optional[str] = "union",
+        lexical_k: Optional[int] = 50,
+        query_batcher: Optional[QueryBatcher] = None,
     ):
         """
         Initializes the retriever with a specific vector store and Colbert embeddings model.
@@ -142,21 +161,80 @@ class ColbertRetriever(BaseRetriever):
             database (BaseDatabase): The data store to be used for retrieving embeddings.
             embedding_model (BaseEmbeddingModel): The ColBERT embeddings model to be used for encoding
                                                          queries.
+            scoring_precision (Optional[str]): The precision used to score candidate chunks: one of
+                                               "float32", "bfloat16", "float16", "int8", or "auto" to
+                                               run a short microbenchmark at startup and pick the fastest
+                                               precision within `scoring_tolerance` of float32. Defaults to
+                                               float16 on CUDA devices that support it, and float32 otherwise.
+            scoring_tolerance (Optional[float]): The maximum relative score error versus float32 accepted
+                                                 when `scoring_precision` is "auto". Defaults to 0.01.
+            scoring_threads (Optional[int]): If set, calls `torch.set_num_threads` with this value. Note
+                                             that this setting is process-wide.
+            scoring_shards (Optional[int]): Number of shards the candidate set is split into for scoring
+                                            on concurrent threads. Defaults to 1.
+            lexical_index (Optional[BaseLexicalIndex]): An optional lexical index, searched with the query text
+                                                        by `text_search`/`atext_search`.
+            lexical_mode (Optional[str]): How lexical results are combined with the token ANN candidates:
+                                          "union" (the default) runs both searches concurrently and reranks the
+                                          union of their candidates; "restrict" reranks only the lexical
+                                          candidates, skipping token ANN unless no lexical match is within
+                                          the metadata filter.
+            lexical_k (Optional[int]): The number of lexical candidates added to the rerank pool. Defaults to 50.
+            query_batcher (Optional[QueryBatcher]): If set, `atext_search` encodes its query through this batcher,
+                                                    so that concurrent searches share forward passes, off the
+                                                    event loop. It should wrap the same embedding model.
         """
 
+        if lexical_mode not in ("union", "restrict"):
+            raise ValueError(
+                f"Unknown lexical mode {lexical_mode}. Expected 'union' or 'restrict'."
+            )
+
         self._database = database
         self._embedding_model = embedding_model
+        self._lexical_index = lexical_index
+        self._lexical_mode = lexical_mode
+        self._lexical_k = lexical_k
+        self._query_batcher = query_batcher
         self._is_cuda = torch.cuda.is_available()
         self._is_fp16 = all_gpus_support_fp16(self._is_cuda)
 
+        if scoring_threads is not None:
+            torch.set_num_threads(scoring_threads)
+
+        if scoring_precision is None:
+            scoring_precision = "float16" if self._is_fp16 else "float32"
+        elif scoring_precision == "auto":
+            if self._is_cuda:
+                scoring_precision = "float16" if self._is_fp16 else "float32"
+            else:
+                scoring_precision, _ = select_precision(tolerance=scoring_tolerance)
+        elif scoring_precision not in SCORING_PRECISIONS:
+            raise ValueError(
+                f"Unknown scoring precision {scoring_precision}. Expected one of {SCORING_PRECISIONS} or 'auto'."
+            )
+
+        self._scorer = MaxSimScorer(
+            precision=scoring_precision,
+            num_shards=scoring_shards,
+            device=torch.device("cuda") if self._is_cuda else torch.device("cpu"),
+        )
+
+    @property
+    def scoring_precision(self) -> str:
+        return self._scorer.precision
+
     def close(self) -> None:
         """
         Closes any open resources held by the retriever.
         """
-        pass
+        self._scorer.close()
 
     async def _query_relevant_chunks(
-        self, query_embedding: Embedding, top_k: int
+        self,
+        query_embedding: Embedding,
+        top_k: int,
+        metadata_filter: Optional[Metadata] = None,
     ) -> Set[Chunk]:
         """
         Retrieves the top_k ANN Chunks (`doc_id` and `chunk_id` only) for each embedded query token.
@@ -164,7 +242,9 @@ class ColbertRetriever(BaseRetriever):
         chunks: Set[Chunk] = set()
         # Collect all tasks
         tasks = [
-            self._database.search_relevant_chunks(vector=v, n=top_k)
+            self._database.search_relevant_chunks(
+                vector=v, n=top_k, metadata_filter=metadata_filter
+            )
             for v in query_embedding
         ]
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -180,13 +260,72 @@ class ColbertRetriever(BaseRetriever):
 
         return chunks
 
-    async def _get_chunk_embeddings(self, chunks: Set[Chunk]) -> List[Chunk]:
+    async def _query_lexical_chunks(self, query_text: str) -> Set[Chunk]:
+        """
+        Retrieves the lexical candidate Chunks (`doc_id` and `chunk_id` only) for the query text.
+        """
+        try:
+            results = await self._lexical_index.asearch(
+                query_text=query_text, k=self._lexical_k
+            )
+        except Exception as e:
+            logging.error(f"Issue on lexical_index.asearch(): {e} at {get_trace(e)}")
+            return set()
+        return {chunk for chunk, _ in results}
+
+    def _restricts_to_lexical(self, query_text: Optional[str]) -> bool:
+        """
+        Whether the rerank pool is restricted to the lexical candidates of the query text.
+        """
+        return (
+            self._lexical_index is not None
+            and bool(query_text)
+            and self._lexical_mode == "restrict"
+        )
+
+    async def _query_candidate_chunks(
+        self,
+        query_embedding: Embedding,
+        top_k: int,
+        query_text: Optional[str],
+        metadata_filter: Optional[Metadata] = None,
+    ) -> Set[Chunk]:
+        """
+        Builds the rerank pool from token ANN results and, when a lexical index is configured and
+        the query text is known, lexical results. In "restrict" mode, only the lexical results
+        are returned, which may be none.
+        """
+        if self._lexical_index is None or not query_text:
+            return await self._query_relevant_chunks(
+                query_embedding=query_embedding,
+                top_k=top_k,
+                metadata_filter=metadata_filter,
+            )
+
+        if self._restricts_to_lexical(query_text):
+            return await self._query_lexical_chunks(query_text=query_text)
+
+        ann_chunks, lexical_chunks = await asyncio.gather(
+            self._query_relevant_chunks(
+                query_embedding=query_embedding,
+                top_k=top_k,
+                metadata_filter=metadata_filter,
+            ),
+            self._query_lexical_chunks(query_text=query_text),
+        )
+        return ann_chunks | lexical_chunks
+
+    async def _get_chunk_embeddings(
+        self, chunks: Set[Chunk], metadata_filter: Optional[Metadata] = None
+    ) -> List[Chunk]:
         """
         Retrieves Chunks with `doc_id`, `chunk_id`, and `embedding` set.
         """
         # Collect all tasks
         tasks = [
-            self._database.get_chunk_embedding(doc_id=c.doc_id, chunk_id=c.chunk_id)
+            self._database.get_chunk_embedding(
+                doc_id=c.doc_id, chunk_id=c.chunk_id, metadata_filter=metadata_filter
+            )
             for c in chunks
         ]
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -205,27 +344,23 @@ class ColbertRetriever(BaseRetriever):
     ) -> Dict[Chunk, float]:
         """
         Process the retrieved chunk data to calculate scores.
+
+        All chunks are scored in one batched pass; see `ragstack_colbert.scoring`.
         """
-        chunk_scores = {}
-        for chunk in chunk_embeddings:
-            chunk_scores[chunk] = sum(
-                max_similarity_torch(
-                    query_vector=query_vector,
-                    chunk_embedding=chunk.embedding,
-                    is_cuda=self._is_cuda,
-                    is_fp16=self._is_fp16,
-                )
-                for query_vector in query_embedding
-            )
-        return chunk_scores
+        return self._scorer.score(
+            query_embedding=query_embedding,
+            chunks=[c for c in chunk_embeddings if isinstance(c, Chunk)],
+        )
 
     async def _get_chunk_data(
         self,
         chunks: List[Chunk],
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
     ) -> List[Chunk]:
         """
-        Fetches text and metadata for each chunk.
+        Fetches text and metadata for each chunk. Chunks not matching `metadata_filter` are
+        returned as None.
 
         Returns:
             List[Chunk]: A list of chunks with `doc_id`, `chunk_id`, `text`, `metadata`, and optionally `embedding` set.
@@ -237,6 +372,7 @@ class ColbertRetriever(BaseRetriever):
                 doc_id=c.doc_id,
                 chunk_id=c.chunk_id,
                 include_embedding=include_embedding,
+                metadata_filter=metadata_filter,
             )
             for c in chunks
         ]
@@ -250,12 +386,82 @@ class ColbertRetriever(BaseRetriever):
 
         return results
 
+    async def _search(
+        self,
+        query_embedding: Embedding,
+        k: int,
+        include_embedding: bool,
+        query_text: Optional[str] = None,
+        metadata_filter: Optional[Metadata] = None,
+    ) -> List[Tuple[Chunk, float]]:
+        """
+        Shared implementation of the text and embedding searches. Lexical candidates are only
+        considered when `query_text` is set. `metadata_filter` is passed to every database read,
+        so that candidates outside of it are dropped before their embeddings are fetched.
+        """
+        top_k = max(math.floor(len(query_embedding) / 2), 16)
+        logging.debug(
+            f"based on query length of {len(query_embedding)} tokens, retrieving {top_k} results per token-embedding"
+        )
+
+        # search for relevant chunks (only with `doc_id` and `chunk_id` set), optionally
+        # merged with or restricted to the lexical candidates
+        relevant_chunks: Set[Chunk] = await self._query_candidate_chunks(
+            query_embedding=query_embedding,
+            top_k=top_k,
+            query_text=query_text,
+            metadata_filter=metadata_filter,
+        )
+
+        # get the embedding for each chunk (with `doc_id`, `chunk_id`, and `embedding` set);
+        # lexical candidates outside of the filter come back without embedding and are not scored
+        chunk_embeddings: List[Chunk] = await self._get_chunk_embeddings(
+            chunks=relevant_chunks, metadata_filter=metadata_filter
+        )
+
+        # the lexical index doesn't know the metadata: if none of its candidates is within the
+        # filter, token ANN may still find some
+        if self._restricts_to_lexical(query_text) and not any(
+            isinstance(c, Chunk) and c.embedding for c in chunk_embeddings
+        ):
+            logging.debug("no lexical match within the filter, falling back to token ANN candidates")
+            relevant_chunks = await self._query_relevant_chunks(
+                query_embedding=query_embedding,
+                top_k=top_k,
+                metadata_filter=metadata_filter,
+            )
+            chunk_embeddings = await self._get_chunk_embeddings(
+                chunks=relevant_chunks, metadata_filter=metadata_filter
+            )
+
+        # score the chunks using max_similarity
+        chunk_scores: Dict[Chunk, float] = self._score_chunks(
+            query_embedding=query_embedding,
+            chunk_embeddings=chunk_embeddings,
+        )
+
+        # only keep the top k sorted results
+        top_k_chunks: List[Chunk] = sorted(
+            chunk_scores, key=chunk_scores.get, reverse=True
+        )[:k]
+
+        chunks: List[Chunk] = await self._get_chunk_data(
+            chunks=top_k_chunks,
+            include_embedding=include_embedding,
+            metadata_filter=metadata_filter,
+        )
+
+        return [
+            (chunk, chunk_scores[chunk]) for chunk in chunks if isinstance(chunk, Chunk)
+        ]
+
     async def atext_search(
         self,
         query_text: str,
         k: Optional[int] = 5,
         query_maxlen: Optional[int] = None,
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
         **kwargs: Any,
     ) -> List[Tuple[Chunk, float]]:
         """
@@ -268,6 +474,10 @@ class ColbertRetriever(BaseRetriever):
                                           maxlen will be dynamically generated.
             include_embedding (Optional[bool]): Optional (default False) flag to include the
                                                 embedding vectors in the returned chunks
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all of
+                                                  these key/value pairs are considered. The filter is
+                                                  pushed down into candidate generation, so chunks
+                                                  outside it are never fetched or scored.
             **kwargs (Any): Additional parameters that implementations might require for customized
                             retrieval operations.
 
@@ -276,15 +486,21 @@ class ColbertRetriever(BaseRetriever):
                                   to the query, along with its similarity score.
         """
 
-        query_embedding = self._embedding_model.embed_query(
-            query=query_text, query_maxlen=query_maxlen
-        )
+        if self._query_batcher is not None:
+            query_embedding = await self._query_batcher.embed_query(
+                query=query_text, query_maxlen=query_maxlen
+            )
+        else:
+            query_embedding = await self._embedding_model.aembed_query(
+                query=query_text, query_maxlen=query_maxlen
+            )
 
-        return await self.aembedding_search(
+        return await self._search(
             query_embedding=query_embedding,
             k=k,
             include_embedding=include_embedding,
-            **kwargs,
+            query_text=query_text,
+            metadata_filter=metadata_filter,
         )
 
     async def aembedding_search(
@@ -292,6 +508,7 @@ class ColbertRetriever(BaseRetriever):
         query_embedding: Embedding,
         k: Optional[int] = 5,
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
         **kwargs: Any,
     ) -> List[Tuple[Chunk, float]]:
         """
@@ -302,6 +519,10 @@ class ColbertRetriever(BaseRetriever):
             k (Optional[int]): The number of top results to retrieve. Default 5.
             include_embedding (Optional[bool]): Optional (default False) flag to include the
                                                 embedding vectors in the returned chunks
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all of
+                                                  these key/value pairs are considered. The filter is
+                                                  pushed down into candidate generation, so chunks
+                                                  outside it are never fetched or scored.
             **kwargs (Any): Additional parameters that implementations might require for customized
                             retrieval operations.
 
@@ -310,44 +531,20 @@ class ColbertRetriever(BaseRetriever):
                                   to the query, along with its similarity score.
         """
 
-        top_k = max(math.floor(len(query_embedding) / 2), 16)
-        logging.debug(
-            f"based on query length of {len(query_embedding)} tokens, retrieving {top_k} results per token-embedding"
-        )
-
-        # search for relevant chunks (only with `doc_id` and `chunk_id` set)
-        relevant_chunks: List[Chunk] = await self._query_relevant_chunks(
-            query_embedding=query_embedding, top_k=top_k
-        )
-
-        # get the embedding for each chunk (with `doc_id`, `chunk_id`, and `embedding` set)
-        chunk_embeddings: List[Chunk] = await self._get_chunk_embeddings(
-            chunks=relevant_chunks
-        )
-
-        # score the chunks using max_similarity
-        chunk_scores: Dict[Chunk, float] = self._score_chunks(
+        return await self._search(
             query_embedding=query_embedding,
-            chunk_embeddings=chunk_embeddings,
-        )
-
-        # only keep the top k sorted results
-        top_k_chunks: List[Chunk] = sorted(
-            chunk_scores, key=chunk_scores.get, reverse=True
-        )[:k]
-
-        chunks: List[Chunk] = await self._get_chunk_data(
-            chunks=top_k_chunks, include_embedding=include_embedding
+            k=k,
+            include_embedding=include_embedding,
+            metadata_filter=metadata_filter,
         )
 
-        return [(chunk, chunk_scores[chunk]) for chunk in chunks]
-
     def text_search(
         self,
         query_text: str,
         k: Optional[int] = 5,
         query_maxlen: Optional[int] = None,
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
         **kwargs: Any,
     ) -> List[Tuple[Chunk, float]]:
         """
@@ -361,6 +558,10 @@ class ColbertRetriever(BaseRetriever):
                                           maxlen will be dynamically generated.
             include_embedding (Optional[bool]): Optional (default False) flag to include the
                                                 embedding vectors in the returned chunks
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all of
+                                                  these key/value pairs are considered. The filter is
+                                                  pushed down into candidate generation, so chunks
+                                                  outside it are never fetched or scored.
             **kwargs (Any): Additional parameters that implementations might require for customized
                             retrieval operations.
 
@@ -375,6 +576,7 @@ class ColbertRetriever(BaseRetriever):
                 k=k,
                 query_maxlen=query_maxlen,
                 include_embedding=include_embedding,
+                metadata_filter=metadata_filter,
             )
         )
 
@@ -383,6 +585,7 @@ class ColbertRetriever(BaseRetriever):
         query_embedding: Embedding,
         k: Optional[int] = 5,
         include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
         **kwargs: Any,
     ) -> List[Tuple[Chunk, float]]:
         """
@@ -394,6 +597,10 @@ class ColbertRetriever(BaseRetriever):
             k (Optional[int]): The number of top results to retrieve. Default 5.
             include_embedding (Optional[bool]): Optional (default False) flag to include the
                                                 embedding vectors in the returned chunks
+            metadata_filter (Optional[Metadata]): If set, only chunks whose metadata contains all of
+                                                  these key/value pairs are considered. The filter is
+                                                  pushed down into candidate generation, so chunks
+                                                  outside it are never fetched or scored.
             **kwargs (Any): Additional parameters that implementations might require for customized
                             retrieval operations.
 
@@ -407,5 +614,6 @@ class ColbertRetriever(BaseRetriever):
                 query_embedding=query_embedding,
                 k=k,
                 include_embedding=include_embedding,
+                metadata_filter=metadata_filter,
             )
         )
@@ -6,14 +6,14 @@ generated by a ColBERT model, facilitating scalable and high-relevancy retrieval
 
 import logging
 import uuid
-from typing import List, Optional, Tuple
+from typing import Any, List, Optional, Tuple
 
 from .base_database import BaseDatabase
 from .base_embedding_model import BaseEmbeddingModel
+from .base_lexical_index import BaseLexicalIndex
 from .base_retriever import BaseRetriever
 from .base_vector_store import BaseVectorStore
-from .colbert_retriever import ColbertRetriever
-from .objects import Chunk, Metadata
+from .objects import Chunk, Embedding, Metadata
 
 
 class ColbertVectorStore(BaseVectorStore):
@@ -23,11 +23,13 @@ class ColbertVectorStore(BaseVectorStore):
 
     _database: BaseDatabase
     _embedding_model: BaseEmbeddingModel
+    _lexical_index: Optional[BaseLexicalIndex]
 
     def __init__(
         self,
         database: BaseDatabase,
         embedding_model: Optional[BaseEmbeddingModel] = None,
+        lexical_index: Optional[BaseLexicalIndex] = None,
     ):
         """
         Initializes a new instance of the ColbertVectorStore.
@@ -35,10 +37,26 @@ class ColbertVectorStore(BaseVectorStore):
         Parameters:
             database (BaseDatabase): The database to use for storage
             embedding_model (Optional[BaseEmbeddingModel]): The embedding model to use for embedding text and queries
+            lexical_index (Optional[BaseLexicalIndex]): An optional lexical index (for example a `BM25Index`) that is
+                                                        kept up to date with the chunks added to and deleted from the
+                                                        store, and used by retrievers created with `as_retriever`.
         """
 
         self._database = database
         self._embedding_model = embedding_model
+        self._lexical_index = lexical_index
+
+    def _index_chunks(self, chunks: List[Chunk], added: List[Tuple[str, int]]) -> None:
+        # only the chunks the database added, so that lexical candidates can be fetched
+        if self._lexical_index is not None:
+            keys = set(added)
+            self._lexical_index.add_chunks(
+                chunks=[chunk for chunk in chunks if (chunk.doc_id, chunk.chunk_id) in keys]
+            )
+
+    def _unindex_chunks(self, doc_ids: List[str]) -> None:
+        if self._lexical_index is not None:
+            self._lexical_index.delete_chunks(doc_ids=doc_ids)
 
     def _validate_embedding_model(self):
         if self._embedding_model is None:
@@ -46,23 +64,25 @@ class ColbertVectorStore(BaseVectorStore):
                 "To use this method, `embedding_model` must be set on class creation."
             )
 
+    def _validate_texts(
+        self, texts: List[str], metadatas: Optional[List[Metadata]] = None
+    ) -> None:
+        self._validate_embedding_model()
+
+        if metadatas is not None and len(texts) != len(metadatas):
+            raise ValueError("Length of texts and metadatas must match.")
+
     def _build_chunks(
         self,
         texts: List[str],
+        embeddings: List[Embedding],
         metadatas: Optional[List[Metadata]] = None,
         doc_id: Optional[str] = None,
     ) -> List[Chunk]:
 
-        self._validate_embedding_model()
-
-        if metadatas is not None and len(texts) != len(metadatas):
-            raise ValueError("Length of texts and metadatas must match.")
-
         if doc_id is None:
             doc_id = str(uuid.uuid4())
 
-        embeddings = self._embedding_model.embed_texts(texts=texts)
-
         chunks: List[Chunk] = []
         for i, text in enumerate(texts):
             chunks.append(
@@ -88,7 +108,9 @@ class ColbertVectorStore(BaseVectorStore):
             a list of tuples: (doc_id, chunk_id)
         """
 
-        return self._database.add_chunks(chunks=chunks)
+        results = self._database.add_chunks(chunks=chunks)
+        self._index_chunks(chunks=chunks, added=results)
+        return results
 
     # implements the abc method to handle LangChain add
     def add_texts(
@@ -110,8 +132,14 @@ class ColbertVectorStore(BaseVectorStore):
         Returns:
             a list of tuples: (doc_id, chunk_id)
         """
-        chunks = self._build_chunks(texts=texts, metadatas=metadatas, doc_id=doc_id)
-        return self._database.add_chunks(chunks=chunks)
+        self._validate_texts(texts=texts, metadatas=metadatas)
+        embeddings = self._embedding_model.embed_texts(texts=texts)
+        chunks = self._build_chunks(
+            texts=texts, embeddings=embeddings, metadatas=metadatas, doc_id=doc_id
+        )
+        results = self._database.add_chunks(chunks=chunks)
+        self._index_chunks(chunks=chunks, added=results)
+        return results
 
     # implements the abc method to handle LangChain and LlamaIndex delete
     def delete_chunks(self, doc_ids: List[str]) -> bool:
@@ -125,6 +153,7 @@ class ColbertVectorStore(BaseVectorStore):
             True if the all the deletes were successful.
         """
 
+        self._unindex_chunks(doc_ids=doc_ids)
         return self._database.delete_chunks(doc_ids=doc_ids)
 
     # implements the abc method to handle LlamaIndex add
@@ -140,7 +169,9 @@ class ColbertVectorStore(BaseVectorStore):
             a list of tuples: (doc_id, chunk_id)
         """
 
-        return await self._database.aadd_chunks(chunks=chunks, concurrent_inserts=concurrent_inserts)
+        results = await self._database.aadd_chunks(chunks=chunks, concurrent_inserts=concurrent_inserts)
+        self._index_chunks(chunks=chunks, added=results)
+        return results
 
     # implements the abc method to handle LangChain add
     async def aadd_texts(
@@ -164,8 +195,14 @@ class ColbertVectorStore(BaseVectorStore):
         Returns:
             a list of tuples: (doc_id, chunk_id)
         """
-        chunks = self._build_chunks(texts=texts, metadatas=metadatas, doc_id=doc_id)
-        return await self._database.aadd_chunks(chunks=chunks, concurrent_inserts=concurrent_inserts)
+        self._validate_texts(texts=texts, metadatas=metadatas)
+        embeddings = await self._embedding_model.aembed_texts(texts=texts)
+        chunks = self._build_chunks(
+            texts=texts, embeddings=embeddings, metadatas=metadatas, doc_id=doc_id
+        )
+        results = await self._database.aadd_chunks(chunks=chunks, concurrent_inserts=concurrent_inserts)
+        self._index_chunks(chunks=chunks, added=results)
+        return results
 
     # implements the abc method to handle LangChain and LlamaIndex delete
     async def adelete_chunks(self, doc_ids: List[str], concurrent_deletes: Optional[int] = 100) -> bool:
@@ -179,14 +216,24 @@ class ColbertVectorStore(BaseVectorStore):
         Returns:
             True if the all the deletes were successful.
         """
+        self._unindex_chunks(doc_ids=doc_ids)
         return await self._database.adelete_chunks(doc_ids=doc_ids, concurrent_deletes=concurrent_deletes)
 
-    def as_retriever(self) -> BaseRetriever:
+    def as_retriever(self, **kwargs: Any) -> BaseRetriever:
         """
         Gets a retriever using the vector store.
+
+        Parameters:
+            **kwargs (Any): Additional parameters passed to the `ColbertRetriever` constructor.
         """
 
+        # imported here as the retriever pulls in torch
+        from .colbert_retriever import ColbertRetriever
+
         self._validate_embedding_model()
         return ColbertRetriever(
-            database=self._database, embedding_model=self._embedding_model
+            database=self._database,
+            embedding_model=self._embedding_model,
+            lexical_index=self._lexical_index,
+            **kwargs,
         )
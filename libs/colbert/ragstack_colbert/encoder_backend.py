@@ -0,0 +1,280 @@
+"""
+This module defines the pluggable inference backends used by the TextEncoder to turn tokenized text into
+ColBERT token embeddings.
+
+Tokenization always uses the tokenizers of the ColBERT `Checkpoint`. Queries are tokenized by the caller, so
+that the query length is chosen per call. The backends only differ in how the BERT encoder, the linear
+projection and the L2 normalization are executed:
+
+- `TorchEncoderBackend` runs the PyTorch `Checkpoint`, exactly as ColBERT does.
+- `OnnxEncoderBackend` runs an ONNX export of the same graph with ONNX Runtime, optionally with int8
+  dynamic quantization of the weights. It requires the `onnx` extra (`onnx` and `onnxruntime`).
+"""
+
+import inspect
+import logging
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+import torch
+from colbert.modeling.checkpoint import Checkpoint
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx_int8")
+
+DEFAULT_ONNX_MODEL_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "ragstack_colbert", "onnx"
+)
+
+
+def checkpoint_file_name(checkpoint: Checkpoint) -> str:
+    """
+    Returns a file name stem identifying the checkpoint, for the files derived from it.
+    """
+    checkpoint_name = checkpoint.colbert_config.checkpoint or checkpoint.name
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(checkpoint_name)).strip("_")
+
+
+class BaseEncoderBackend(ABC):
+    """
+    Abstract base class (ABC) for the backend that computes ColBERT token embeddings.
+    """
+
+    @abstractmethod
+    def encode_docs(
+        self, texts: List[str], batch_size: int
+    ) -> Tuple[torch.Tensor, List[int]]:
+        """
+        Encodes document texts.
+
+        Parameters:
+            texts (List[str]): The texts to encode.
+            batch_size (int): The number of texts per forward pass.
+
+        Returns:
+            A tuple of the flattened token embeddings of all texts (punctuation and padding removed), of
+            shape (total_tokens, dim), and the number of tokens of each text.
+        """
+
+    @abstractmethod
+    def encode_queries(
+        self, input_ids: torch.Tensor, attention_mask: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        Encodes tokenized queries. Must be safe to call from several threads at once.
+
+        Parameters:
+            input_ids (torch.Tensor): The query token ids, of shape (num_queries, query_maxlen).
+            attention_mask (torch.Tensor): The attention mask, of the same shape.
+
+        Returns:
+            A tensor of shape (num_queries, query_maxlen, dim).
+        """
+
+
+class TorchEncoderBackend(BaseEncoderBackend):
+    """
+    Encodes text with the PyTorch ColBERT `Checkpoint`.
+    """
+
+    def __init__(self, checkpoint: Checkpoint, use_cpu: bool):
+        self._checkpoint = checkpoint
+        self._use_cpu = use_cpu
+
+    def encode_docs(
+        self, texts: List[str], batch_size: int
+    ) -> Tuple[torch.Tensor, List[int]]:
+        with torch.inference_mode():
+            embeddings, counts = self._checkpoint.docFromText(
+                texts,
+                bsize=batch_size,
+                to_cpu=self._use_cpu,
+                keep_dims="flatten",
+            )
+        # the weights may be in reduced precision
+        return embeddings.float(), counts
+
+    def encode_queries(
+        self, input_ids: torch.Tensor, attention_mask: torch.Tensor
+    ) -> torch.Tensor:
+        with torch.inference_mode():
+            return self._checkpoint.query(input_ids, attention_mask).float()
+
+
+class _ColbertEncoderModule(torch.nn.Module):
+    """
+    The exported graph: BERT encoder, linear projection and L2 normalization.
+    """
+
+    def __init__(self, bert: torch.nn.Module, linear: torch.nn.Module):
+        super().__init__()
+        self.bert = bert
+        self.linear = linear
+
+    def forward(
+        self, input_ids: torch.Tensor, attention_mask: torch.Tensor
+    ) -> torch.Tensor:
+        hidden = self.bert(input_ids, attention_mask=attention_mask)[0]
+        return torch.nn.functional.normalize(self.linear(hidden), p=2, dim=2)
+
+
+def export_onnx_model(
+    bert: torch.nn.Module,
+    linear: torch.nn.Module,
+    path: str,
+    quantize: Optional[bool] = False,
+) -> str:
+    """
+    Exports the ColBERT encoder (BERT, linear projection and normalization) to an ONNX file, with dynamic
+    batch and sequence dimensions. The file is written atomically.
+
+    Parameters:
+        bert (torch.nn.Module): The BERT encoder of the checkpoint.
+        linear (torch.nn.Module): The linear projection of the checkpoint.
+        path (str): The path of the ONNX file to write.
+        quantize (Optional[bool]): If True, the weights are quantized to int8 with ONNX Runtime dynamic
+                                   quantization. Defaults to False.
+
+    Returns:
+        str: The path of the written file.
+    """
+    module = _ColbertEncoderModule(bert=bert, linear=linear).eval()
+    input_ids = torch.ones((2, 16), dtype=torch.long)
+    attention_mask = torch.ones((2, 16), dtype=torch.long)
+
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs["dynamo"] = False
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        fp32_path = os.path.join(tmp_dir, "model.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                module,
+                (input_ids, attention_mask),
+                fp32_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["embeddings"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "embeddings": {0: "batch", 1: "sequence"},
+                },
+                opset_version=17,
+                **export_kwargs,
+            )
+
+        output_path = fp32_path
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            output_path = os.path.join(tmp_dir, "model-int8.onnx")
+            quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QInt8)
+
+        os.replace(output_path, path)
+
+    return path
+
+
+class OnnxEncoderBackend(BaseEncoderBackend):
+    """
+    Encodes text with an ONNX Runtime export of the ColBERT checkpoint, on CPU.
+
+    The model is exported on first use and cached in `model_dir`, keyed by the checkpoint name and the
+    quantization mode. Document batches are trimmed to their longest text before inference.
+    """
+
+    def __init__(
+        self,
+        checkpoint: Checkpoint,
+        quantize: Optional[bool] = False,
+        model_dir: Optional[str] = None,
+        num_threads: Optional[int] = None,
+    ):
+        """
+        Initializes the backend, exporting the checkpoint to ONNX if it is not cached yet.
+
+        Parameters:
+            checkpoint (Checkpoint): The loaded ColBERT checkpoint, used for export and tokenization.
+            quantize (Optional[bool]): If True, uses int8 dynamic quantization of the weights.
+            model_dir (Optional[str]): The directory for the exported models. Defaults to
+                                       `~/.cache/ragstack_colbert/onnx`.
+            num_threads (Optional[int]): The number of intra-op threads of the ONNX Runtime session.
+                                         Defaults to the ONNX Runtime default.
+        """
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                "Could not import onnxruntime. "
+                "Please install it with `pip install ragstack-ai-colbert[onnx]`."
+            ) from e
+
+        self._checkpoint = checkpoint
+        self._skiplist = checkpoint.skiplist if checkpoint.colbert_config.mask_punctuation else {}
+
+        suffix = "-int8" if quantize else ""
+        self.model_path = os.path.join(
+            model_dir or DEFAULT_ONNX_MODEL_DIR,
+            f"{checkpoint_file_name(checkpoint)}{suffix}.onnx",
+        )
+        if not os.path.exists(self.model_path):
+            logging.info(f"exporting ColBERT checkpoint to ONNX at {self.model_path}")
+            export_onnx_model(
+                bert=checkpoint.bert,
+                linear=checkpoint.linear,
+                path=self.model_path,
+                quantize=quantize,
+            )
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self._session = onnxruntime.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+    def _run(self, input_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        (embeddings,) = self._session.run(
+            ["embeddings"],
+            {
+                "input_ids": input_ids.cpu().numpy(),
+                "attention_mask": attention_mask.cpu().numpy(),
+            },
+        )
+        return torch.from_numpy(embeddings)
+
+    def _mask(self, input_ids: torch.Tensor, skiplist) -> torch.Tensor:
+        return torch.tensor(
+            self._checkpoint.mask(input_ids, skiplist=skiplist), dtype=torch.bool
+        )
+
+    def encode_docs(
+        self, texts: List[str], batch_size: int
+    ) -> Tuple[torch.Tensor, List[int]]:
+        batches, reverse_indices = self._checkpoint.doc_tokenizer.tensorize(
+            texts, bsize=batch_size
+        )
+
+        embeddings: List[torch.Tensor] = []
+        for input_ids, attention_mask in batches:
+            length = int(attention_mask.sum(dim=1).max())
+            input_ids, attention_mask = input_ids[:, :length], attention_mask[:, :length]
+            mask = self._mask(input_ids, skiplist=self._skiplist)
+            output = self._run(input_ids, attention_mask)
+            embeddings.extend(output[i][mask[i]] for i in range(output.shape[0]))
+
+        embeddings = [embeddings[i] for i in reverse_indices.tolist()]
+        return torch.cat(embeddings), [e.shape[0] for e in embeddings]
+
+    def encode_queries(
+        self, input_ids: torch.Tensor, attention_mask: torch.Tensor
+    ) -> torch.Tensor:
+        mask = self._mask(input_ids, skiplist=[])
+        return self._run(input_ids, attention_mask) * mask.unsqueeze(2)
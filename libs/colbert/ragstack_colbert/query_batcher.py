@@ -0,0 +1,185 @@
+"""
+This module provides an asyncio micro-batcher for query embeddings.
+
+Under concurrent load, encoding each query in its own batch-size-1 forward pass wastes most of the
+encoder's throughput. The `QueryBatcher` collects the queries awaited by concurrent coroutines for up
+to `max_wait_ms` milliseconds (or until `max_batch_size` queries are waiting), groups them by their
+encoding parameters, and encodes each group with one `embed_queries` call on a worker thread, so the
+event loop is never blocked by the forward pass. While all the workers are busy, new queries keep
+accumulating and are dispatched as soon as a worker is free.
+"""
+
+import asyncio
+import functools
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .base_embedding_model import BaseEmbeddingModel
+from .objects import Embedding
+
+# (full_length_search, query_maxlen)
+_BatchKey = Tuple[bool, int]
+
+
+class _LoopState:
+    """
+    The queries waiting to be dispatched on one event loop.
+    """
+
+    def __init__(self):
+        self.pending: Dict[_BatchKey, List[Tuple[str, asyncio.Future]]] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.in_flight = 0
+
+
+class QueryBatcher:
+    """
+    Batches the query embeddings requested by concurrent coroutines.
+
+    Queries are only batched with queries that have the same `full_length_search` and `query_maxlen`
+    arguments. The embedding model is expected to further split a batch by token length, as
+    `ColbertEmbeddingModel.embed_queries` does, so every query is encoded exactly as it would be alone.
+    """
+
+    def __init__(
+        self,
+        embedding_model: BaseEmbeddingModel,
+        max_batch_size: Optional[int] = 32,
+        max_wait_ms: Optional[float] = 2.0,
+        max_concurrent_batches: Optional[int] = 1,
+    ):
+        """
+        Initializes the batcher.
+
+        Parameters:
+            embedding_model (BaseEmbeddingModel): The model used to embed the queries.
+            max_batch_size (Optional[int]): The maximum number of queries encoded in one call. Defaults to 32.
+            max_wait_ms (Optional[float]): How long the first query of a batch waits for more queries before
+                                           the batch is dispatched, in milliseconds. Defaults to 2.
+            max_concurrent_batches (Optional[int]): The number of batches encoded at the same time, each on
+                                                    its own worker thread. Defaults to 1.
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_concurrent_batches < 1:
+            raise ValueError("max_concurrent_batches must be at least 1")
+
+        self._embedding_model = embedding_model
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._max_concurrent_batches = max_concurrent_batches
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches, thread_name_prefix="colbert-query-batcher"
+        )
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._num_queries = 0
+        self._num_batches = 0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """
+        The number of queries and batches encoded so far, and the mean batch size.
+        """
+        return {
+            "queries": self._num_queries,
+            "batches": self._num_batches,
+            "mean_batch_size": self._num_queries / max(self._num_batches, 1),
+        }
+
+    def close(self) -> None:
+        """
+        Shuts down the worker threads. Batches already dispatched are completed.
+        """
+        self._executor.shutdown(wait=False)
+
+    async def embed_query(
+        self,
+        query: str,
+        full_length_search: Optional[bool] = False,
+        query_maxlen: Optional[int] = None,
+    ) -> Embedding:
+        """
+        Embeds a query as part of the next batch.
+
+        Parameters:
+            query (str): The query string to encode.
+            full_length_search (Optional[bool]): Indicates whether to encode the query for a full-length search.
+                                                  Defaults to False.
+            query_maxlen (int): The fixed length for the query token embedding. If None, uses a dynamically calculated value.
+
+        Returns:
+            Embedding: A vector embedding representation of the query text
+        """
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState()
+
+        key = (bool(full_length_search), -1 if query_maxlen is None else query_maxlen)
+        future = loop.create_future()
+        queries = state.pending.setdefault(key, [])
+        queries.append((query, future))
+
+        if len(queries) >= self._max_batch_size:
+            self._dispatch(loop, state)
+        elif state.timer is None and state.in_flight < self._max_concurrent_batches:
+            state.timer = loop.call_later(self._max_wait, self._dispatch, loop, state)
+
+        return await future
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop, state: _LoopState) -> None:
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+
+        # the oldest group goes first, as groups are re-inserted once they have been emptied
+        while state.pending and state.in_flight < self._max_concurrent_batches:
+            key = next(iter(state.pending))
+            queries = state.pending[key]
+            batch = queries[: self._max_batch_size]
+            del queries[: self._max_batch_size]
+            if not queries:
+                del state.pending[key]
+
+            batch = [(query, future) for query, future in batch if not future.done()]
+            if batch:
+                state.in_flight += 1
+                loop.create_task(self._encode(loop, state, key, batch))
+
+    async def _encode(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        state: _LoopState,
+        key: _BatchKey,
+        batch: List[Tuple[str, asyncio.Future]],
+    ) -> None:
+        full_length_search, query_maxlen = key
+        try:
+            embeddings = await loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    self._embedding_model.embed_queries,
+                    [query for query, _ in batch],
+                    full_length_search=full_length_search,
+                    query_maxlen=query_maxlen,
+                ),
+            )
+            self._num_queries += len(batch)
+            self._num_batches += 1
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        except Exception as e:
+            logging.warning(f"failed to encode a batch of {len(batch)} queries: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            state.in_flight -= 1
+            # the queries that arrived while the workers were busy have already waited
+            if state.pending:
+                self._dispatch(loop, state)
@@ -0,0 +1,257 @@
+"""
+This module provides batched ColBERT max-similarity scoring, with reduced-precision modes for
+CPU-only deployments.
+
+All candidate chunks are scored together: their token embeddings are concatenated into a single
+matrix, multiplied once against the query embedding, and reduced per chunk. On CPU the matrix
+product can run in bfloat16, float16 or int8 where the hardware and PyTorch build support it, and
+the candidate set can be sharded across threads. `select_precision` runs a short microbenchmark
+to pick the fastest precision whose scores stay within a tolerance of float32.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+from .objects import Chunk, Embedding
+
+SCORING_PRECISIONS = ("float32", "bfloat16", "float16", "int8")
+
+_FLOAT_DTYPES = {
+    "float32": torch.float32,
+    "bfloat16": torch.bfloat16,
+    "float16": torch.float16,
+}
+
+
+def _quantize_int8(tensor: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Symmetric per-row int8 quantization. Returns the quantized tensor and the per-row scales.
+    """
+    scales = tensor.abs().amax(dim=1).clamp(min=1e-12) / 127.0
+    quantized = torch.round(tensor / scales.unsqueeze(1)).to(torch.int8)
+    return quantized, scales
+
+
+def _similarities(
+    embeddings: torch.Tensor, query: torch.Tensor, precision: str
+) -> torch.Tensor:
+    """
+    Computes the (num_tokens, query_tokens) dot-product matrix in the given precision.
+    The result is always float32.
+    """
+    if precision == "int8":
+        embeddings_q, embeddings_scales = _quantize_int8(embeddings)
+        query_q, query_scales = _quantize_int8(query)
+        try:
+            sims = torch._int_mm(embeddings_q, query_q.T.contiguous())
+        except (AttributeError, RuntimeError):
+            # older PyTorch builds have no CPU int8 GEMM
+            sims = torch.matmul(embeddings_q.to(torch.int32), query_q.T.to(torch.int32))
+        return sims.to(torch.float32) * embeddings_scales.unsqueeze(1) * query_scales
+
+    dtype = _FLOAT_DTYPES[precision]
+    return torch.matmul(embeddings.to(dtype), query.to(dtype).T).to(torch.float32)
+
+
+def max_similarity_batch(
+    query: torch.Tensor,
+    embeddings: torch.Tensor,
+    lengths: torch.Tensor,
+    precision: str = "float32",
+) -> torch.Tensor:
+    """
+    Calculates the ColBERT score (sum over query tokens of the max similarity to any chunk
+    token) of many chunks at once.
+
+    Parameters:
+        query (Tensor): The query embedding, of shape (query_tokens, dim).
+        embeddings (Tensor): The concatenated token embeddings of every chunk,
+                             of shape (total_tokens, dim).
+        lengths (Tensor): The number of tokens of each chunk, of shape (num_chunks,).
+        precision (str): One of `SCORING_PRECISIONS`.
+
+    Returns:
+        Tensor: The float32 score of every chunk, of shape (num_chunks,).
+    """
+    sims = _similarities(embeddings=embeddings, query=query, precision=precision)
+
+    owners = torch.repeat_interleave(
+        torch.arange(lengths.shape[0], device=sims.device), lengths.to(sims.device)
+    )
+    max_sims = torch.full(
+        (lengths.shape[0], sims.shape[1]), float("-inf"), device=sims.device
+    )
+    max_sims = max_sims.scatter_reduce(
+        0, owners.unsqueeze(1).expand(-1, sims.shape[1]), sims, reduce="amax"
+    )
+    return max_sims.sum(dim=1)
+
+
+class MaxSimScorer:
+    """
+    Scores candidate chunks against a query embedding in a single batched pass.
+
+    Attributes:
+        precision (str): The precision used for the similarity matrix product.
+        num_shards (int): Number of shards the candidate set is split into. Shards are scored
+                          concurrently on a thread pool; PyTorch releases the GIL inside the
+                          matrix products, so shards run in parallel.
+        device (torch.device): The device the scoring runs on.
+    """
+
+    def __init__(
+        self,
+        precision: str = "float32",
+        num_shards: int = 1,
+        device: Optional[torch.device] = None,
+    ):
+        if precision not in SCORING_PRECISIONS:
+            raise ValueError(
+                f"Unknown scoring precision {precision}. Expected one of {SCORING_PRECISIONS}."
+            )
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least one")
+
+        self.precision = precision
+        self.num_shards = num_shards
+        self.device = device or torch.device("cpu")
+        self._executor = (
+            ThreadPoolExecutor(max_workers=num_shards, thread_name_prefix="colbert-scoring")
+            if num_shards > 1
+            else None
+        )
+
+    def _score_shard(
+        self, query: torch.Tensor, chunk_embeddings: Sequence[Embedding]
+    ) -> List[float]:
+        lengths = torch.tensor([len(e) for e in chunk_embeddings], dtype=torch.long)
+        embeddings = torch.tensor(
+            [vector for embedding in chunk_embeddings for vector in embedding],
+            dtype=torch.float32,
+            device=self.device,
+        )
+        with torch.inference_mode():
+            scores = max_similarity_batch(
+                query=query,
+                embeddings=embeddings,
+                lengths=lengths,
+                precision=self.precision,
+            )
+        return scores.tolist()
+
+    def score(
+        self, query_embedding: Embedding, chunks: Sequence[Chunk]
+    ) -> Dict[Chunk, float]:
+        """
+        Scores chunks (with `embedding` set) against the query embedding.
+
+        Returns:
+            A dict from chunk to its ColBERT score.
+        """
+        chunks = [chunk for chunk in chunks if chunk.embedding]
+        if len(chunks) == 0:
+            return {}
+
+        query = torch.tensor(query_embedding, dtype=torch.float32, device=self.device)
+        embeddings = [chunk.embedding for chunk in chunks]
+
+        if self._executor is None or len(chunks) < 2 * self.num_shards:
+            scores = self._score_shard(query, embeddings)
+        else:
+            shard_size = -(-len(chunks) // self.num_shards)
+            shards = [
+                embeddings[i : i + shard_size]
+                for i in range(0, len(embeddings), shard_size)
+            ]
+            scores = [
+                score
+                for shard_scores in self._executor.map(
+                    lambda shard: self._score_shard(query, shard), shards
+                )
+                for score in shard_scores
+            ]
+
+        return dict(zip(chunks, scores))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def select_precision(
+    tolerance: float = 0.01,
+    candidates: Sequence[str] = SCORING_PRECISIONS,
+    num_chunks: int = 100,
+    tokens_per_chunk: int = 200,
+    query_tokens: int = 32,
+    dim: int = 128,
+    repeats: int = 5,
+) -> Tuple[str, Dict[str, Dict[str, float]]]:
+    """
+    Runs a short CPU microbenchmark and returns the fastest scoring precision whose scores are
+    within `tolerance` of float32.
+
+    Accuracy is measured as the largest absolute score error relative to the largest float32
+    score, over a synthetic candidate set of unit-normalized embeddings. Precisions the
+    hardware or PyTorch build does not support are skipped.
+
+    Parameters:
+        tolerance (float): Maximum relative score error accepted. Defaults to 0.01.
+        candidates (Sequence[str]): Precisions to consider.
+        num_chunks (int): Number of synthetic candidate chunks.
+        tokens_per_chunk (int): Number of tokens per synthetic chunk.
+        query_tokens (int): Number of tokens of the synthetic query.
+        dim (int): Embedding dimension.
+        repeats (int): Number of timed repetitions per precision; the median is used.
+
+    Returns:
+        A tuple of the selected precision and a per-precision report with the
+        median latency in milliseconds and the relative error.
+    """
+    generator = torch.Generator().manual_seed(0)
+    query = torch.nn.functional.normalize(
+        torch.randn((query_tokens, dim), generator=generator), dim=1
+    )
+    embeddings = torch.nn.functional.normalize(
+        torch.randn((num_chunks * tokens_per_chunk, dim), generator=generator), dim=1
+    )
+    lengths = torch.full((num_chunks,), tokens_per_chunk, dtype=torch.long)
+
+    with torch.inference_mode():
+        reference = max_similarity_batch(query, embeddings, lengths, "float32")
+    scale = reference.abs().max().item()
+
+    report: Dict[str, Dict[str, float]] = {}
+    for precision in candidates:
+        try:
+            with torch.inference_mode():
+                # warm up, and check the precision is supported at all
+                scores = max_similarity_batch(query, embeddings, lengths, precision)
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    max_similarity_batch(query, embeddings, lengths, precision)
+                    timings.append(time.perf_counter() - start)
+        except (RuntimeError, TypeError) as e:
+            logging.info(f"scoring precision {precision} is not supported on this host: {e}")
+            continue
+
+        timings.sort()
+        report[precision] = {
+            "latency_ms": timings[len(timings) // 2] * 1000.0,
+            "relative_error": (scores - reference).abs().max().item() / scale,
+        }
+
+    eligible = [
+        precision
+        for precision, stats in report.items()
+        if precision == "float32" or stats["relative_error"] <= tolerance
+    ]
+    selected = min(eligible, key=lambda precision: report[precision]["latency_ms"])
+
+    logging.info(f"selected scoring precision {selected} from microbenchmark: {report}")
+    return selected, report
@@ -0,0 +1,74 @@
+"""
+This module lets several processes on a host share one copy of the ColBERT checkpoint weights.
+
+The weights are saved once to a file, and every process attaches them with a read-only memory map
+(`torch.load(mmap=True)` and `load_state_dict(assign=True)`). The mapped pages live in the OS page
+cache, so N worker processes use the memory of one copy, whether they are forked from a preloaded
+parent or started independently. The weights loaded by the `Checkpoint` itself are released once the
+mapped ones are attached.
+"""
+
+import logging
+import os
+import tempfile
+
+import torch
+
+DEFAULT_SHARED_WEIGHTS_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "ragstack_colbert", "weights"
+)
+
+
+def save_shared_weights(module: torch.nn.Module, path: str) -> str:
+    """
+    Saves the state dict of a module to a file that `attach_shared_weights` can map. The file is
+    written atomically, so concurrent writers (several workers starting at once) are safe.
+
+    Parameters:
+        module (torch.nn.Module): The module whose weights are saved.
+        path (str): The path of the file to write.
+
+    Returns:
+        str: The path of the written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    state_dict = {name: tensor.contiguous() for name, tensor in module.state_dict().items()}
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as tmp_file:
+        tmp_path = tmp_file.name
+    try:
+        torch.save(state_dict, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def attach_shared_weights(module: torch.nn.Module, path: str) -> None:
+    """
+    Replaces the weights of a module with read-only, memory-mapped tensors from a file written by
+    `save_shared_weights`. Writing to the weights afterwards makes a private copy of the written pages.
+
+    Parameters:
+        module (torch.nn.Module): The module whose weights are replaced. Its tensors must be on the CPU.
+        path (str): The path of the file to map.
+    """
+    state_dict = torch.load(path, mmap=True, weights_only=True, map_location="cpu")
+    module.load_state_dict(state_dict, assign=True)
+    logging.info(f"attached shared weights from {path}")
+
+
+def share_weights(module: torch.nn.Module, path: str) -> None:
+    """
+    Attaches the weights saved at `path`, saving them from `module` first if the file does not exist.
+
+    Parameters:
+        module (torch.nn.Module): The module whose weights are shared.
+        path (str): The path of the shared weights file.
+    """
+    if not os.path.exists(path):
+        logging.info(f"saving shared weights to {path}")
+        save_shared_weights(module, path)
+    attach_shared_weights(module, path)
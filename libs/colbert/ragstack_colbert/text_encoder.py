@@ -6,13 +6,27 @@ dense embeddings are used to measure the semantic similarity between text chunks
 """
 
 import logging
-from typing import List, Optional
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
 
 import torch
 from colbert.infra import ColBERTConfig
 from colbert.modeling.checkpoint import Checkpoint
-
+from colbert.modeling.tokenization import QueryTokenizer
+from colbert.parameters import DEVICE
+
+from ._fork import register_after_fork
+from .encoder_backend import (
+    ENCODER_BACKENDS,
+    BaseEncoderBackend,
+    OnnxEncoderBackend,
+    TorchEncoderBackend,
+    checkpoint_file_name,
+)
 from .objects import Chunk, Embedding
+from .shared_weights import DEFAULT_SHARED_WEIGHTS_DIR, share_weights
+from .weights_dtype import WEIGHTS_DTYPES, cast_weights
 
 
 def calculate_query_maxlen(tokens: List[List[str]]) -> int:
@@ -35,21 +49,108 @@ def calculate_query_maxlen(tokens: List[List[str]]) -> int:
     return max_token_length + 3
 
 
+def tensorize_queries(
+    query_tokenizer: QueryTokenizer,
+    texts: List[str],
+    query_maxlen: int,
+    full_length_search: Optional[bool] = False,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Tokenizes queries like `QueryTokenizer.tensorize`, but with the query length given per call instead of
+    read from the `query_maxlen` attribute of the tokenizer, so that concurrent calls with different lengths
+    do not interfere.
+
+    Parameters:
+        query_tokenizer (QueryTokenizer): The query tokenizer of the checkpoint. It is not modified.
+        texts (List[str]): The query texts.
+        query_maxlen (int): The number of tokens of each query, including the [MASK] padding.
+        full_length_search (Optional[bool]): If True, the length is extended (up to 500 tokens) to fit the
+                                             longest query instead of truncating it. Defaults to False.
+
+    Returns:
+        A tuple of the input ids and the attention mask, each of shape (len(texts), length).
+    """
+    # add placeholder for the [Q] marker
+    texts = [". " + text for text in texts]
+
+    max_length = query_maxlen
+    if full_length_search:
+        un_truncated_ids = query_tokenizer.tok(texts, add_special_tokens=False)["input_ids"]
+        max_length = min(500, max(query_maxlen, max(len(ids) for ids in un_truncated_ids)))
+
+    obj = query_tokenizer.tok(
+        texts,
+        padding="max_length",
+        truncation=True,
+        return_tensors="pt",
+        max_length=max_length,
+    ).to(DEVICE)
+    ids, mask = obj["input_ids"], obj["attention_mask"]
+
+    # postprocess for the [Q] marker and the [MASK] augmentation
+    ids[:, 1] = query_tokenizer.Q_marker_token_id
+    ids[ids == query_tokenizer.pad_token_id] = query_tokenizer.mask_token_id
+
+    if query_tokenizer.config.attend_to_mask_tokens:
+        mask[ids == query_tokenizer.mask_token_id] = 1
+
+    return ids, mask
+
+
 class TextEncoder:
     """
     Encapsulates the logic for encoding text chunks and queries into dense vector representations using a specified ColBERT model
     configuration and checkpoint. This class is optimized for batch processing to manage GPU memory usage efficiently.
+
+    Queries can be encoded from several threads at once: the query length is passed per call, and only the
+    tokenization (Hugging Face fast tokenizers are not safe to share between threads) is serialized.
     """
 
-    def __init__(self, config: ColBERTConfig, verbose: Optional[int] = 3) -> None:
+    _backend: BaseEncoderBackend
+
+    def __init__(
+        self,
+        config: ColBERTConfig,
+        verbose: Optional[int] = 3,
+        backend: Optional[str] = "torch",
+        onnx_model_dir: Optional[str] = None,
+        shared_weights: Optional[bool] = False,
+        shared_weights_dir: Optional[str] = None,
+        weights_dtype: Optional[str] = "float32",
+    ) -> None:
         """
         Initializes the ChunkEncoder with a given ColBERT model configuration and checkpoint.
 
         Parameters:
             config (ColBERTConfig): The configuration for the Colbert model.
             verbose (int): The level of logging to use
+            backend (Optional[str]): The inference backend: "torch" (the default), "onnx" for ONNX Runtime,
+                                     or "onnx_int8" for ONNX Runtime with int8 dynamic quantization.
+                                     The ONNX backends run on CPU.
+            onnx_model_dir (Optional[str]): Where the ONNX backends cache the exported model.
+            shared_weights (Optional[bool]): If True, the checkpoint weights are replaced with a read-only
+                                             memory map of a file in `shared_weights_dir`, shared by all
+                                             the processes of the host. Only applies on CPU.
+            shared_weights_dir (Optional[str]): Where the shared weights files are written.
+                                                Defaults to `~/.cache/ragstack_colbert/weights`.
+            weights_dtype (Optional[str]): The dtype of the checkpoint weights on CPU: "float32" (the default),
+                                           "bfloat16" or "float16". Embeddings are returned as float32.
+                                           Only supported by the torch backend.
         """
 
+        if backend not in ENCODER_BACKENDS:
+            raise ValueError(
+                f"Unknown encoder backend {backend}. Expected one of {ENCODER_BACKENDS}."
+            )
+        if weights_dtype not in WEIGHTS_DTYPES:
+            raise ValueError(
+                f"Unknown weights dtype {weights_dtype}. Expected one of {WEIGHTS_DTYPES}."
+            )
+        if backend != "torch" and weights_dtype != "float32":
+            raise ValueError(
+                f"weights_dtype {weights_dtype} is only supported by the torch backend."
+            )
+
         logging.info(f"Cuda enabled GPU available: {torch.cuda.is_available()}")
 
         self._checkpoint = Checkpoint(
@@ -57,6 +158,46 @@ class TextEncoder:
         )
         self._use_cpu = config.total_visible_gpus == 0
 
+        if weights_dtype != "float32":
+            if self._use_cpu:
+                cast_weights(self._checkpoint, weights_dtype)
+            else:
+                logging.warning(
+                    "weights_dtype only applies on CPU, GPUs use mixed precision, ignoring"
+                )
+                weights_dtype = "float32"
+
+        if shared_weights:
+            if self._use_cpu:
+                suffix = "" if weights_dtype == "float32" else f"-{weights_dtype}"
+                share_weights(
+                    self._checkpoint,
+                    path=os.path.join(
+                        shared_weights_dir or DEFAULT_SHARED_WEIGHTS_DIR,
+                        f"{checkpoint_file_name(self._checkpoint)}{suffix}.pt",
+                    ),
+                )
+            else:
+                logging.warning("shared weights are only supported on CPU, ignoring")
+
+        if backend == "torch":
+            self._backend = TorchEncoderBackend(
+                checkpoint=self._checkpoint, use_cpu=self._use_cpu
+            )
+        else:
+            self._backend = OnnxEncoderBackend(
+                checkpoint=self._checkpoint,
+                quantize=backend == "onnx_int8",
+                model_dir=onnx_model_dir,
+            )
+
+        self._query_tokenizer_lock = threading.Lock()
+        register_after_fork(self, TextEncoder._reinit_after_fork)
+
+    def _reinit_after_fork(self) -> None:
+        # the lock may have been held by another thread of the parent at the time of the fork
+        self._query_tokenizer_lock = threading.Lock()
+
     def encode_chunks(self, chunks: List[Chunk], batch_size: int = 640) -> List[Chunk]:
         """
         Encodes a list of chunks into embeddings, processing in batches to efficiently manage memory.
@@ -76,15 +217,8 @@ class TextEncoder:
         if len(chunks) == 0:
             return embedded_chunks
 
-        with torch.inference_mode():
-            texts = [chunk.text for chunk in chunks]
-
-            embeddings, counts = self._checkpoint.docFromText(
-                texts,
-                bsize=batch_size,
-                to_cpu=self._use_cpu,
-                keep_dims="flatten",
-            )
+        texts = [chunk.text for chunk in chunks]
+        embeddings, counts = self._backend.encode_docs(texts, batch_size=batch_size)
 
         start_idx = 0
         for index, chunk in enumerate(chunks):
@@ -102,21 +236,60 @@ class TextEncoder:
     def encode_query(
         self, text: str, query_maxlen: int, full_length_search: Optional[bool] = False
     ) -> Embedding:
-        if query_maxlen < 0:
-            tokens = self._checkpoint.query_tokenizer.tokenize([text])
-            query_maxlen = calculate_query_maxlen(tokens)
-            logging.debug(f"Calculated dynamic query_maxlen of {query_maxlen}")
-
-        prev_query_maxlen = self._checkpoint.query_tokenizer.query_maxlen
-        self._checkpoint.query_tokenizer.query_maxlen = query_maxlen
-
-        with torch.inference_mode():
-            query_embedding = self._checkpoint.queryFromText(
-                queries=[text],
-                to_cpu=self._use_cpu,
-                full_length_search=full_length_search,
-            )
+        return self.encode_queries(
+            texts=[text], query_maxlen=query_maxlen, full_length_search=full_length_search
+        )[0]
+
+    def encode_queries(
+        self,
+        texts: List[str],
+        query_maxlen: int,
+        full_length_search: Optional[bool] = False,
+    ) -> List[Embedding]:
+        """
+        Encodes several queries, with one forward pass per distinct query length. Each query is encoded
+        exactly as `encode_query` would encode it alone.
 
-        self._checkpoint.query_tokenizer.query_maxlen = prev_query_maxlen
+        Parameters:
+            texts (List[str]): The query texts to encode.
+            query_maxlen (int): The number of tokens of each query embedding. If -1, it is calculated for
+                                each query from its own length.
+            full_length_search (Optional[bool]): Indicates whether to encode the queries for a full-length search.
 
-        return query_embedding.tolist()[0]
+        Returns:
+            List[Embedding]: The query embeddings, in the order of the input list.
+        """
+        query_tokenizer = self._checkpoint.query_tokenizer
+        tensorized: List[Tuple[torch.Tensor, torch.Tensor]] = []
+        with self._query_tokenizer_lock:
+            for text in texts:
+                text_query_maxlen = query_maxlen
+                if text_query_maxlen < 0:
+                    tokens = query_tokenizer.tokenize([text])
+                    text_query_maxlen = calculate_query_maxlen(tokens)
+                    logging.debug(
+                        f"Calculated dynamic query_maxlen of {text_query_maxlen}"
+                    )
+
+                tensorized.append(
+                    tensorize_queries(
+                        query_tokenizer,
+                        [text],
+                        query_maxlen=text_query_maxlen,
+                        full_length_search=full_length_search,
+                    )
+                )
+
+        groups: Dict[int, List[int]] = {}
+        for index, (input_ids, _) in enumerate(tensorized):
+            groups.setdefault(input_ids.shape[1], []).append(index)
+
+        embeddings: List[Embedding] = [[] for _ in texts]
+        for indices in groups.values():
+            input_ids = torch.cat([tensorized[i][0] for i in indices])
+            attention_mask = torch.cat([tensorized[i][1] for i in indices])
+            output = self._backend.encode_queries(input_ids, attention_mask)
+            for index, embedding in zip(indices, output.tolist()):
+                embeddings[index] = embedding
+
+        return embeddings
@@ -0,0 +1,99 @@
+"""
+This module supports running the ColBERT checkpoint with reduced-precision weights on CPU.
+
+Casting the weights to bfloat16 (or float16) halves the memory of the model, and speeds up inference
+on CPUs with native support for the type (for bfloat16: AVX512-BF16 or AMX). The embeddings are still
+returned as float32. `validate_weights_dtype` measures how close the reduced-precision embeddings are to
+float32 ones before a dtype is adopted.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import torch
+
+from .base_embedding_model import BaseEmbeddingModel
+from .objects import Embedding
+
+WEIGHTS_DTYPES = ("float32", "bfloat16", "float16")
+
+
+def is_natively_supported(weights_dtype: str) -> bool:
+    """
+    Returns whether the CPU has native support for matrix multiplications in the given dtype.
+    """
+    try:
+        if weights_dtype == "bfloat16":
+            return torch.ops.mkldnn._is_mkldnn_bf16_supported()
+        if weights_dtype == "float16":
+            return torch.ops.mkldnn._is_mkldnn_fp16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+    return True
+
+
+def cast_weights(module: torch.nn.Module, weights_dtype: str) -> torch.nn.Module:
+    """
+    Casts the floating point weights of a module to the given dtype, in place.
+
+    Parameters:
+        module (torch.nn.Module): The module to cast.
+        weights_dtype (str): One of "float32", "bfloat16" or "float16".
+
+    Returns:
+        torch.nn.Module: The module.
+    """
+    if weights_dtype not in WEIGHTS_DTYPES:
+        raise ValueError(
+            f"Unknown weights dtype {weights_dtype}. Expected one of {WEIGHTS_DTYPES}."
+        )
+
+    if weights_dtype != "float32" and not is_natively_supported(weights_dtype):
+        logging.warning(
+            f"this CPU has no native {weights_dtype} support, inference may be slower than float32"
+        )
+    return module.to(getattr(torch, weights_dtype))
+
+
+def validate_weights_dtype(
+    embedding_model: BaseEmbeddingModel,
+    texts: List[str],
+    reference_embeddings: Optional[List[Embedding]] = None,
+    reference_model: Optional[BaseEmbeddingModel] = None,
+) -> Dict[str, float]:
+    """
+    Compares the token embeddings of a reduced-precision model with float32 reference embeddings.
+
+    Parameters:
+        embedding_model (BaseEmbeddingModel): The model to validate.
+        texts (List[str]): The texts to embed.
+        reference_embeddings (Optional[List[Embedding]]): The float32 embeddings of the texts, such as
+                                                          the baseline tensors of the test suite.
+        reference_model (Optional[BaseEmbeddingModel]): A float32 model used to compute the reference
+                                                        embeddings if they are not given.
+
+    Returns:
+        Dict[str, float]: The minimum and mean cosine similarity between matching token embeddings.
+    """
+    if reference_embeddings is None:
+        if reference_model is None:
+            raise ValueError("Either reference_embeddings or reference_model must be given.")
+        reference_embeddings = reference_model.embed_texts(texts)
+
+    embeddings = embedding_model.embed_texts(texts)
+
+    similarities = []
+    for embedding, reference in zip(embeddings, reference_embeddings):
+        embedding = torch.as_tensor(embedding, dtype=torch.float32)
+        reference = torch.as_tensor(reference, dtype=torch.float32)
+        if embedding.shape != reference.shape:
+            raise ValueError(
+                f"Embedding shapes differ: {tuple(embedding.shape)} and {tuple(reference.shape)}"
+            )
+        similarities.append(torch.nn.functional.cosine_similarity(embedding, reference, dim=1))
+
+    similarity = torch.cat(similarities)
+    return {
+        "min_similarity": similarity.min().item(),
+        "mean_similarity": similarity.mean().item(),
+    }
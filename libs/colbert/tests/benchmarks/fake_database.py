@@ -0,0 +1,345 @@
+"""
+An in-memory stand-in for `BaseDatabase` used by the benchmark suite.
+
+Token embeddings are held in a single contiguous tensor so that corpora of millions of tokens
+can be searched on CPU. Every database call sleeps for a configurable latency (plus jitter)
+before answering, which lets the benchmarks reproduce the round-trip profile of a remote
+Cassandra cluster without needing one.
+"""
+
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from ragstack_colbert.base_database import BaseDatabase
+from ragstack_colbert.objects import Chunk, Metadata, Vector
+
+from .synthetic_corpus import SyntheticCorpus
+
+
+class FakeDatabase(BaseDatabase):
+    """
+    An in-memory implementation of `BaseDatabase` with injected latency.
+
+    Each call to the database (one ANN query, one partition read, or one row insert) waits
+    for `latency_ms` plus an exponentially distributed jitter with mean `jitter_ms`. The
+    exponential jitter gives the long right tail that real network round trips have.
+
+    ANN search is exact by default. When `n_lists` is set, tokens are bucketed around
+    `n_lists` randomly sampled centroids (an IVF index) and only the `n_probe` closest buckets
+    are searched, which keeps per-query cost bounded for corpora of millions of tokens.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        seed: int = 42,
+    ):
+        """
+        Initializes an empty fake database.
+
+        Parameters:
+            latency_ms (float): Fixed latency added to every database call, in milliseconds.
+            jitter_ms (float): Mean of the exponential jitter added to every call, in milliseconds.
+            n_lists (Optional[int]): Number of IVF buckets. If None, ANN search is exact.
+            n_probe (int): Number of IVF buckets searched per query when `n_lists` is set.
+            seed (int): Seed for the latency and centroid random generators.
+        """
+        self._latency = latency_ms / 1000.0
+        self._jitter = jitter_ms / 1000.0
+        self._n_lists = n_lists
+        self._n_probe = n_probe
+        self._random = random.Random(seed)
+        self._generator = torch.Generator().manual_seed(seed)
+
+        self._texts: Dict[Tuple[str, int], str] = {}
+        self._metadata: Dict[Tuple[str, int], Metadata] = {}
+        self._pending: Dict[Tuple[str, int], List[Vector]] = {}
+
+        self._keys: List[Tuple[str, int]] = []
+        self._key_index: Dict[Tuple[str, int], int] = {}
+        self._embeddings = torch.empty((0, 0))
+        self._offsets = torch.zeros(1, dtype=torch.long)
+        self._token_owner = torch.empty(0, dtype=torch.long)
+        self._lists: Optional[List[torch.Tensor]] = None
+        self._centroids: Optional[torch.Tensor] = None
+
+        self.calls = 0
+
+    def _delay(self) -> float:
+        self.calls += 1
+        delay = self._latency
+        if self._jitter > 0:
+            delay += self._random.expovariate(1.0 / self._jitter)
+        return delay
+
+    def _sleep(self) -> None:
+        delay = self._delay()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def _asleep(self) -> None:
+        delay = self._delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def load_corpus(self, corpus: SyntheticCorpus) -> None:
+        """
+        Bulk loads a synthetic corpus without any injected latency, replacing any existing data.
+        """
+        self._texts = {key: f"synthetic chunk {key[0]}/{key[1]}" for key in corpus.keys}
+        self._metadata = {key: {} for key in corpus.keys}
+        self._set_embeddings(
+            keys=list(corpus.keys),
+            embeddings=corpus.embeddings,
+            offsets=corpus.offsets,
+        )
+
+    def _set_embeddings(
+        self,
+        keys: List[Tuple[str, int]],
+        embeddings: torch.Tensor,
+        offsets: torch.Tensor,
+    ) -> None:
+        self._keys = keys
+        self._key_index = {key: index for index, key in enumerate(keys)}
+        self._embeddings = embeddings.contiguous()
+        self._offsets = offsets
+        lengths = offsets[1:] - offsets[:-1]
+        self._token_owner = torch.repeat_interleave(torch.arange(len(keys)), lengths)
+        self._build_lists()
+
+    def _build_lists(self) -> None:
+        self._lists = None
+        self._centroids = None
+        num_tokens = self._embeddings.shape[0]
+        if self._n_lists is None or num_tokens <= self._n_lists:
+            return
+
+        sample = torch.randperm(num_tokens, generator=self._generator)[: self._n_lists]
+        self._centroids = self._embeddings[sample].clone()
+
+        assignments = torch.empty(num_tokens, dtype=torch.long)
+        for start in range(0, num_tokens, 65536):
+            block = self._embeddings[start : start + 65536]
+            assignments[start : start + 65536] = torch.argmax(
+                block @ self._centroids.T, dim=1
+            )
+
+        order = torch.argsort(assignments, stable=True)
+        counts = torch.bincount(assignments, minlength=self._n_lists)
+        self._lists = list(torch.split(order, counts.tolist()))
+
+    def _commit_pending(self) -> None:
+        """
+        Folds chunks inserted through `add_chunks`/`aadd_chunks` into the search tensors.
+        """
+        if not self._pending:
+            return
+
+        dim = next(
+            (len(vectors[0]) for vectors in self._pending.values() if vectors),
+            self._embeddings.shape[1],
+        )
+        keys = [key for key in self._keys if key not in self._pending]
+        tensors = [self._chunk_tensor(key) for key in keys]
+        for key, vectors in self._pending.items():
+            keys.append(key)
+            tensors.append(torch.tensor(vectors, dtype=torch.float32).reshape(-1, dim))
+        self._pending = {}
+
+        lengths = torch.tensor([t.shape[0] for t in tensors], dtype=torch.long)
+        offsets = torch.zeros(len(keys) + 1, dtype=torch.long)
+        offsets[1:] = torch.cumsum(lengths, dim=0)
+        self._set_embeddings(keys=keys, embeddings=torch.cat(tensors), offsets=offsets)
+
+    def _chunk_tensor(self, key: Tuple[str, int]) -> torch.Tensor:
+        index = self._key_index[key]
+        return self._embeddings[self._offsets[index] : self._offsets[index + 1]]
+
+    def _matches(self, key: Tuple[str, int], metadata_filter: Optional[Metadata]) -> bool:
+        if not metadata_filter:
+            return True
+        metadata = self._metadata.get(key, {})
+        return all(metadata.get(k) == v for k, v in metadata_filter.items())
+
+    def _put_text(self, chunk: Chunk) -> None:
+        key = (chunk.doc_id, chunk.chunk_id)
+        self._texts[key] = chunk.text
+        self._metadata[key] = chunk.metadata
+        self._pending.setdefault(key, [])
+
+    def _put_vector(self, chunk: Chunk, vector: Vector) -> None:
+        self._pending.setdefault((chunk.doc_id, chunk.chunk_id), []).append(vector)
+
+    def add_chunks(self, chunks: List[Chunk]) -> List[Tuple[str, int]]:
+        """
+        Stores a list of embedded text chunks, paying one round trip per row like
+        `CassandraDatabase` does.
+        """
+        for chunk in chunks:
+            self._sleep()
+            self._put_text(chunk)
+            for vector in chunk.embedding:
+                self._sleep()
+                self._put_vector(chunk, vector)
+        return [(chunk.doc_id, chunk.chunk_id) for chunk in chunks]
+
+    async def aadd_chunks(
+        self, chunks: List[Chunk], concurrent_inserts: Optional[int] = 100
+    ) -> List[Tuple[str, int]]:
+        """
+        Stores a list of embedded text chunks, paying one round trip per row with at most
+        `concurrent_inserts` round trips in flight.
+        """
+        semaphore = asyncio.Semaphore(concurrent_inserts)
+
+        async def _limited(put, *args) -> None:
+            async with semaphore:
+                await self._asleep()
+                put(*args)
+
+        tasks = []
+        for chunk in chunks:
+            tasks.append(_limited(self._put_text, chunk))
+            for vector in chunk.embedding:
+                tasks.append(_limited(self._put_vector, chunk, vector))
+        await asyncio.gather(*tasks)
+
+        return [(chunk.doc_id, chunk.chunk_id) for chunk in chunks]
+
+    def _delete(self, doc_ids: List[str]) -> None:
+        self._commit_pending()
+        doc_id_set = set(doc_ids)
+        for key in [key for key in self._texts if key[0] in doc_id_set]:
+            self._texts.pop(key)
+            self._metadata.pop(key)
+
+        keys = [key for key in self._keys if key[0] not in doc_id_set]
+        if len(keys) == len(self._keys):
+            return
+        tensors = [self._chunk_tensor(key) for key in keys]
+        self._pending = {key: tensor.tolist() for key, tensor in zip(keys, tensors)}
+        self._keys = []
+        self._key_index = {}
+        self._commit_pending()
+
+    def delete_chunks(self, doc_ids: List[str]) -> bool:
+        """
+        Deletes chunks based on their document id, paying one round trip per document.
+        """
+        for _ in doc_ids:
+            self._sleep()
+        self._delete(doc_ids)
+        return True
+
+    async def adelete_chunks(
+        self, doc_ids: List[str], concurrent_deletes: Optional[int] = 100
+    ) -> bool:
+        """
+        Deletes chunks based on their document id, paying one round trip per document.
+        """
+        await asyncio.gather(*[self._asleep() for _ in doc_ids])
+        self._delete(doc_ids)
+        return True
+
+    async def search_relevant_chunks(
+        self, vector: Vector, n: int, metadata_filter: Optional[Metadata] = None
+    ) -> List[Chunk]:
+        """
+        Retrieves 'n' ANN results for an embedded token vector, restricted to the chunks
+        matching `metadata_filter` if set.
+
+        Returns:
+            A list of Chunks with only `doc_id` and `chunk_id` set.
+            Fewer than 'n' results may be returned.
+        """
+        await self._asleep()
+        self._commit_pending()
+        if len(self._keys) == 0:
+            return []
+
+        query = torch.tensor(vector, dtype=torch.float32)
+        if self._lists is None:
+            candidates = None
+            scores = self._embeddings @ query
+        else:
+            probes = torch.topk(self._centroids @ query, k=self._n_probe).indices
+            candidates = torch.cat([self._lists[p] for p in probes.tolist()])
+            scores = self._embeddings[candidates] @ query
+
+        if metadata_filter:
+            allowed = torch.tensor(
+                [self._matches(key, metadata_filter) for key in self._keys]
+            )
+            tokens = self._token_owner if candidates is None else self._token_owner[candidates]
+            scores = scores.masked_fill(~allowed[tokens], float("-inf"))
+
+        top = torch.topk(scores, k=min(n, scores.shape[0]))
+        top = top.indices[top.values > float("-inf")]
+        if candidates is not None:
+            top = candidates[top]
+
+        owners = set(self._token_owner[top].tolist())
+        return [
+            Chunk(doc_id=self._keys[owner][0], chunk_id=self._keys[owner][1])
+            for owner in owners
+        ]
+
+    async def get_chunk_embedding(
+        self, doc_id: str, chunk_id: int, metadata_filter: Optional[Metadata] = None
+    ) -> Chunk:
+        """
+        Retrieve the embedding data for a chunk. The embedding is empty if the chunk does not
+        match `metadata_filter`.
+
+        Returns:
+            A chunk with `doc_id`, `chunk_id`, and `embedding` set.
+        """
+        await self._asleep()
+        self._commit_pending()
+        if not self._matches((doc_id, chunk_id), metadata_filter):
+            return Chunk(doc_id=doc_id, chunk_id=chunk_id, embedding=[])
+        embedding = self._chunk_tensor((doc_id, chunk_id)).tolist()
+        return Chunk(doc_id=doc_id, chunk_id=chunk_id, embedding=embedding)
+
+    async def get_chunk_data(
+        self,
+        doc_id: str,
+        chunk_id: int,
+        include_embedding: Optional[bool] = False,
+        metadata_filter: Optional[Metadata] = None,
+    ) -> Optional[Chunk]:
+        """
+        Retrieve the text and metadata for a chunk, or None if it does not match `metadata_filter`.
+
+        Returns:
+            A chunk with `doc_id`, `chunk_id`, `text`, `metadata`, and optionally `embedding` set.
+        """
+        await self._asleep()
+        key = (doc_id, chunk_id)
+        if not self._matches(key, metadata_filter):
+            return None
+
+        embedding = None
+        if include_embedding is True:
+            embedding = (await self.get_chunk_embedding(doc_id, chunk_id)).embedding
+
+        return Chunk(
+            doc_id=doc_id,
+            chunk_id=chunk_id,
+            text=self._texts[key],
+            metadata=self._metadata[key],
+            embedding=embedding,
+        )
+
+    def close(self) -> None:
+        """
+        Cleans up any open resources.
+        """
+        pass
@@ -0,0 +1,318 @@
+"""
+Reproducible, offline CPU benchmarks for ragstack_colbert retrieval.
+
+Synthetic token-embedding corpora are loaded into a `FakeDatabase` with injected latency and
+jitter, then the `ColbertRetriever` is exercised across its knobs. Results are written as
+JSON so that runs can be compared to track regressions.
+
+Usage (from `libs/colbert`):
+
+    python -m tests.benchmarks.run_benchmarks \
+        --corpus-tokens 10000 100000 1000000 \
+        --query-tokens 16 32 --k 5 10 \
+        --latency-ms 2 --jitter-ms 1 \
+        --output benchmark_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import torch
+from ragstack_colbert.colbert_retriever import ColbertRetriever
+
+from .fake_database import FakeDatabase
+from .synthetic_corpus import (
+    SyntheticEmbeddingModel,
+    generate_corpus,
+    generate_queries,
+)
+
+RESULTS_SCHEMA_VERSION = 1
+
+
+@dataclass
+class BenchmarkConfig:
+    corpus_tokens: List[int] = field(default_factory=lambda: [10_000, 100_000])
+    query_tokens: List[int] = field(default_factory=lambda: [32])
+    k: List[int] = field(default_factory=lambda: [5, 10])
+    num_queries: int = 50
+    warmup_queries: int = 5
+    tokens_per_chunk: int = 200
+    latency_ms: float = 1.0
+    jitter_ms: float = 0.5
+    ivf_threshold: int = 1_000_000
+    n_probe: int = 8
+    ingest_chunks: int = 50
+    concurrent_inserts: int = 100
+    num_threads: Optional[int] = None
+    scoring_precision: Optional[str] = None
+    scoring_shards: int = 1
+    seed: int = 42
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarizes samples with nearest-rank percentiles.
+    """
+    if len(samples) == 0:
+        return {}
+
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "min": ordered[0],
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "max": ordered[-1],
+    }
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+async def _bench_search(
+    retriever: ColbertRetriever,
+    queries: List,
+    k: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    for query_embedding, _ in queries[:warmup]:
+        await retriever.aembedding_search(query_embedding=query_embedding, k=k)
+
+    latencies = []
+    hits = 0
+    for query_embedding, target in queries:
+        start = time.perf_counter()
+        results = await retriever.aembedding_search(query_embedding=query_embedding, k=k)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        if any((chunk.doc_id, chunk.chunk_id) == target for chunk, _ in results):
+            hits += 1
+
+    return {
+        "latency_ms": percentiles(latencies),
+        "recall_at_k": hits / len(queries),
+        "qps": len(queries) / (sum(latencies) / 1000.0),
+    }
+
+
+async def _bench_scoring(retriever: ColbertRetriever, queries: List) -> Dict[str, Any]:
+    """
+    Times `ColbertRetriever._score_chunks` in isolation on the real candidate sets.
+    """
+    per_query = []
+    per_candidate = []
+    candidates = []
+    top_k = None
+    for query_embedding, _ in queries:
+        top_k = max(len(query_embedding) // 2, 16)
+        relevant = await retriever._query_relevant_chunks(
+            query_embedding=query_embedding, top_k=top_k
+        )
+        chunk_embeddings = await retriever._get_chunk_embeddings(chunks=relevant)
+
+        start = time.perf_counter()
+        retriever._score_chunks(
+            query_embedding=query_embedding, chunk_embeddings=chunk_embeddings
+        )
+        elapsed = (time.perf_counter() - start) * 1000.0
+
+        per_query.append(elapsed)
+        per_candidate.append(elapsed / max(1, len(chunk_embeddings)))
+        candidates.append(len(chunk_embeddings))
+
+    return {
+        "top_k_per_token": top_k,
+        "mean_candidates": sum(candidates) / len(candidates),
+        "scoring_ms": percentiles(per_query),
+        "scoring_ms_per_candidate": percentiles(per_candidate),
+    }
+
+
+async def _bench_ingest(config: BenchmarkConfig, corpus) -> Dict[str, Any]:
+    database = FakeDatabase(
+        latency_ms=config.latency_ms, jitter_ms=config.jitter_ms, seed=config.seed
+    )
+    chunks = corpus.to_chunks(limit=config.ingest_chunks)
+    num_tokens = sum(len(chunk.embedding) for chunk in chunks)
+
+    start = time.perf_counter()
+    await database.aadd_chunks(chunks, concurrent_inserts=config.concurrent_inserts)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "chunks": len(chunks),
+        "tokens": num_tokens,
+        "round_trips": database.calls,
+        "seconds": elapsed,
+        "chunks_per_second": len(chunks) / elapsed,
+        "tokens_per_second": num_tokens / elapsed,
+    }
+
+
+async def run_benchmarks(config: BenchmarkConfig) -> Dict[str, Any]:
+    """
+    Runs the benchmark matrix described by `config` and returns the results as a dict.
+    """
+    if config.num_threads is not None:
+        torch.set_num_threads(config.num_threads)
+
+    results: List[Dict[str, Any]] = []
+
+    for corpus_tokens in config.corpus_tokens:
+        start = time.perf_counter()
+        corpus = generate_corpus(
+            num_tokens=corpus_tokens,
+            tokens_per_chunk=config.tokens_per_chunk,
+            seed=config.seed,
+        )
+        logging.info(
+            f"generated {corpus.num_tokens} tokens in {corpus.num_chunks} chunks "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        common = {"corpus_tokens": corpus.num_tokens, "corpus_chunks": corpus.num_chunks}
+
+        ingest = await _bench_ingest(config=config, corpus=corpus)
+        results.append({"benchmark": "ingest", **common, **ingest})
+
+        n_lists = None
+        if corpus.num_tokens >= config.ivf_threshold:
+            n_lists = int(corpus.num_tokens**0.5)
+        database = FakeDatabase(
+            latency_ms=config.latency_ms,
+            jitter_ms=config.jitter_ms,
+            n_lists=n_lists,
+            n_probe=config.n_probe,
+            seed=config.seed,
+        )
+        database.load_corpus(corpus)
+        retriever = ColbertRetriever(
+            database=database,
+            embedding_model=SyntheticEmbeddingModel(),
+            scoring_precision=config.scoring_precision,
+            scoring_shards=config.scoring_shards,
+        )
+
+        for query_tokens in config.query_tokens:
+            queries = generate_queries(
+                corpus=corpus,
+                num_queries=config.num_queries,
+                query_tokens=query_tokens,
+                seed=config.seed + query_tokens,
+            )
+
+            scoring = await _bench_scoring(retriever=retriever, queries=queries)
+            results.append(
+                {
+                    "benchmark": "scoring",
+                    **common,
+                    "query_tokens": query_tokens,
+                    "scoring_precision": retriever.scoring_precision,
+                    **scoring,
+                }
+            )
+
+            for k in config.k:
+                calls_before = database.calls
+                search = await _bench_search(
+                    retriever=retriever,
+                    queries=queries,
+                    k=k,
+                    warmup=config.warmup_queries,
+                )
+                round_trips = database.calls - calls_before
+                results.append(
+                    {
+                        "benchmark": "search",
+                        **common,
+                        "query_tokens": query_tokens,
+                        "k": k,
+                        "scoring_precision": retriever.scoring_precision,
+                        "ann": "exact" if n_lists is None else f"ivf{n_lists}",
+                        "round_trips_per_query": round_trips
+                        / (len(queries) + min(config.warmup_queries, len(queries))),
+                        **search,
+                    }
+                )
+
+    return {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "environment": environment(),
+        "config": asdict(config),
+        "results": results,
+    }
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> Tuple[BenchmarkConfig, Optional[str]]:
+    defaults = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--corpus-tokens", type=int, nargs="+", default=defaults.corpus_tokens)
+    parser.add_argument("--query-tokens", type=int, nargs="+", default=defaults.query_tokens)
+    parser.add_argument("--k", type=int, nargs="+", default=defaults.k)
+    parser.add_argument("--num-queries", type=int, default=defaults.num_queries)
+    parser.add_argument("--warmup-queries", type=int, default=defaults.warmup_queries)
+    parser.add_argument("--tokens-per-chunk", type=int, default=defaults.tokens_per_chunk)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument(
+        "--ivf-threshold",
+        type=int,
+        default=defaults.ivf_threshold,
+        help="corpora with at least this many tokens use an IVF index instead of exact search",
+    )
+    parser.add_argument("--n-probe", type=int, default=defaults.n_probe)
+    parser.add_argument("--ingest-chunks", type=int, default=defaults.ingest_chunks)
+    parser.add_argument("--concurrent-inserts", type=int, default=defaults.concurrent_inserts)
+    parser.add_argument("--num-threads", type=int, default=defaults.num_threads)
+    parser.add_argument(
+        "--scoring-precision",
+        type=str,
+        default=defaults.scoring_precision,
+        help="float32, bfloat16, float16, int8 or auto",
+    )
+    parser.add_argument("--scoring-shards", type=int, default=defaults.scoring_shards)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", type=str, default=None, help="path of the JSON results")
+
+    args = vars(parser.parse_args(argv))
+    output = args.pop("output")
+    return BenchmarkConfig(**args), output
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    config, output = _parse_args(argv)
+
+    report = asyncio.run(run_benchmarks(config))
+    serialized = json.dumps(report, indent=2)
+
+    if output is None:
+        print(serialized)
+    else:
+        with open(output, "w") as f:
+            f.write(serialized)
+        logging.info(f"wrote benchmark results to {output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
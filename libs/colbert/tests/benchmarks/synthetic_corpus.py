@@ -0,0 +1,190 @@
+"""
+Generators for synthetic, reproducible ColBERT token-embedding corpora and queries.
+
+Chunks are drawn from a set of random "topics": every token vector of a chunk is its topic
+center plus gaussian noise, normalized to unit length like real ColBERT embeddings. Queries are
+built from noisy copies of the tokens of a known chunk, so every query has a ground-truth answer
+and recall can be measured alongside latency.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import torch
+from ragstack_colbert.base_embedding_model import BaseEmbeddingModel
+from ragstack_colbert.constant import DEFAULT_COLBERT_DIM
+from ragstack_colbert.objects import Chunk, Embedding
+
+
+@dataclass
+class SyntheticCorpus:
+    """
+    A corpus of token embeddings stored as one contiguous tensor.
+
+    The embeddings of chunk `i` are `embeddings[offsets[i]:offsets[i + 1]]`.
+    """
+
+    keys: List[Tuple[str, int]]
+    """(doc_id, chunk_id) of every chunk."""
+
+    embeddings: torch.Tensor
+    """Tensor of shape (num_tokens, dim) holding every token embedding."""
+
+    offsets: torch.Tensor
+    """Tensor of shape (num_chunks + 1,) with the start offset of every chunk."""
+
+    @property
+    def num_tokens(self) -> int:
+        return self.embeddings.shape[0]
+
+    @property
+    def num_chunks(self) -> int:
+        return len(self.keys)
+
+    def chunk_embedding(self, index: int) -> torch.Tensor:
+        return self.embeddings[self.offsets[index] : self.offsets[index + 1]]
+
+    def to_chunks(self, limit: Optional[int] = None) -> List[Chunk]:
+        """
+        Materializes (up to `limit`) chunks as `Chunk` objects, for example to benchmark ingestion.
+        """
+        count = self.num_chunks if limit is None else min(limit, self.num_chunks)
+        return [
+            Chunk(
+                doc_id=self.keys[i][0],
+                chunk_id=self.keys[i][1],
+                text=f"synthetic chunk {self.keys[i][0]}/{self.keys[i][1]}",
+                embedding=self.chunk_embedding(i).tolist(),
+            )
+            for i in range(count)
+        ]
+
+
+def generate_corpus(
+    num_tokens: int,
+    tokens_per_chunk: int = 200,
+    chunks_per_doc: int = 10,
+    num_topics: Optional[int] = None,
+    noise: float = 0.6,
+    dim: int = DEFAULT_COLBERT_DIM,
+    seed: int = 42,
+) -> SyntheticCorpus:
+    """
+    Generates a reproducible corpus of roughly `num_tokens` token embeddings.
+
+    Parameters:
+        num_tokens (int): Approximate total number of token embeddings to generate.
+        tokens_per_chunk (int): Mean number of tokens per chunk. Actual lengths vary
+                                uniformly between half and one and a half times this value.
+        chunks_per_doc (int): Number of chunks sharing the same `doc_id`.
+        num_topics (Optional[int]): Number of topic centers. Defaults to one per 20 chunks.
+        noise (float): Standard deviation of the per-token noise relative to the topic center.
+        dim (int): Dimension of the token embeddings.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        SyntheticCorpus: The generated corpus.
+    """
+    generator = torch.Generator().manual_seed(seed)
+
+    num_chunks = max(1, num_tokens // tokens_per_chunk)
+    lengths = torch.randint(
+        low=max(1, tokens_per_chunk // 2),
+        high=tokens_per_chunk + tokens_per_chunk // 2 + 1,
+        size=(num_chunks,),
+        generator=generator,
+    )
+    offsets = torch.zeros(num_chunks + 1, dtype=torch.long)
+    offsets[1:] = torch.cumsum(lengths, dim=0)
+
+    if num_topics is None:
+        num_topics = max(1, num_chunks // 20)
+    centers = torch.nn.functional.normalize(
+        torch.randn((num_topics, dim), generator=generator), dim=1
+    )
+    chunk_topics = torch.randint(0, num_topics, (num_chunks,), generator=generator)
+    token_topics = torch.repeat_interleave(chunk_topics, lengths)
+
+    # generate in blocks to bound the peak memory of the noise tensor
+    total = int(offsets[-1])
+    embeddings = torch.empty((total, dim), dtype=torch.float32)
+    for start in range(0, total, 1 << 20):
+        end = min(total, start + (1 << 20))
+        block = centers[token_topics[start:end]]
+        block += noise * torch.randn((end - start, dim), generator=generator) / dim**0.5
+        embeddings[start:end] = torch.nn.functional.normalize(block, dim=1)
+
+    keys = [(f"doc_{i // chunks_per_doc}", i % chunks_per_doc) for i in range(num_chunks)]
+
+    return SyntheticCorpus(keys=keys, embeddings=embeddings, offsets=offsets)
+
+
+def generate_queries(
+    corpus: SyntheticCorpus,
+    num_queries: int,
+    query_tokens: int,
+    noise: float = 0.3,
+    seed: int = 7,
+) -> List[Tuple[Embedding, Tuple[str, int]]]:
+    """
+    Generates queries that each target one chunk of the corpus.
+
+    Parameters:
+        corpus (SyntheticCorpus): The corpus to generate queries for.
+        num_queries (int): Number of queries to generate.
+        query_tokens (int): Number of token embeddings per query.
+        noise (float): Standard deviation of the noise added to the sampled chunk tokens.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        A list of (query embedding, (doc_id, chunk_id) of the targeted chunk) tuples.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    dim = corpus.embeddings.shape[1]
+
+    queries = []
+    targets = torch.randint(0, corpus.num_chunks, (num_queries,), generator=generator)
+    for target in targets.tolist():
+        chunk = corpus.chunk_embedding(target)
+        picks = torch.randint(0, chunk.shape[0], (query_tokens,), generator=generator)
+        query = chunk[picks] + noise * torch.randn((query_tokens, dim), generator=generator) / dim**0.5
+        query = torch.nn.functional.normalize(query, dim=1)
+        queries.append((query.tolist(), corpus.keys[target]))
+    return queries
+
+
+class SyntheticEmbeddingModel(BaseEmbeddingModel):
+    """
+    A deterministic stand-in for a ColBERT model that needs no checkpoint.
+
+    Each whitespace-separated word maps to a fixed random unit vector derived from its hash,
+    so identical words in documents and queries produce identical token embeddings.
+    """
+
+    def __init__(self, dim: int = DEFAULT_COLBERT_DIM):
+        self._dim = dim
+
+    def _embed_word(self, word: str) -> List[float]:
+        digest = hashlib.sha256(word.lower().encode("utf-8")).digest()
+        generator = torch.Generator().manual_seed(int.from_bytes(digest[:8], "little"))
+        vector = torch.randn(self._dim, generator=generator)
+        return torch.nn.functional.normalize(vector, dim=0).tolist()
+
+    def _embed(self, text: str) -> Embedding:
+        words = text.split() or [""]
+        return [self._embed_word(word) for word in words]
+
+    def embed_texts(self, texts: List[str]) -> List[Embedding]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(
+        self,
+        query: str,
+        full_length_search: Optional[bool] = False,
+        query_maxlen: Optional[int] = None,
+    ) -> Embedding:
+        embedding = self._embed(query)
+        if query_maxlen is not None and query_maxlen > 0:
+            embedding = embedding[:query_maxlen]
+        return embedding
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+from ragstack_colbert.colbert_retriever import ColbertRetriever
+from ragstack_colbert.objects import Chunk
+
+from .fake_database import FakeDatabase
+from .run_benchmarks import BenchmarkConfig, percentiles, run_benchmarks
+from .synthetic_corpus import (
+    SyntheticEmbeddingModel,
+    generate_corpus,
+    generate_queries,
+)
+
+
+def test_percentiles():
+    stats = percentiles([float(i) for i in range(1, 101)])
+    assert stats["p50"] == 50.0
+    assert stats["p90"] == 90.0
+    assert stats["p99"] == 99.0
+    assert stats["max"] == 100.0
+
+
+def test_corpus_is_reproducible():
+    corpus_1 = generate_corpus(num_tokens=2_000, tokens_per_chunk=50, seed=3)
+    corpus_2 = generate_corpus(num_tokens=2_000, tokens_per_chunk=50, seed=3)
+
+    assert corpus_1.keys == corpus_2.keys
+    assert corpus_1.embeddings.equal(corpus_2.embeddings)
+    assert corpus_1.offsets[-1] == corpus_1.num_tokens
+
+
+def test_fake_database_search_finds_target():
+    corpus = generate_corpus(num_tokens=5_000, tokens_per_chunk=50)
+    database = FakeDatabase()
+    database.load_corpus(corpus)
+    retriever = ColbertRetriever(
+        database=database, embedding_model=SyntheticEmbeddingModel()
+    )
+
+    queries = generate_queries(corpus=corpus, num_queries=3, query_tokens=8)
+    for query_embedding, target in queries:
+        results = asyncio.run(
+            retriever.aembedding_search(query_embedding=query_embedding, k=3)
+        )
+        assert (results[0][0].doc_id, results[0][0].chunk_id) == target
+
+
+def test_fake_database_add_and_delete():
+    database = FakeDatabase(latency_ms=0.1)
+    embedding_model = SyntheticEmbeddingModel(dim=8)
+    texts = ["alpha beta", "gamma delta epsilon"]
+    chunks = [
+        Chunk(doc_id="doc", chunk_id=i, text=text, embedding=embedding)
+        for i, (text, embedding) in enumerate(
+            zip(texts, embedding_model.embed_texts(texts))
+        )
+    ]
+
+    assert asyncio.run(database.aadd_chunks(chunks)) == [("doc", 0), ("doc", 1)]
+    assert database.calls == 7
+
+    found = asyncio.run(
+        database.search_relevant_chunks(vector=embedding_model.embed_query("gamma")[0], n=1)
+    )
+    assert found == [Chunk(doc_id="doc", chunk_id=1)]
+
+    data = asyncio.run(database.get_chunk_data(doc_id="doc", chunk_id=1))
+    assert data.text == "gamma delta epsilon"
+
+    database.delete_chunks(["doc"])
+    assert asyncio.run(database.search_relevant_chunks(vector=[1.0] * 8, n=1)) == []
+
+
+def test_run_benchmarks_smoke():
+    config = BenchmarkConfig(
+        corpus_tokens=[2_000],
+        query_tokens=[8],
+        k=[2],
+        num_queries=2,
+        warmup_queries=1,
+        tokens_per_chunk=50,
+        latency_ms=0.0,
+        jitter_ms=0.0,
+        ingest_chunks=2,
+    )
+    report = asyncio.run(run_benchmarks(config))
+
+    assert {r["benchmark"] for r in report["results"]} == {"ingest", "scoring", "search"}
+    search = next(r for r in report["results"] if r["benchmark"] == "search")
+    assert set(search["latency_ms"]) >= {"p50", "p90", "p99"}
+    # results must be machine readable
+    json.dumps(report)
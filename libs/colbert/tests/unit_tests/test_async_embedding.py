@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+from typing import List, Optional
+
+import ragstack_colbert.text_encoder
+from ragstack_colbert import ColbertEmbeddingModel, ColbertVectorStore
+from ragstack_colbert.objects import Embedding
+from tests.benchmarks.fake_database import FakeDatabase
+from tests.benchmarks.synthetic_corpus import SyntheticEmbeddingModel
+
+
+class SlowEmbeddingModel(SyntheticEmbeddingModel):
+    def embed_query(
+        self, query: str, full_length_search: Optional[bool] = False, query_maxlen: int = -1
+    ) -> Embedding:
+        time.sleep(0.2)
+        return super().embed_query(query, full_length_search, query_maxlen)
+
+
+def test_atext_search_does_not_block_the_event_loop():
+    store = ColbertVectorStore(database=FakeDatabase(), embedding_model=SlowEmbeddingModel(dim=16))
+    retriever = store.as_retriever()
+
+    async def _run():
+        await store.aadd_texts(texts=["arctic plants survive the cold"], doc_id="doc")
+
+        ticks = 0
+
+        async def _tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(_tick())
+        results = await retriever.atext_search("arctic plants", k=1)
+        ticker.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(_run())
+    assert [chunk.doc_id for chunk, _ in results] == ["doc"]
+    assert ticks > 5
+
+
+class ThreadRecordingTextEncoder:
+    def __init__(self, config, **kwargs):
+        self.threads: List[str] = []
+
+    def encode_query(self, text, query_maxlen, full_length_search=False):
+        self.threads.append(threading.current_thread().name)
+        return [[1.0, 0.0]]
+
+    def encode_chunks(self, chunks, batch_size=640):
+        self.threads.append(threading.current_thread().name)
+        for chunk in chunks:
+            chunk.embedding = [[0.0, 1.0]]
+        return chunks
+
+
+def test_async_methods_use_dedicated_executor(monkeypatch):
+    monkeypatch.setattr(ragstack_colbert.text_encoder, "TextEncoder", ThreadRecordingTextEncoder)
+    model = ColbertEmbeddingModel(async_workers=1)
+
+    async def _run():
+        return await asyncio.gather(model.aembed_query("query"), model.aembed_texts(["text"]))
+
+    query_embedding, text_embeddings = asyncio.run(_run())
+    model.close()
+
+    assert query_embedding == [[1.0, 0.0]]
+    assert text_embeddings == [[[0.0, 1.0]]]
+    assert len(model._encoder.threads) == 2
+    assert all(name.startswith("colbert-embedding") for name in model._encoder.threads)
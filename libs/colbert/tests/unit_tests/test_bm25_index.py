@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from ragstack_colbert import BM25Index, Chunk, ColbertVectorStore
+from ragstack_colbert.bm25_index import tokenize
+from tests.benchmarks.fake_database import FakeDatabase
+from tests.benchmarks.synthetic_corpus import SyntheticEmbeddingModel
+
+TEXTS = [
+    "the nebula_voyager probe left the solar system in the year of the comet",
+    "the probe of the year was a deep sea submarine",
+    "the the the the the the the the the the",
+    "marine animals of the deep sea",
+]
+
+
+def _build_index() -> BM25Index:
+    index = BM25Index()
+    store = ColbertVectorStore(
+        database=FakeDatabase(),
+        embedding_model=SyntheticEmbeddingModel(dim=8),
+        lexical_index=index,
+    )
+    store.add_texts(texts=TEXTS, doc_id="doc")
+    return index
+
+
+def test_tokenize():
+    assert tokenize("The Nebula_Voyager, launched 2031!") == [
+        "the",
+        "nebula_voyager",
+        "launched",
+        "2031",
+    ]
+    assert tokenize(None) == []
+
+
+def test_search_ranks_rare_terms_first():
+    index = _build_index()
+
+    results = index.search("what happened to nebula_voyager", k=2)
+    assert [(c.doc_id, c.chunk_id) for c, _ in results] == [("doc", 0)]
+
+    results = index.search("deep sea probe", k=10)
+    assert (results[0][0].doc_id, results[0][0].chunk_id) == ("doc", 1)
+    assert all(c.chunk_id != 2 for c, _ in results)
+
+    assert index.search("unknown words", k=10) == []
+
+
+def test_delete_and_replace():
+    index = _build_index()
+    assert len(index) == 4
+
+    index.add_chunks([Chunk(doc_id="doc", chunk_id=0, text="replaced")])
+    assert index.search("comet", k=10) == []
+    assert len(index) == 4
+
+    index.delete_chunks(["doc"])
+    assert len(index) == 0
+    assert index.search("probe", k=10) == []
+
+
+def test_save_and_load(tmp_path):
+    index = _build_index()
+    path = str(tmp_path / "index.json")
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+    query = "deep sea probe nebula_voyager"
+    assert loaded.search(query, k=10) == index.search(query, k=10)
+
+
+@pytest.mark.parametrize("lexical_mode", ["union", "restrict"])
+def test_retriever_with_lexical_index(lexical_mode: str):
+    database = FakeDatabase()
+    store = ColbertVectorStore(
+        database=database,
+        embedding_model=SyntheticEmbeddingModel(dim=8),
+        lexical_index=BM25Index(),
+    )
+    store.add_texts(texts=TEXTS, doc_id="doc")
+    retriever = store.as_retriever(lexical_mode=lexical_mode, lexical_k=1)
+
+    calls = database.calls
+    results = asyncio.run(retriever.atext_search("nebula_voyager", k=1))
+    assert results[0][0].chunk_id == 0
+    assert results[0][0].text == TEXTS[0]
+
+    # restrict mode skips token ANN: one embedding read and one data read
+    if lexical_mode == "restrict":
+        assert database.calls - calls == 2
+
+    store.delete_chunks(["doc"])
+    assert asyncio.run(retriever.atext_search("nebula_voyager", k=1)) == []
+
+
+def test_only_stored_chunks_are_indexed():
+    class PartialDatabase(FakeDatabase):
+        """Fails to store the last chunk of each insert."""
+
+        def add_chunks(self, chunks):
+            return super().add_chunks(chunks=chunks[:-1])
+
+        async def aadd_chunks(self, chunks, concurrent_inserts=100):
+            return await super().aadd_chunks(
+                chunks=chunks[:-1], concurrent_inserts=concurrent_inserts
+            )
+
+    index = BM25Index()
+    store = ColbertVectorStore(
+        database=PartialDatabase(),
+        embedding_model=SyntheticEmbeddingModel(dim=8),
+        lexical_index=index,
+    )
+    assert store.add_texts(texts=TEXTS, doc_id="doc") == [("doc", i) for i in range(3)]
+    assert asyncio.run(store.aadd_texts(texts=TEXTS[:2], doc_id="other")) == [("other", 0)]
+
+    assert len(index) == 4
+    assert index.search("marine animals", k=10) == []
+    assert [(c.doc_id, c.chunk_id) for c, _ in index.search("submarine", k=10)] == [("doc", 1)]
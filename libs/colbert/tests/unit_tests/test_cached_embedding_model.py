@@ -0,0 +1,112 @@
+import zlib
+from typing import List, Optional
+
+import numpy as np
+import pytest
+import torch
+from ragstack_colbert import CachedEmbeddingModel, ColbertEmbeddingModel
+from ragstack_colbert.base_embedding_model import BaseEmbeddingModel
+from ragstack_colbert.objects import Embedding
+
+
+class CountingEmbeddingModel(BaseEmbeddingModel):
+    """
+    Embeds each word as a fixed random vector, returning float32 tensors like the ColBERT model, and
+    records the embedded texts.
+    """
+
+    def __init__(self):
+        self.embedded: List[str] = []
+
+    def _embed(self, text: str) -> torch.Tensor:
+        vectors = []
+        for word in text.split():
+            generator = torch.Generator().manual_seed(zlib.crc32(word.encode("utf-8")))
+            vectors.append(torch.randn(16, generator=generator))
+        return torch.nn.functional.normalize(torch.stack(vectors), dim=1)
+
+    def embed_texts(self, texts: List[str]) -> List[Embedding]:
+        self.embedded.extend(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(
+        self,
+        query: str,
+        full_length_search: Optional[bool] = False,
+        query_maxlen: int = -1,
+    ) -> Embedding:
+        return self._embed(query)
+
+
+TEXTS = ["arctic plants survive the cold", "desert plants store water", "arctic plants survive the cold"]
+
+
+def test_only_misses_are_encoded(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    model = CountingEmbeddingModel()
+    cached = CachedEmbeddingModel(model, path=path, namespace="synthetic")
+
+    first = cached.embed_texts(TEXTS)
+    assert model.embedded == TEXTS[:2]
+    assert cached.stats == {"hits": 0, "misses": 2, "evictions": 0}
+    cached.close()
+
+    # the cache persists across instances
+    cached = CachedEmbeddingModel(model, path=path, namespace="synthetic")
+    second = cached.embed_texts(TEXTS + ["tundra soil"])
+    assert model.embedded == TEXTS[:2] + ["tundra soil"]
+    assert cached.stats == {"hits": 3, "misses": 1, "evictions": 0}
+
+    for expected, actual in zip(first, second):
+        np.testing.assert_allclose(np.asarray(actual), np.asarray(expected), atol=1e-3)
+
+    # a different namespace does not share entries
+    other = CachedEmbeddingModel(model, path=path, namespace="other")
+    other.embed_texts(TEXTS[:1])
+    assert model.embedded[-1] == TEXTS[0]
+
+    assert torch.equal(cached.embed_query("arctic plants"), model.embed_query("arctic plants"))
+
+
+def test_hits_and_misses_are_the_same(tmp_path):
+    model = CountingEmbeddingModel()
+    cached = CachedEmbeddingModel(model, path=str(tmp_path / "cache.sqlite"), namespace="synthetic")
+
+    (miss,) = cached.embed_texts(TEXTS[:1])
+    (hit,) = cached.embed_texts(TEXTS[:1])
+    assert cached.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+    assert type(miss) is type(hit) is list
+    assert miss == hit
+    # rounded to float16
+    np.testing.assert_allclose(np.asarray(miss), model.embed_texts(TEXTS[:1])[0], atol=1e-3)
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    model = CountingEmbeddingModel()
+    texts = [f"text {i}" for i in range(4)]
+    entry_bytes = len(model.embed_texts(texts[:1])[0]) * 16 * 2
+    model.embedded.clear()
+
+    cached = CachedEmbeddingModel(
+        model, path=str(tmp_path / "cache.sqlite"), namespace="synthetic", max_bytes=3 * entry_bytes
+    )
+    cached.embed_texts(texts[:3])
+    cached.embed_texts(texts[:1])
+    cached.embed_texts(texts[3:])
+    assert cached.stats["evictions"] == 1
+
+    model.embedded.clear()
+    cached.embed_texts(texts)
+    assert model.embedded == ["text 1"]
+
+
+def test_namespace(tmp_path):
+    model = ColbertEmbeddingModel(checkpoint="some/checkpoint", doc_maxlen=100)
+    assert model.cache_namespace == (
+        "some/checkpoint|doc_maxlen=100|backend=torch|weights_dtype=float32"
+    )
+    assert not model.is_loaded
+
+    with pytest.raises(ValueError):
+        CachedEmbeddingModel(CountingEmbeddingModel(), path=str(tmp_path / "cache.sqlite"))
@@ -0,0 +1,88 @@
+from typing import List
+
+import pytest
+import torch
+from ragstack_colbert import ColbertEmbeddingModel, Embedding
+from ragstack_colbert.constant import DEFAULT_COLBERT_MODEL
+from ragstack_colbert.encoder_backend import _ColbertEncoderModule, export_onnx_model
+from torch.nn.functional import cosine_similarity
+
+from .baseline_tensors import baseline_tensors
+from .test_colbert_baseline_embeddings import arctic_botany_chunks
+
+onnxruntime = pytest.importorskip("onnxruntime")
+
+
+def _token_similarities(embeddings: List[Embedding]) -> torch.Tensor:
+    vectors = torch.tensor([vector for embedding in embeddings for vector in embedding])
+    assert vectors.shape[0] == len(baseline_tensors)
+    return cosine_similarity(vectors, torch.stack(baseline_tensors), dim=1)
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_onnx_export_parity(tmp_path, quantize: bool):
+    from transformers import BertConfig, BertModel
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=100,
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+    )
+    bert = BertModel(config).eval()
+    linear = torch.nn.Linear(32, 8, bias=False)
+
+    path = export_onnx_model(
+        bert=bert, linear=linear, path=str(tmp_path / "model.onnx"), quantize=quantize
+    )
+    session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+    # dynamic batch and sequence dimensions, with padding
+    input_ids = torch.randint(0, 100, (3, 11))
+    attention_mask = torch.ones_like(input_ids)
+    attention_mask[0, 7:] = 0
+
+    (output,) = session.run(
+        ["embeddings"],
+        {"input_ids": input_ids.numpy(), "attention_mask": attention_mask.numpy()},
+    )
+    with torch.no_grad():
+        expected = _ColbertEncoderModule(bert=bert, linear=linear)(input_ids, attention_mask)
+
+    similarity = cosine_similarity(torch.from_numpy(output), expected, dim=2)
+    assert similarity.min().item() > (0.99 if quantize else 0.9999)
+
+
+@pytest.mark.parametrize(
+    ("backend", "min_similarity", "mean_similarity"),
+    [("onnx", 0.99, 0.999), ("onnx_int8", 0.8, 0.95)],
+)
+def test_onnx_backend_against_baseline(
+    tmp_path, backend: str, min_similarity: float, mean_similarity: float
+):
+    colbert = ColbertEmbeddingModel(
+        doc_maxlen=220,
+        nbits=2,
+        kmeans_niters=4,
+        checkpoint=DEFAULT_COLBERT_MODEL,
+        encoder_backend=backend,
+        onnx_model_dir=str(tmp_path),
+    )
+
+    similarities = _token_similarities(colbert.embed_texts(arctic_botany_chunks))
+    assert similarities.min().item() > min_similarity
+    assert similarities.mean().item() > mean_similarity
+
+    query = "What adaptations enable Arctic plants to survive in extremely cold temperatures?"
+    torch_query = ColbertEmbeddingModel(checkpoint=DEFAULT_COLBERT_MODEL).embed_query(
+        query=query, query_maxlen=32
+    )
+    onnx_query = colbert.embed_query(query=query, query_maxlen=32)
+    assert len(onnx_query) == 32
+
+    query_similarities = cosine_similarity(
+        torch.tensor(onnx_query), torch.tensor(torch_query), dim=1
+    )
+    assert query_similarities.min().item() > min_similarity
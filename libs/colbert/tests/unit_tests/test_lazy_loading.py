@@ -0,0 +1,63 @@
+import subprocess
+import sys
+
+import ragstack_colbert.text_encoder
+from ragstack_colbert import ColbertEmbeddingModel
+
+
+def test_import_is_lazy():
+    code = (
+        "import sys\n"
+        "import ragstack_colbert\n"
+        "from ragstack_colbert import Chunk, ColbertEmbeddingModel\n"
+        "model = ColbertEmbeddingModel()\n"
+        "assert not model.is_loaded\n"
+        "heavy = [m for m in ('torch', 'colbert', 'cassio') if m in sys.modules]\n"
+        "assert heavy == [], heavy\n"
+        "assert 'colbert_embedding_model' in ragstack_colbert.import_timings()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+class FakeTextEncoder:
+    instances = 0
+
+    def __init__(self, config, **kwargs):
+        FakeTextEncoder.instances += 1
+        self.config = config
+
+    def encode_query(self, text, query_maxlen, full_length_search=False):
+        return [[1.0, 0.0]]
+
+    def encode_chunks(self, chunks, batch_size=640):
+        for chunk in chunks:
+            chunk.embedding = [[0.0, 1.0]]
+        return chunks
+
+
+def test_deferred_load_and_warmup(monkeypatch):
+    monkeypatch.setattr(ragstack_colbert.text_encoder, "TextEncoder", FakeTextEncoder)
+    FakeTextEncoder.instances = 0
+
+    model = ColbertEmbeddingModel(checkpoint="some/checkpoint", doc_maxlen=100)
+    assert not model.is_loaded
+    assert FakeTextEncoder.instances == 0
+
+    timings = model.warmup()
+    assert model.is_loaded
+    assert FakeTextEncoder.instances == 1
+    assert model._encoder.config.checkpoint == "some/checkpoint"
+    assert model._encoder.config.doc_maxlen == 100
+    assert set(timings) == {"import_seconds", "load_seconds", "warmup_seconds"}
+
+    assert model.embed_query("query") == [[1.0, 0.0]]
+    assert FakeTextEncoder.instances == 1
+
+
+def test_eager_load(monkeypatch):
+    monkeypatch.setattr(ragstack_colbert.text_encoder, "TextEncoder", FakeTextEncoder)
+    FakeTextEncoder.instances = 0
+
+    model = ColbertEmbeddingModel(lazy_load=False)
+    assert model.is_loaded
+    assert FakeTextEncoder.instances == 1
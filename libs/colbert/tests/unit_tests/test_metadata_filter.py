@@ -0,0 +1,85 @@
+import asyncio
+
+from ragstack_colbert import BM25Index, ColbertVectorStore
+from tests.benchmarks.fake_database import FakeDatabase
+from tests.benchmarks.synthetic_corpus import SyntheticEmbeddingModel
+
+TEXTS = [
+    "quarterly revenue report for the sales team",
+    "quarterly revenue report for the marketing team",
+    "holiday schedule for the engineering team",
+]
+
+
+def _build_store(lexical_index=None):
+    store = ColbertVectorStore(
+        database=FakeDatabase(),
+        embedding_model=SyntheticEmbeddingModel(dim=16),
+        lexical_index=lexical_index,
+    )
+    for tenant in ["acme", "globex"]:
+        store.add_texts(
+            texts=TEXTS,
+            metadatas=[{"tenant": tenant}] * len(TEXTS),
+            doc_id=f"doc_{tenant}",
+        )
+    return store
+
+
+def test_search_with_metadata_filter():
+    retriever = _build_store().as_retriever()
+
+    unfiltered = asyncio.run(retriever.atext_search("quarterly revenue report", k=4))
+    assert {chunk.metadata["tenant"] for chunk, _ in unfiltered} == {"acme", "globex"}
+
+    results = asyncio.run(
+        retriever.atext_search(
+            "quarterly revenue report", k=4, metadata_filter={"tenant": "acme"}
+        )
+    )
+    assert len(results) == 3
+    assert all(chunk.metadata == {"tenant": "acme"} for chunk, _ in results)
+    assert results[0][0].chunk_id in (0, 1)
+
+    results = retriever.text_search(
+        "quarterly revenue report", k=4, metadata_filter={"tenant": "initech"}
+    )
+    assert results == []
+
+
+def test_metadata_filter_applies_to_lexical_candidates():
+    retriever = _build_store(lexical_index=BM25Index()).as_retriever(
+        lexical_mode="restrict"
+    )
+
+    chunk_scores = {}
+    score_chunks = retriever._score_chunks
+
+    def _spy(query_embedding, chunk_embeddings):
+        scores = score_chunks(query_embedding, chunk_embeddings)
+        chunk_scores.update(scores)
+        return scores
+
+    retriever._score_chunks = _spy
+
+    results = asyncio.run(
+        retriever.atext_search("holiday schedule", k=2, metadata_filter={"tenant": "globex"})
+    )
+    assert [(chunk.doc_id, chunk.chunk_id) for chunk, _ in results] == [("doc_globex", 2)]
+    assert all(chunk.doc_id == "doc_globex" for chunk in chunk_scores)
+
+
+def test_restrict_falls_back_to_token_ann_outside_of_lexical_matches():
+    store = _build_store(lexical_index=BM25Index())
+    store.add_texts(
+        texts=["the sales team meets on monday"],
+        metadatas=[{"tenant": "initech"}],
+        doc_id="doc_initech",
+    )
+    retriever = store.as_retriever(lexical_mode="restrict")
+
+    # all the lexical matches of "holiday" are in the other tenants
+    results = asyncio.run(
+        retriever.atext_search("holiday schedule", k=2, metadata_filter={"tenant": "initech"})
+    )
+    assert [(chunk.doc_id, chunk.chunk_id) for chunk, _ in results] == [("doc_initech", 0)]
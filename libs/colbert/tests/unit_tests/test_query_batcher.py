@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from typing import List, Optional
+
+import pytest
+from ragstack_colbert import QueryBatcher
+from ragstack_colbert.base_embedding_model import BaseEmbeddingModel
+from ragstack_colbert.objects import Embedding
+
+
+class RecordingEmbeddingModel(BaseEmbeddingModel):
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+
+    def embed_texts(self, texts: List[str]) -> List[Embedding]:
+        raise NotImplementedError()
+
+    def embed_query(
+        self, query: str, full_length_search: Optional[bool] = False, query_maxlen: int = -1
+    ) -> Embedding:
+        if query == "fail":
+            raise ValueError("cannot encode")
+        return [[float(len(query)), float(query_maxlen)]]
+
+    def embed_queries(
+        self, queries: List[str], full_length_search: Optional[bool] = False, query_maxlen: int = -1
+    ) -> List[Embedding]:
+        self.batches.append((list(queries), query_maxlen))
+        self.threads.add(threading.get_ident())
+        return super().embed_queries(queries, full_length_search, query_maxlen)
+
+
+def test_concurrent_queries_are_batched():
+    model = RecordingEmbeddingModel()
+    batcher = QueryBatcher(model, max_batch_size=8, max_wait_ms=20)
+
+    async def _run():
+        queries = [("q" * (i + 1), 32 if i % 2 else None) for i in range(12)]
+        return queries, await asyncio.gather(
+            *(batcher.embed_query(query, query_maxlen=maxlen) for query, maxlen in queries)
+        )
+
+    queries, embeddings = asyncio.run(_run())
+    batcher.close()
+
+    for (query, maxlen), embedding in zip(queries, embeddings):
+        assert embedding == [[float(len(query)), float(32 if maxlen else -1)]]
+
+    # grouped by query_maxlen, and encoded off the event loop
+    assert sorted(len(queries) for queries, _ in model.batches) == [6, 6]
+    assert {maxlen for _, maxlen in model.batches} == {-1, 32}
+    assert threading.get_ident() not in model.threads
+    assert batcher.stats == {"queries": 12, "batches": 2, "mean_batch_size": 6.0}
+
+
+def test_batches_are_split_at_max_batch_size():
+    model = RecordingEmbeddingModel()
+    batcher = QueryBatcher(model, max_batch_size=4, max_wait_ms=1000)
+
+    async def _run():
+        return await asyncio.gather(*(batcher.embed_query(f"query {i}") for i in range(10)))
+
+    # full batches are dispatched without waiting, the remainder after the previous batch
+    embeddings = asyncio.run(asyncio.wait_for(_run(), timeout=0.5))
+    batcher.close()
+
+    assert len(embeddings) == 10
+    assert [len(queries) for queries, _ in model.batches] == [4, 4, 2]
+
+
+def test_errors_are_propagated_to_the_batch():
+    batcher = QueryBatcher(RecordingEmbeddingModel(), max_wait_ms=1)
+
+    async def _run():
+        return await asyncio.gather(
+            batcher.embed_query("fail"), batcher.embed_query("ok"), return_exceptions=True
+        )
+
+    results = asyncio.run(_run())
+    batcher.close()
+    assert all(isinstance(result, ValueError) for result in results)
+
+    with pytest.raises(ValueError):
+        QueryBatcher(RecordingEmbeddingModel(), max_batch_size=0)
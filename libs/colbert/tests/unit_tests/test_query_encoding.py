@@ -0,0 +1,116 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+import torch
+from colbert.infra import ColBERTConfig
+from colbert.modeling.tokenization import QueryTokenizer
+from ragstack_colbert.text_encoder import TextEncoder, tensorize_queries
+
+WORDS = ["arctic", "plants", "survive", "cold", "temperatures", "what", "how", "do", "the"]
+
+
+@pytest.fixture()
+def query_tokenizer(tmp_path) -> QueryTokenizer:
+    from transformers import BertTokenizerFast
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "[unused0]", "[unused1]", "."]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab + WORDS) + "\n")
+
+    # builds the tokenizer without downloading a checkpoint
+    config = ColBERTConfig(query_maxlen=32)
+    tokenizer = QueryTokenizer.__new__(QueryTokenizer)
+    tokenizer.tok = BertTokenizerFast(vocab_file=str(vocab_file))
+    tokenizer.verbose = 0
+    tokenizer.config = config
+    tokenizer.query_maxlen = config.query_maxlen
+    tokenizer.background_maxlen = 512 - config.query_maxlen + 1
+    tokenizer.Q_marker_token = config.query_token
+    tokenizer.Q_marker_token_id = tokenizer.tok.convert_tokens_to_ids(config.query_token_id)
+    tokenizer.cls_token, tokenizer.cls_token_id = "[CLS]", tokenizer.tok.cls_token_id
+    tokenizer.sep_token, tokenizer.sep_token_id = "[SEP]", tokenizer.tok.sep_token_id
+    tokenizer.mask_token, tokenizer.mask_token_id = "[MASK]", tokenizer.tok.mask_token_id
+    tokenizer.pad_token, tokenizer.pad_token_id = "[PAD]", tokenizer.tok.pad_token_id
+    tokenizer.used = True
+    return tokenizer
+
+
+@pytest.mark.parametrize("full_length_search", [False, True])
+@pytest.mark.parametrize("query_maxlen", [4, 8, 32])
+def test_tensorize_matches_query_tokenizer(query_tokenizer, query_maxlen, full_length_search):
+    texts = ["how do arctic plants survive the cold temperatures"]
+
+    ids, mask = tensorize_queries(
+        query_tokenizer, texts, query_maxlen=query_maxlen, full_length_search=full_length_search
+    )
+    assert query_tokenizer.query_maxlen == 32
+
+    query_tokenizer.query_maxlen = query_maxlen
+    if full_length_search:
+        # same as QueryTokenizer.tensorize(full_length_search=True), which fails on BatchEncoding.to()
+        # with recent transformers versions
+        length = len(query_tokenizer.tok([". " + texts[0]], add_special_tokens=False)["input_ids"][0])
+        query_tokenizer.query_maxlen = query_tokenizer.max_len(length)
+    expected_ids, expected_mask = query_tokenizer.tensorize(texts)
+
+    assert torch.equal(ids, expected_ids)
+    assert torch.equal(mask, expected_mask)
+
+
+class FakeBackend:
+    """Returns each token id as its embedding, once all the threads are in the forward pass."""
+
+    def __init__(self):
+        self.barrier = threading.Barrier(4)
+
+    def encode_queries(self, input_ids, attention_mask):
+        self.barrier.wait(timeout=5)
+        return input_ids.unsqueeze(2).float()
+
+
+def test_concurrent_encode_query(query_tokenizer):
+    encoder = TextEncoder.__new__(TextEncoder)
+    encoder._checkpoint = SimpleNamespace(query_tokenizer=query_tokenizer)
+    encoder._backend = FakeBackend()
+    encoder._query_tokenizer_lock = threading.Lock()
+
+    query_maxlens = [5, 9, 17, -1]
+    with ThreadPoolExecutor(max_workers=len(query_maxlens)) as executor:
+        embeddings = list(
+            executor.map(
+                lambda maxlen: encoder.encode_query("what do plants survive", maxlen),
+                query_maxlens,
+            )
+        )
+
+    # the dynamic length is the 4 tokens of the query, plus [CLS], [Q] and [SEP]
+    assert [len(embedding) for embedding in embeddings] == [5, 9, 17, 7]
+    for embedding, maxlen in zip(embeddings, [5, 9, 17, 7]):
+        ids, _ = tensorize_queries(query_tokenizer, ["what do plants survive"], maxlen)
+        assert embedding == ids.unsqueeze(2).float().tolist()[0]
+    assert query_tokenizer.query_maxlen == 32
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.batch_shapes = []
+
+    def encode_queries(self, input_ids, attention_mask):
+        self.batch_shapes.append(tuple(input_ids.shape))
+        return input_ids.unsqueeze(2).float()
+
+
+def test_encode_queries_batches_by_length(query_tokenizer):
+    encoder = TextEncoder.__new__(TextEncoder)
+    encoder._checkpoint = SimpleNamespace(query_tokenizer=query_tokenizer)
+    encoder._backend = RecordingBackend()
+    encoder._query_tokenizer_lock = threading.Lock()
+
+    texts = ["what do plants survive", "how do plants survive", "arctic plants", "the cold"]
+    embeddings = encoder.encode_queries(texts, query_maxlen=-1)
+
+    # one forward pass per dynamic query length
+    assert sorted(encoder._backend.batch_shapes) == [(2, 5), (2, 7)]
+    assert embeddings == [encoder.encode_query(text, query_maxlen=-1) for text in texts]
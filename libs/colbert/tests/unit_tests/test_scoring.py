@@ -0,0 +1,90 @@
+import pytest
+import torch
+from ragstack_colbert.colbert_retriever import max_similarity_torch
+from ragstack_colbert.objects import Chunk
+from ragstack_colbert.scoring import (
+    SCORING_PRECISIONS,
+    MaxSimScorer,
+    max_similarity_batch,
+    select_precision,
+)
+
+
+def _random_chunks(count: int, seed: int = 0):
+    generator = torch.Generator().manual_seed(seed)
+    chunks = []
+    for i in range(count):
+        length = int(torch.randint(1, 20, (1,), generator=generator))
+        embedding = torch.nn.functional.normalize(
+            torch.randn((length, 16), generator=generator), dim=1
+        )
+        chunks.append(Chunk(doc_id="doc", chunk_id=i, embedding=embedding.tolist()))
+    return chunks
+
+
+def _reference_scores(query, chunks):
+    return {
+        chunk: sum(
+            max_similarity_torch(query_vector=v, chunk_embedding=chunk.embedding)
+            for v in query
+        )
+        for chunk in chunks
+    }
+
+
+def test_max_similarity_batch():
+    query = torch.tensor([[1, 0], [0, 1]], dtype=torch.float32)
+    embeddings = torch.tensor(
+        [[1, 0], [0, 2], [3, 0], [1, 1]], dtype=torch.float32
+    )
+    lengths = torch.tensor([2, 1, 1])
+
+    scores = max_similarity_batch(query, embeddings, lengths)
+
+    assert scores.tolist() == [3.0, 3.0, 2.0]
+
+
+@pytest.mark.parametrize("precision", SCORING_PRECISIONS)
+@pytest.mark.parametrize("num_shards", [1, 3])
+def test_scorer_matches_reference(precision: str, num_shards: int):
+    chunks = _random_chunks(count=10)
+    generator = torch.Generator().manual_seed(1)
+    query = torch.nn.functional.normalize(
+        torch.randn((4, 16), generator=generator), dim=1
+    ).tolist()
+
+    scorer = MaxSimScorer(precision=precision, num_shards=num_shards)
+    scores = scorer.score(query_embedding=query, chunks=chunks)
+    scorer.close()
+
+    expected = _reference_scores(query, chunks)
+    tolerance = 1e-5 if precision == "float32" else 0.05
+    assert scores.keys() == expected.keys()
+    for chunk, score in expected.items():
+        assert scores[chunk] == pytest.approx(score, abs=tolerance)
+
+
+def test_scorer_skips_chunks_without_embedding():
+    chunks = _random_chunks(count=2) + [Chunk(doc_id="doc", chunk_id=99)]
+    scores = MaxSimScorer().score(query_embedding=[[1.0] * 16], chunks=chunks)
+    assert len(scores) == 2
+
+
+def test_select_precision():
+    selected, report = select_precision(
+        tolerance=0.0, num_chunks=4, tokens_per_chunk=8, repeats=1
+    )
+    assert selected == "float32"
+    assert "float32" in report
+    assert report["float32"]["relative_error"] == 0.0
+
+    selected, report = select_precision(
+        tolerance=1.0, num_chunks=4, tokens_per_chunk=8, repeats=1
+    )
+    assert selected in report
+    assert all(report[p]["latency_ms"] >= report[selected]["latency_ms"] for p in report)
+
+
+def test_invalid_precision():
+    with pytest.raises(ValueError):
+        MaxSimScorer(precision="float8")
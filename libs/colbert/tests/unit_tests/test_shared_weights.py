@@ -0,0 +1,82 @@
+import multiprocessing
+import sys
+
+import pytest
+import torch
+from ragstack_colbert import ColbertEmbeddingModel
+from ragstack_colbert.encoder_backend import _ColbertEncoderModule
+from ragstack_colbert.shared_weights import share_weights
+
+
+def _build_module() -> torch.nn.Module:
+    from transformers import BertConfig, BertModel
+
+    config = BertConfig(
+        vocab_size=100,
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+    )
+    return _ColbertEncoderModule(bert=BertModel(config), linear=torch.nn.Linear(32, 8)).eval()
+
+
+def _forward(module: torch.nn.Module) -> torch.Tensor:
+    input_ids = torch.arange(20).reshape(2, 10)
+    with torch.inference_mode():
+        return module(input_ids, torch.ones_like(input_ids))
+
+
+def _forward_in_child(module, queue):
+    queue.put(_forward(module).tolist())
+
+
+def test_share_weights(tmp_path):
+    torch.manual_seed(0)
+    path = str(tmp_path / "weights.pt")
+
+    original = _build_module()
+    expected = _forward(original)
+    share_weights(original, path)
+
+    # a second process loading its own copy attaches the same file
+    torch.manual_seed(1)
+    other = _build_module()
+    share_weights(other, path)
+
+    assert torch.equal(_forward(original), expected)
+    assert torch.equal(_forward(other), expected)
+
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/maps") as maps:
+            assert path in maps.read()
+
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        child = context.Process(target=_forward_in_child, args=(other, queue))
+        child.start()
+        assert torch.equal(torch.tensor(queue.get(timeout=30)), expected)
+        child.join()
+
+
+def _executor_in_child(model, queue):
+    queue.put(model._executor is None and not model._executor_lock.locked())
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="uses fork")
+def test_model_is_reinitialized_after_fork():
+    model = ColbertEmbeddingModel(shared_weights=True)
+    assert model._encoder_kwargs["shared_weights"]
+
+    model._get_executor()
+    model._executor_lock.acquire()
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    child = context.Process(target=_executor_in_child, args=(model, queue))
+    child.start()
+    assert queue.get(timeout=30)
+    child.join()
+
+    model._executor_lock.release()
+    model.close()
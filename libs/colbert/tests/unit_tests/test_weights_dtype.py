@@ -0,0 +1,89 @@
+from typing import List, Optional
+
+import pytest
+import torch
+from ragstack_colbert import ColbertEmbeddingModel
+from ragstack_colbert.base_embedding_model import BaseEmbeddingModel
+from ragstack_colbert.constant import DEFAULT_COLBERT_MODEL
+from ragstack_colbert.encoder_backend import _ColbertEncoderModule
+from ragstack_colbert.objects import Embedding
+from ragstack_colbert.weights_dtype import cast_weights, validate_weights_dtype
+
+from .baseline_tensors import baseline_tensors
+from .test_colbert_baseline_embeddings import arctic_botany_chunks
+
+
+class ModuleEmbeddingModel(BaseEmbeddingModel):
+    def __init__(self, weights_dtype: str):
+        from transformers import BertConfig, BertModel
+
+        torch.manual_seed(0)
+        config = BertConfig(
+            vocab_size=100,
+            hidden_size=64,
+            num_hidden_layers=2,
+            num_attention_heads=2,
+            intermediate_size=128,
+        )
+        module = _ColbertEncoderModule(bert=BertModel(config), linear=torch.nn.Linear(64, 16))
+        self._module = cast_weights(module.eval(), weights_dtype)
+
+    def embed_texts(self, texts: List[str]) -> List[Embedding]:
+        input_ids = torch.tensor([[ord(c) % 100 for c in text] for text in texts])
+        with torch.inference_mode():
+            output = self._module(input_ids, torch.ones_like(input_ids))
+        return output.float().tolist()
+
+    def embed_query(
+        self, query: str, full_length_search: Optional[bool] = False, query_maxlen: int = -1
+    ) -> Embedding:
+        return self.embed_texts([query])[0]
+
+
+@pytest.mark.parametrize("weights_dtype", ["bfloat16", "float16"])
+def test_validate_weights_dtype(weights_dtype):
+    texts = ["arctic plants do", "survive the cold"]
+    model = ModuleEmbeddingModel(weights_dtype)
+    assert next(model._module.parameters()).dtype == getattr(torch, weights_dtype)
+
+    report = validate_weights_dtype(
+        model, texts=texts, reference_model=ModuleEmbeddingModel("float32")
+    )
+    assert report["min_similarity"] > 0.98
+    assert report["mean_similarity"] > 0.99
+
+    with pytest.raises(ValueError):
+        validate_weights_dtype(model, texts=texts)
+    with pytest.raises(ValueError):
+        cast_weights(model._module, "int4")
+
+
+@pytest.mark.parametrize(
+    ("weights_dtype", "min_similarity", "mean_similarity"),
+    [("bfloat16", 0.9, 0.98), ("float16", 0.97, 0.995)],
+)
+def test_weights_dtype_against_baseline(
+    weights_dtype: str, min_similarity: float, mean_similarity: float
+):
+    colbert = ColbertEmbeddingModel(
+        doc_maxlen=220,
+        nbits=2,
+        kmeans_niters=4,
+        checkpoint=DEFAULT_COLBERT_MODEL,
+        weights_dtype=weights_dtype,
+    )
+
+    # the baseline tensors are the float32 token embeddings of the chunks, in order
+    reference_embeddings = []
+    start = 0
+    for embedding in ColbertEmbeddingModel(
+        doc_maxlen=220, checkpoint=DEFAULT_COLBERT_MODEL
+    ).embed_texts(arctic_botany_chunks):
+        reference_embeddings.append(torch.stack(baseline_tensors[start : start + len(embedding)]))
+        start += len(embedding)
+
+    report = validate_weights_dtype(
+        colbert, texts=arctic_botany_chunks, reference_embeddings=reference_embeddings
+    )
+    assert report["min_similarity"] > min_similarity
+    assert report["mean_similarity"] > mean_similarity
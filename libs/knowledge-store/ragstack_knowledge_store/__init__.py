@@ -1,10 +1,12 @@
 from .embedding_model import EmbeddingModel
 from .graph_store import GraphStore, Node, SetupMode, TextNode
+from .in_memory_graph_store import InMemoryGraphStore
 from .knowledge_store import KnowledgeStore
 
 __all__ = [
     "EmbeddingModel",
     "GraphStore",
+    "InMemoryGraphStore",
     "KnowledgeStore",
     "Node",
     "SetupMode",
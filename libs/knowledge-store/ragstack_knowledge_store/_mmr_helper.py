@@ -0,0 +1,196 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Initial capacity of the candidate arrays, doubled as needed.
+_INITIAL_CAPACITY = 128
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    # Zero vectors have a similarity of 0 to everything.
+    norms[norms == 0] = 1
+    return embeddings / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the (at most) `k` highest scores, highest first."""
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        indices = np.argpartition(-scores, k - 1)[:k]
+    else:
+        indices = np.arange(len(scores))
+    return indices[np.argsort(-scores[indices], kind="stable")]
+
+
+class MmrHelper:
+    """Candidate pool of an MMR search, with vectorized score updates.
+
+    The normalized embeddings of the candidates are stored in one contiguous
+    matrix, alongside vectors of their similarity to the query and of their
+    redundancy (maximum similarity to a selected candidate). Selecting a
+    candidate updates the redundancy of all the others with one matrix-vector
+    product, and candidates are added in blocks, with one matrix-vector product
+    per selected embedding.
+
+    Scores are the same as the per-candidate computation: `lambda_mult * sim(query)
+    - (1 - lambda_mult) * max(0, max(sim(selected)))`. Ties go to the candidate
+    added first.
+    """
+
+    lambda_mult: float
+    query_embedding: np.ndarray
+    """Normalized query embedding."""
+
+    selected_ids: List[str]
+    selected_embeddings: np.ndarray
+    """Normalized embeddings of the selected candidates, one row each."""
+
+    candidate_ids: List[str]
+    candidate_index: Dict[str, int]
+    """Position of each candidate (selected or not) in the arrays."""
+    embeddings: np.ndarray
+    similarity_to_query: np.ndarray
+    redundancy: np.ndarray
+    distances: np.ndarray
+    """Number of edges from a node retrieved via similarity."""
+    selectable: np.ndarray
+    """False for selected candidates, and for the unused capacity."""
+
+    def __init__(self, query_embedding: List[float], lambda_mult: float):
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        dim = query_embedding.shape[1]
+
+        self.lambda_mult = lambda_mult
+        self.query_embedding = _normalize(query_embedding)[0]
+
+        self.selected_ids = []
+        self.selected_embeddings = np.empty((0, dim), dtype=np.float32)
+
+        self.candidate_ids = []
+        self.candidate_index = {}
+        self.embeddings = np.empty((_INITIAL_CAPACITY, dim), dtype=np.float32)
+        self.similarity_to_query = np.empty(_INITIAL_CAPACITY, dtype=np.float32)
+        self.redundancy = np.empty(_INITIAL_CAPACITY, dtype=np.float32)
+        self.distances = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+        self.selectable = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self.selectable)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+
+        def grow(array: np.ndarray, fill) -> np.ndarray:
+            grown = np.full((capacity, *array.shape[1:]), fill, dtype=array.dtype)
+            grown[: len(array)] = array
+            return grown
+
+        self.embeddings = grow(self.embeddings, 0)
+        self.similarity_to_query = grow(self.similarity_to_query, 0)
+        self.redundancy = grow(self.redundancy, 0)
+        self.distances = grow(self.distances, 0)
+        self.selectable = grow(self.selectable, False)
+
+    def add_candidates(
+        self, candidates: Iterable[Tuple[str, List[float]]], distance: int
+    ) -> None:
+        """Add candidates reached at `distance` edges from a similarity result.
+
+        Candidates already selected are ignored. For candidates already in the
+        pool, only the distance is updated if this path to them is shorter.
+        """
+        new_ids = []
+        new_embeddings = []
+        for content_id, embedding in candidates:
+            index = self.candidate_index.get(content_id)
+            if index is not None:
+                if index >= len(self.candidate_ids):
+                    # Repeated in this block.
+                    continue
+                if self.selectable[index] and distance < self.distances[index]:
+                    self.distances[index] = distance
+                continue
+
+            self.candidate_index[content_id] = len(self.candidate_ids) + len(new_ids)
+            new_ids.append(content_id)
+            new_embeddings.append(embedding)
+
+        if not new_ids:
+            return
+
+        start = len(self.candidate_ids)
+        end = start + len(new_ids)
+        self._reserve(end)
+
+        block = _normalize(np.asarray(new_embeddings, dtype=np.float32))
+        self.candidate_ids.extend(new_ids)
+        self.embeddings[start:end] = block
+        self.similarity_to_query[start:end] = block @ self.query_embedding
+        self.redundancy[start:end] = 0
+        # One matrix-vector product per selection, like in `select_next`: a matrix
+        # product may round differently, and break ties between equal candidates.
+        for selected in self.selected_embeddings:
+            np.maximum(
+                self.redundancy[start:end], block @ selected, out=self.redundancy[start:end]
+            )
+        self.distances[start:end] = distance
+        self.selectable[start:end] = True
+
+    def _scores(self, size: int) -> np.ndarray:
+        scores = (
+            self.lambda_mult * self.similarity_to_query[:size]
+            - (1 - self.lambda_mult) * self.redundancy[:size]
+        )
+        scores[~self.selectable[:size]] = -np.inf
+        return scores
+
+    def best_candidates(
+        self, n: int, score_threshold: float, max_distance: int
+    ) -> List[str]:
+        """The IDs of the (at most) `n` unselected candidates with the best scores.
+
+        Only the candidates scoring at least `score_threshold` and within
+        `max_distance` edges of a similarity result are considered. These are the
+        most likely next selections, if no better candidate is added meanwhile.
+        """
+        size = len(self.candidate_ids)
+        if size == 0 or n <= 0:
+            return []
+
+        scores = self._scores(size)
+        scores[(self.distances[:size] > max_distance) | (scores < score_threshold)] = -np.inf
+        return [
+            self.candidate_ids[i] for i in top_k_indices(scores, n) if scores[i] != -np.inf
+        ]
+
+    def select_next(self, score_threshold: float) -> Optional[Tuple[str, int]]:
+        """Select the best candidate, unless none scores at least `score_threshold`.
+
+        Returns:
+            The ID and distance of the selected candidate, or None.
+        """
+        size = len(self.candidate_ids)
+        if size == 0:
+            return None
+
+        scores = self._scores(size)
+        index = int(np.argmax(scores))
+        if not self.selectable[index] or scores[index] < score_threshold:
+            return None
+
+        self.selectable[index] = False
+        content_id = self.candidate_ids[index]
+        embedding = self.embeddings[index]
+        self.selected_ids.append(content_id)
+        self.selected_embeddings = np.vstack([self.selected_embeddings, embedding])
+
+        # Update the redundancy of the candidates for the new selection.
+        np.maximum(
+            self.redundancy[:size],
+            self.embeddings[:size] @ embedding,
+            out=self.redundancy[:size],
+        )
+        return content_id, int(self.distances[index])
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple
+
+
+class NodeCache:
+    """Bounded cache of the node rows fetched by content ID.
+
+    The rows are cached as served to `GraphStore._query_by_ids`, so that nodes
+    returned again by later searches don't need another read. Nodes re-added by the
+    owning `GraphStore` are invalidated, but nodes rewritten by other processes are
+    served stale until evicted, so the cache should only be enabled when this
+    process is the only writer.
+
+    The least recently used nodes are evicted beyond `max_size`.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._rows: "OrderedDict[str, NamedTuple]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """The number of nodes served from the cache (hits) or not (misses), the
+        hit rate, and the number of cached nodes."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "size": len(self._rows),
+            }
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, NamedTuple]:
+        """The cached rows of the given IDs, by ID. Uncached IDs are left out."""
+        found = {}
+        with self._lock:
+            for id in ids:
+                row = self._rows.get(id)
+                if row is None:
+                    self._misses += 1
+                    continue
+                self._hits += 1
+                self._rows.move_to_end(id)
+                found[id] = row
+        return found
+
+    def put_many(self, rows: Iterable[NamedTuple]) -> None:
+        """Cache rows, replacing the previous rows with the same IDs."""
+        with self._lock:
+            for row in rows:
+                self._rows[row.content_id] = row
+                self._rows.move_to_end(row.content_id)
+            while len(self._rows) > self._max_size:
+                self._rows.popitem(last=False)
+
+    def discard(self, ids: Iterable[str]) -> None:
+        """Remove the rows of the given IDs, if cached."""
+        with self._lock:
+            for id in ids:
+                self._rows.pop(id, None)
@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class TagRow(NamedTuple):
+    """A node found by a tag lookup, shaped like the rows of the lookup queries."""
+
+    content_id: str
+    text_embedding: Optional[List[float]] = None
+    metadata_s: Optional[Dict[str, str]] = None
+
+
+# (direction, tag): "to" for the nodes linking to the tag (sources), "from" for the
+# nodes linked from the tag (targets).
+_Key = Tuple[str, str]
+
+
+class TagCache:
+    """Bounded, write-through cache of the nodes linking to / linked from each tag.
+
+    An entry is created from the complete result of a tag lookup, and kept up to date
+    as the owning `GraphStore` inserts nodes with the tag or removes it from nodes.
+    Nodes written by other processes aren't seen until the entry is evicted, so the
+    cache should only be enabled when this process is the only writer.
+
+    The size of the cache is the total number of nodes in its entries. The least
+    recently used tags are evicted beyond `max_size`.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[_Key, Dict[str, TagRow]]" = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """The number of lookups served from the cache (hits) or not (misses), the
+        hit rate, and the number of cached nodes."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "size": self._size,
+            }
+
+    def get(self, direction: str, tag: str) -> Optional[List[TagRow]]:
+        """The nodes of a tag, or None if the tag isn't cached."""
+        with self._lock:
+            entry = self._entries.get((direction, tag))
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._entries.move_to_end((direction, tag))
+            return list(entry.values())
+
+    def put(self, direction: str, tag: str, rows: Iterable[NamedTuple]) -> None:
+        """Cache the complete result of a tag lookup."""
+        entry = {
+            row.content_id: TagRow(
+                row.content_id,
+                getattr(row, "text_embedding", None),
+                getattr(row, "metadata_s", None),
+            )
+            for row in rows
+        }
+        if len(entry) > self._max_size:
+            return
+
+        with self._lock:
+            key = (direction, tag)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                # Keep the nodes added since the lookup started.
+                entry.update(previous)
+                self._size -= len(previous)
+            self._entries[key] = entry
+            self._size += len(entry)
+            self._evict()
+
+    def add(self, direction: str, tag: str, row: TagRow) -> None:
+        """Add a new node to the entry of a tag, or replace a changed one, if the tag
+        is cached."""
+        with self._lock:
+            entry = self._entries.get((direction, tag))
+            if entry is None:
+                return
+            if row.content_id not in entry:
+                self._size += 1
+            entry[row.content_id] = row
+            self._evict()
+
+    def discard(self, direction: str, tag: str, content_ids: Iterable[str]) -> None:
+        """Remove the nodes which no longer have a tag from its entry, if the tag is
+        cached."""
+        with self._lock:
+            entry = self._entries.get((direction, tag))
+            if entry is None:
+                return
+            for content_id in content_ids:
+                if entry.pop(content_id, None) is not None:
+                    self._size -= 1
+
+    def _evict(self) -> None:
+        while self._size > self._max_size and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= len(entry)
@@ -1,68 +1,571 @@
+import asyncio
 import contextlib
+import logging
+import random
 import threading
+import time
+from collections import deque
+from concurrent.futures import Future
 from types import TracebackType
-from typing import Any, Callable, NamedTuple, Optional, Sequence, Tuple, Type
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
+from cassandra import OperationTimedOut, ReadTimeout, Unavailable, WriteTimeout
 from cassandra.cluster import ResponseFuture, Session
+from cassandra.protocol import OverloadedErrorMessage
 from cassandra.query import PreparedStatement
 
+logger = logging.getLogger(__name__)
 
-class ConcurrentQueries(contextlib.AbstractContextManager):
-    """Context manager for concurrent queries."""
+# Errors signalling an overloaded cluster: the query is retried, and the concurrency
+# limit decreased.
+_OVERLOAD_ERRORS = (
+    OperationTimedOut,
+    ReadTimeout,
+    WriteTimeout,
+    Unavailable,
+    OverloadedErrorMessage,
+)
+
+
+def _call_soon_threadsafe(
+    loop: asyncio.AbstractEventLoop, callback: Callable[..., Any], *args: Any
+) -> bool:
+    """Schedule a callback on a loop, unless the loop was closed (for instance, by
+    `asyncio.run` returning on an error while other queries were in flight)."""
+    try:
+        loop.call_soon_threadsafe(callback, *args)
+        return True
+    except RuntimeError:
+        return False
+
+
+def _set_result(future: asyncio.Future, result: Any) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, error: BaseException) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+class QueryExecutor:
+    """Executes queries under an adaptive concurrency limit, with retries.
+
+    The limit follows an AIMD (additive increase, multiplicative decrease) rule: it
+    grows by one every `limit` successful requests, shrinks by 10% when the recent
+    latency exceeds `latency_tolerance` times the long-term latency (requests are
+    queuing up), and is halved on timeouts and overload errors. Queries failing with
+    those errors are retried up to `max_retries` times, with an exponential, jittered
+    backoff.
+
+    Queries are executed through the sync `ConcurrentQueries` front end, the
+    background `submit` front end, or the asyncio `aexecute` front end. In all of
+    them, the callbacks of the driver only hand the results over: the rows are
+    processed on the thread or event loop of the caller, never on the driver's IO
+    thread.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        *,
+        concurrency: int = 20,
+        min_concurrency: int = 1,
+        max_concurrency: Optional[int] = None,
+        max_retries: int = 3,
+        retry_delay: float = 0.05,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        """Create the executor.
+
+        Args:
+            session: The session to execute the queries with.
+            concurrency: The initial concurrency limit.
+            min_concurrency: The lowest concurrency limit.
+            max_concurrency: The highest concurrency limit. Defaults to 4 times
+                `concurrency`. Set it to `concurrency` for a fixed limit.
+            max_retries: Maximum number of retries of a query failing with a timeout
+                or an overload error.
+            retry_delay: Delay before the first retry, in seconds. Doubles with each
+                retry.
+            latency_tolerance: Ratio of the recent to the long-term latency above
+                which the limit is decreased.
+        """
+        if max_concurrency is None:
+            max_concurrency = 4 * concurrency
+        if not 1 <= min_concurrency <= concurrency <= max_concurrency:
+            raise ValueError(
+                "Expected 1 <= min_concurrency <= concurrency <= max_concurrency"
+            )
 
-    def __init__(self, session: Session, *, concurrency: int = 20) -> None:
         self._session = session
-        self._semaphore = threading.Semaphore(concurrency)
-        self._completion = threading.Condition()
+        self._min_limit = min_concurrency
+        self._max_limit = max_concurrency
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._latency_tolerance = latency_tolerance
+
+        # Shared with the `ConcurrentQueries` of this executor.
+        self._condition = threading.Condition()
+        self._limit = float(concurrency)
+        self._in_flight = 0
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = (
+            deque()
+        )
+        # Queries of `submit` waiting for a slot: (result, start).
+        self._submitted: Deque[Tuple[Future, Callable[[], None]]] = deque()
+
+        # Moving averages of the latency over the last ~5 and ~100 requests.
+        self._short_latency: Optional[float] = None
+        self._long_latency: Optional[float] = None
+        self._responses = 0
+        self._last_decrease = 0
+
+        self._started_at: Optional[float] = None
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._requests = 0
+        self._total_latency = 0.0
+
+    @property
+    def metrics(self) -> Dict[str, float]:
+        """The current concurrency limit and in-flight requests, the number of
+        completed, failed and retried queries, the throughput (completed queries per
+        second since the first query) and the mean latency of the requests."""
+        with self._condition:
+            elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+            return {
+                "concurrency_limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retries": self._retries,
+                "throughput": self._completed / elapsed if elapsed > 0 else 0.0,
+                "mean_latency_ms": (
+                    1000 * self._total_latency / self._requests if self._requests else 0.0
+                ),
+            }
+
+    def _try_acquire(self) -> bool:
+        """Take a slot if one is free. Called with the lock held."""
+        if self._in_flight < int(self._limit):
+            self._in_flight += 1
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            return True
+        return False
+
+    def _acquire(self) -> None:
+        with self._condition:
+            while not self._try_acquire():
+                self._condition.wait()
+
+    async def _aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if not self._async_waiters and self._try_acquire():
+                return
+            waiter = loop.create_future()
+            self._async_waiters.append((loop, waiter))
+        # The slot is handed over by `_release`.
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Cancelled after the slot was handed over, but before resuming: give it
+            # back. (A waiter cancelled before is given back by `_grant`.)
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _grant(self, waiter: asyncio.Future) -> None:
+        if waiter.cancelled():
+            self._release()
+        else:
+            waiter.set_result(None)
+
+    def _release(self) -> None:
+        started = []
+        with self._condition:
+            self._in_flight -= 1
+            while self._async_waiters and self._try_acquire():
+                loop, waiter = self._async_waiters.popleft()
+                if not _call_soon_threadsafe(loop, self._grant, waiter):
+                    self._in_flight -= 1
+            while self._submitted and self._try_acquire():
+                result, start = self._submitted.popleft()
+                if result.cancelled():
+                    self._in_flight -= 1
+                else:
+                    started.append(start)
+            self._condition.notify_all()
+        # Outside of the lock, which `_start` takes.
+        for start in started:
+            start()
+
+    def _decrease(self, factor: float) -> None:
+        # At most once per window, so the requests started before a decrease don't
+        # decrease the limit again.
+        if self._responses - self._last_decrease >= self._limit:
+            self._last_decrease = self._responses
+            self._limit = max(self._min_limit, self._limit * factor)
+            logger.debug("Decreased the concurrency limit to %d", int(self._limit))
+
+    def _observe(self, latency: Optional[float], overloaded: bool = False) -> None:
+        """Adapt the limit to the outcome of a request: its latency if it succeeded,
+        or whether it failed because the cluster is overloaded."""
+        with self._condition:
+            self._responses += 1
+            if overloaded:
+                self._decrease(0.5)
+                return
+            if latency is None:
+                return
+
+            self._requests += 1
+            self._total_latency += latency
+            if self._short_latency is None:
+                self._short_latency = self._long_latency = latency
+            else:
+                self._short_latency += 0.2 * (latency - self._short_latency)
+                self._long_latency += 0.01 * (latency - self._long_latency)
+
+            if self._short_latency > self._latency_tolerance * self._long_latency:
+                self._decrease(0.9)
+            else:
+                self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+
+    def _start(
+        self,
+        query: PreparedStatement,
+        parameters: Optional[Tuple],
+        on_page: Callable[[Sequence[NamedTuple], bool], None],
+        on_error: Callable[[BaseException], None],
+        attempt: int = 0,
+    ) -> None:
+        """Execute a query, holding a slot taken by the caller.
+
+        `on_page` is called with the rows of each page and whether it is the last one,
+        `on_error` with the error of a failed query. Both are called on the IO thread
+        of the driver, and must return quickly. If the query can't be sent (for
+        instance if its parameters can't be serialized), the slot is released and
+        the error raised.
+        """
+        started = time.monotonic()
+        pages = 0
+        try:
+            future: ResponseFuture = self._session.execute_async(query, parameters)
+        except BaseException:
+            with self._condition:
+                self._failed += 1
+            self._release()
+            raise
+
+        def handle_page(rows: Sequence[NamedTuple]) -> None:
+            nonlocal started, pages
+            now = time.monotonic()
+            self._observe(now - started)
+            pages += 1
+            if future.has_more_pages:
+                started = now
+                future.start_fetching_next_page()
+                on_page(rows, False)
+            else:
+                with self._condition:
+                    self._completed += 1
+                self._release()
+                on_page(rows, True)
+
+        def handle_error(error: BaseException) -> None:
+            overloaded = isinstance(error, _OVERLOAD_ERRORS)
+            self._observe(None, overloaded=overloaded)
+            self._release()
+
+            # Pages already handed over can't be taken back.
+            if overloaded and attempt < self._max_retries and pages == 0:
+                with self._condition:
+                    self._retries += 1
+                delay = self._retry_delay * 2**attempt * (0.5 + random.random())
+                logger.debug("Retrying query after %s in %.3fs", type(error).__name__, delay)
+                timer = threading.Timer(
+                    delay, self._retry, (query, parameters, on_page, on_error, attempt + 1)
+                )
+                timer.daemon = True
+                timer.start()
+            else:
+                with self._condition:
+                    self._failed += 1
+                on_error(error)
+
+        future.add_callbacks(handle_page, handle_error)
+
+    def _retry(
+        self,
+        query: PreparedStatement,
+        parameters: Optional[Tuple],
+        on_page: Callable[[Sequence[NamedTuple], bool], None],
+        on_error: Callable[[BaseException], None],
+        attempt: int,
+    ) -> None:
+        # On a timer thread, which may block.
+        self._acquire()
+        try:
+            self._start(query, parameters, on_page, on_error, attempt)
+        except Exception as error:
+            on_error(error)
+
+    def submit(
+        self,
+        query: PreparedStatement,
+        parameters: Optional[Tuple] = None,
+    ) -> "Future[List[NamedTuple]]":
+        """Execute a query in the background.
+
+        Doesn't block: if no slot is free, the query waits for one, and is not sent
+        if the returned future is cancelled before. The pages are collected into a
+        list, for the caller to process once it needs them.
+
+        Args:
+            query: The query to execute.
+            parameters: The parameters of the query.
+
+        Returns:
+            A future of the rows of all the pages of the result.
+        """
+        result: "Future[List[NamedTuple]]" = Future()
+        rows: List[NamedTuple] = []
 
+        def on_page(page: Sequence[NamedTuple], last: bool) -> None:
+            rows.extend(page)
+            if last:
+                result.set_result(rows)
+
+        def start() -> None:
+            # Holding a slot.
+            if not result.set_running_or_notify_cancel():
+                self._release()
+                return
+            try:
+                self._start(query, parameters, on_page, result.set_exception)
+            except Exception as error:
+                result.set_exception(error)
+
+        with self._condition:
+            if self._submitted or not self._try_acquire():
+                self._submitted.append((result, start))
+                return result
+        start()
+        return result
+
+    async def aexecute(
+        self,
+        query: PreparedStatement,
+        parameters: Optional[Tuple] = None,
+    ) -> List[NamedTuple]:
+        """Execute a query without blocking the event loop.
+
+        Args:
+            query: The query to execute.
+            parameters: The parameters of the query.
+
+        Returns:
+            The rows of all the pages of the result.
+        """
+        await self._aacquire()
+
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+        rows: List[NamedTuple] = []
+
+        def on_page(page: Sequence[NamedTuple], last: bool) -> None:
+            rows.extend(page)
+            if last:
+                _call_soon_threadsafe(loop, _set_result, result, rows)
+
+        def on_error(error: BaseException) -> None:
+            _call_soon_threadsafe(loop, _set_exception, result, error)
+
+        self._start(query, parameters, on_page, on_error)
+        return await result
+
+
+class _Query(NamedTuple):
+    query: PreparedStatement
+    parameters: Optional[Tuple]
+    callback: Optional[Callable[[Sequence[NamedTuple], bool], Any]]
+    """Called with the rows of each page, and whether it is the last page."""
+
+
+def _page_callback(
+    callback: Optional[Callable[[Sequence[NamedTuple]], Any]], all_pages: bool
+) -> Optional[Callable[[Sequence[NamedTuple], bool], Any]]:
+    """Adapt a callback to be called with each page and whether it is the last."""
+    if callback is None:
+        return None
+    if not all_pages:
+        return lambda rows, last: callback(rows)
+
+    collected: List[NamedTuple] = []
+
+    def collect(rows: Sequence[NamedTuple], last: bool) -> None:
+        collected.extend(rows)
+        if last:
+            callback(collected)
+
+    return collect
+
+
+class ConcurrentQueries(contextlib.AbstractContextManager):
+    """Context manager for concurrent queries.
+
+    Queries are executed under the concurrency limit of the `QueryExecutor`. The
+    callbacks run on the thread that created the context manager, while it waits in
+    `execute` or on exit, so a slow callback never stalls the driver's IO thread.
+    Queries may be executed from callbacks: those are queued, and started ahead of
+    any new query from the owner thread. This allows pipelines such as "look up, then
+    insert for each result row" to run under one context manager, with the queue
+    bounded by the rows of the pages in flight.
+    """
+
+    def __init__(self, executor: QueryExecutor) -> None:
+        self._executor = executor
+        self._completion = executor._condition
+        self._owner = threading.get_ident()
+        self._local = threading.local()
+
+        # Queries submitted from callbacks, waiting for a slot.
+        self._queue: Deque[_Query] = deque()
+        # Pages waiting for their callback: (callback, rows, last page).
+        self._results: Deque[Tuple[Optional[Callable], Sequence[NamedTuple], bool]] = (
+            deque()
+        )
         self._pending = 0
 
         self._error = None
 
-    def _handle_result(
+    def _handle_page(
         self,
-        result: Sequence[NamedTuple],
-        future: ResponseFuture,
-        callback: Optional[Callable[[Sequence[NamedTuple]], Any]],
+        rows: Sequence[NamedTuple],
+        last: bool,
+        callback: Optional[Callable[[Sequence[NamedTuple], bool], Any]],
     ):
+        with self._completion:
+            self._results.append((callback, rows, last))
+            self._completion.notify_all()
+
+    def _handle_error(self, error):
+        with self._completion:
+            self._error = error
+            self._completion.notify_all()
+
+    def _start(self, query: _Query) -> None:
+        try:
+            self._executor._start(
+                query.query,
+                query.parameters,
+                lambda rows, last: self._handle_page(rows, last, query.callback),
+                self._handle_error,
+            )
+        except BaseException:
+            # Not sent: no page will complete it.
+            with self._completion:
+                self._pending -= 1
+                self._completion.notify_all()
+            raise
+
+    def _run_callback(
+        self,
+        callback: Optional[Callable[[Sequence[NamedTuple], bool], Any]],
+        rows: Sequence[NamedTuple],
+        last: bool,
+    ) -> None:
         if callback is not None:
-            callback(result)
+            self._local.in_callback = True
+            try:
+                callback(rows, last)
+            except Exception as error:
+                self._handle_error(error)
+            finally:
+                self._local.in_callback = False
 
-        if future.has_more_pages:
-            future.start_fetching_next_page()
-        else:
-            self._semaphore.release()
+        if last:
             with self._completion:
                 self._pending -= 1
-                if self._pending == 0:
-                    self._completion.notify()
+                self._completion.notify_all()
 
-    def _handle_error(self, error):
-        with self._completion:
-            self._error = error
-            self._completion.notify()
+    def _run_until(self, ready: Callable[[], bool]) -> bool:
+        """On the owner thread: run the callbacks of the results and start the queued
+        queries, until `ready()` (called with the lock held) or an error.
+
+        Returns:
+            Whether `ready()` returned True.
+        """
+        while True:
+            with self._completion:
+                while True:
+                    if self._error is not None:
+                        return False
+                    if self._results:
+                        result, query = self._results.popleft(), None
+                        break
+                    if self._queue and self._executor._try_acquire():
+                        result, query = None, self._queue.popleft()
+                        break
+                    if ready():
+                        return True
+                    self._completion.wait()
+
+            if result is not None:
+                self._run_callback(*result)
+            else:
+                self._start(query)
 
     def execute(
         self,
         query: PreparedStatement,
         parameters: Optional[Tuple] = None,
         callback: Optional[Callable[[Sequence[NamedTuple]], Any]] = None,
+        *,
+        all_pages: bool = False,
     ):
+        """Execute a query, calling `callback` with its rows.
+
+        Args:
+            query: The query to execute.
+            parameters: The parameters of the query.
+            callback: Called with the rows of each page of the results.
+            all_pages: Call `callback` once, with the rows of all the pages.
+        """
+        query = _Query(query, parameters, _page_callback(callback, all_pages))
+        if threading.get_ident() != self._owner or getattr(
+            self._local, "in_callback", False
+        ):
+            # From a callback: queue the query, without blocking.
+            with self._completion:
+                if self._error is None:
+                    self._pending += 1
+                    self._queue.append(query)
+                    self._completion.notify_all()
+            return
+
+        # Run the callbacks and the queued queries first, then take a free slot.
+        if not self._run_until(self._executor._try_acquire):
+            return
         with self._completion:
             self._pending += 1
-            if self._error is not None:
-                return
-
-        self._semaphore.acquire()
-        future: ResponseFuture = self._session.execute_async(query, parameters)
-        future.add_callbacks(
-            self._handle_result,
-            self._handle_error,
-            callback_kwargs={
-                "future": future,
-                "callback": callback,
-            },
-        )
+        self._start(query)
 
     def __enter__(self) -> "ConcurrentQueries":
         return super().__enter__()
@@ -73,9 +576,7 @@ class ConcurrentQueries(contextlib.AbstractContextManager):
         _exc_inst: Optional[BaseException],
         _exc_traceback: Optional[TracebackType],
     ) -> bool:
-        with self._completion:
-            while self._error is None and self._pending > 0:
-                self._completion.wait()
+        self._run_until(lambda: self._pending == 0)
 
         if self._error is not None:
             raise self._error
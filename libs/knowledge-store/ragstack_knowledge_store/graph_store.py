@@ -1,28 +1,49 @@
+import asyncio
+import itertools
+import json
 import secrets
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import (
+    Any,
+    AsyncIterator,
     Dict,
     Iterable,
+    Iterator,
     List,
     NamedTuple,
     Optional,
     Sequence,
+    Set,
     Tuple,
 )
 
 import numpy as np
+from cassandra import InvalidRequest
 from cassandra.cluster import ConsistencyLevel, ResponseFuture, Session
+from cassandra.query import BoundStatement, PreparedStatement
 from cassio.config import check_resolve_keyspace, check_resolve_session
 
-from .concurrency import ConcurrentQueries
+from ._mmr_helper import MmrHelper, _normalize, top_k_indices
+from ._node_cache import NodeCache
+from ._tag_cache import TagCache, TagRow
+from .concurrency import ConcurrentQueries, QueryExecutor
 from .content import Kind
 from .embedding_model import EmbeddingModel
-from .link_tag import get_link_tags
-from .math import cosine_similarity
+from .link_tag import LINK_TAGS, get_link_tags
 
 CONTENT_ID = "content_id"
 
+# Default number of nodes embedded and written together by `add_nodes`.
+DEFAULT_BATCH_SIZE = 256
+
+# Maximum number of IDs fetched by one `IN` query of `_query_by_ids`.
+_MAX_IDS_PER_QUERY = 20
+
+# Metadata stored in their own columns rather than in `metadata_blob`.
+_RESERVED_METADATA = (CONTENT_ID, LINK_TAGS)
+
 
 @dataclass
 class Node:
@@ -48,13 +69,64 @@ class SetupMode(Enum):
 
 
 def _row_to_node(row) -> Node:
-    return TextNode(
-        text=row.text_content,
-        metadata={
-            CONTENT_ID: row.content_id,
-            "kind": row.kind,
-        },
-    )
+    # Nodes written before the metadata was stored have no `metadata_blob`.
+    metadata = json.loads(row.metadata_blob) if row.metadata_blob else {}
+    metadata[CONTENT_ID] = row.content_id
+    metadata["kind"] = row.kind
+    return TextNode(text=row.text_content, metadata=metadata)
+
+
+def _metadata_s_value(value: Any) -> str:
+    """The string form of a metadata value in `metadata_s`, as matched by filters.
+
+    Like cassio's metadata columns, integers are stored as floats so that `1` and
+    `1.0` match each other.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        # Before int, as bools are ints.
+        return json.dumps(value)
+    if isinstance(value, int):
+        return json.dumps(float(value))
+    return json.dumps(value)
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, bool, int, float))
+
+
+def _metadata_columns(metadata: dict) -> Tuple[str, Dict[str, str]]:
+    """The `metadata_blob` and `metadata_s` of a node.
+
+    The blob holds the JSON of the whole metadata, with the values that aren't
+    JSON serializable converted to strings. The map holds the scalar values, which
+    are the ones metadata filters can match.
+    """
+    user_metadata = {
+        key: value for key, value in metadata.items() if key not in _RESERVED_METADATA
+    }
+    blob = json.dumps(user_metadata, separators=(",", ":"), sort_keys=True, default=str)
+    metadata_s = {
+        key: _metadata_s_value(value)
+        for key, value in user_metadata.items()
+        if _is_scalar(value)
+    }
+    return blob, metadata_s
+
+
+def _metadata_conditions(metadata_filter: Optional[Dict[str, Any]]) -> Tuple[str, ...]:
+    """The parameters of the conditions of a metadata filter: the key and the value
+    of each entry `metadata_s` must contain."""
+    conditions = []
+    for key, value in sorted((metadata_filter or {}).items()):
+        if not _is_scalar(value):
+            raise ValueError(
+                f"Unsupported value for metadata filter key {key!r}: {value!r}. "
+                "Only strings, numbers, booleans and None can be matched."
+            )
+        conditions.extend((key, _metadata_s_value(value)))
+    return tuple(conditions)
 
 
 def _results_to_nodes(results: Optional[ResponseFuture]) -> Iterable[TextNode]:
@@ -69,47 +141,336 @@ def _results_to_ids(results: Optional[ResponseFuture]) -> Iterable[str]:
             yield row.content_id
 
 
-def emb_to_ndarray(embedding: List[float]) -> np.ndarray:
-    embedding = np.array(embedding, dtype=np.float32)
-    if embedding.ndim == 1:
-        embedding = np.expand_dims(embedding, axis=0)
-    return embedding
+class _RoutedStatement(BoundStatement):
+    """A bound statement routed to the replicas of an explicit routing key.
 
+    The driver only derives the routing key of a bound statement from the values of
+    the partition key columns, which an `IN` query doesn't bind one by one.
+    """
 
-@dataclass
-class _Candidate:
-    score: float
-    similarity_to_query: float
-    """Lambda * Similarity to the question."""
+    @property
+    def routing_key(self):
+        return self._routing_key
 
-    embedding: np.ndarray
-    """Embedding used for updating similarity to selections."""
 
-    redundancy: float
-    """(1 - Lambda) * max(Similarity to selected items)."""
+class _FilteredQuery:
+    """A query prepared with as many metadata conditions as it is executed with.
+
+    The `{conditions}` placeholder of the query is replaced by `prefix` and one
+    `column[?] = ?` condition per key of the metadata filter, so a statement is
+    prepared once per number of keys rather than once per filter. The conditions
+    are bound to the parameters returned by `_metadata_conditions`.
+    """
 
     def __init__(
-        self, embedding: List[float], lambda_mult: float, query_embedding: np.ndarray
+        self,
+        session: Session,
+        query: str,
+        *,
+        column: str,
+        prefix: str,
+        consistency_level: Optional[ConsistencyLevel] = None,
     ):
-        self.embedding = emb_to_ndarray(embedding)
+        self._session = session
+        self._query = query
+        self._column = column
+        self._prefix = prefix
+        self._consistency_level = consistency_level
+        self._statements: Dict[int, PreparedStatement] = {}
+        # The statement without conditions is prepared eagerly, like the others.
+        self.prepared(())
+
+    def prepared(self, conditions: Sequence[str]) -> PreparedStatement:
+        """The statement with the conditions of `_metadata_conditions`."""
+        num_conditions = len(conditions) // 2
+        statement = self._statements.get(num_conditions)
+        if statement is None:
+            where = ""
+            if num_conditions > 0:
+                where = " AND ".join([f"{self._column}[?] = ?"] * num_conditions)
+                where = f"{self._prefix} {where}"
+            statement = self._session.prepare(self._query.format(conditions=where))
+            if self._consistency_level is not None:
+                statement.consistency_level = self._consistency_level
+            self._statements[num_conditions] = statement
+        return statement
+
+
+def _followed_edges(
+    rows: Iterable[NamedTuple], query_embedding: List[float], fan_out: Optional[int]
+) -> Iterable[NamedTuple]:
+    """The edges to follow from a node: all of them, or the `fan_out` edges whose
+    `target_text_embedding` is the most similar to the query."""
+    if fan_out is None:
+        return rows
+    rows = list(rows)
+    if len(rows) <= fan_out:
+        return rows
+
+    embeddings = np.asarray([row.target_text_embedding for row in rows], dtype=np.float32)
+    query = _normalize(np.asarray([query_embedding], dtype=np.float32))[0]
+    return [rows[i] for i in top_k_indices(_normalize(embeddings) @ query, fan_out)]
+
+
+def _budget_spent(visited: Dict[str, int], max_visited: Optional[int]) -> bool:
+    return max_visited is not None and len(visited) >= max_visited
+
 
-        # TODO: Refactor to use cosine_similarity_top_k to allow an array of embeddings?
-        self.similarity_to_query = (
-            lambda_mult * cosine_similarity(query_embedding, self.embedding)[0]
+def emb_to_ndarray(embedding: List[float]) -> np.ndarray:
+    embedding = np.array(embedding, dtype=np.float32)
+    if embedding.ndim == 1:
+        embedding = np.expand_dims(embedding, axis=0)
+    return embedding
+
+
+# (source_content_id, target_content_id, kind, target_text_embedding,
+#  target_metadata_s)
+_Edge = Tuple[str, str, str, List[float], Dict[str, str]]
+
+# (kind, target_text_embedding, target_metadata_s) of the target of an edge.
+_Target = Tuple[str, List[float], Dict[str, str]]
+
+
+class _PreparedNodes(NamedTuple):
+    ids: List[str]
+    inserts: List[Tuple[Any, ...]]
+    """Parameters of the inserts of the new and changed nodes."""
+    link_to_tags: Dict[str, Set[str]]
+    """The tags each node of the batch links to."""
+    link_from_tags: Dict[str, Set[str]]
+    """The tags each node of the batch is linked from."""
+    tag_to_sources: Dict[str, List[Tuple[str, str]]]
+    """`(kind, source_id)` of the nodes of the batch linking to each tag."""
+    tag_to_targets: Dict[str, Dict[str, _Target]]
+    """`target_id: (kind, target_embedding, target_metadata_s)` of the nodes of the
+    batch linked from each tag."""
+    tag_to_new_sources: Dict[str, List[Tuple[str, str]]]
+    """The `tag_to_sources` which didn't link to the tag before."""
+    tag_to_new_targets: Dict[str, Dict[str, _Target]]
+    """The `tag_to_targets` which weren't linked from the tag before, or whose
+    embedding or metadata changed: the edges to them are (re)written."""
+    tag_to_removed_sources: Dict[str, List[str]]
+    """IDs of the nodes of the batch which no longer link to each tag."""
+    tag_to_removed_targets: Dict[str, List[str]]
+    """IDs of the nodes of the batch which are no longer linked from each tag."""
+
+
+def _texts_and_metadatas(nodes: Iterable[Node]) -> Tuple[List[str], List[dict]]:
+    texts = []
+    metadatas = []
+    for node in nodes:
+        if not isinstance(node, TextNode):
+            raise ValueError("Only adding TextNode is supported at the moment")
+        texts.append(node.text)
+        metadatas.append(node.metadata)
+    return texts, metadatas
+
+
+def _batches(
+    nodes: Iterable[Node], batch_size: int
+) -> Iterator[Tuple[List[str], List[dict]]]:
+    """Texts and metadatas of the nodes, `batch_size` nodes at a time."""
+    iterator = iter(nodes)
+    while True:
+        texts, metadatas = _texts_and_metadatas(itertools.islice(iterator, batch_size))
+        if not texts:
+            return
+        yield texts, metadatas
+
+
+def _given_ids(metadatas: Iterable[dict]) -> List[str]:
+    """The distinct IDs set in the metadata of the nodes (the others are new)."""
+    return list(dict.fromkeys(m[CONTENT_ID] for m in metadatas if CONTENT_ID in m))
+
+
+def _previous_embeddings(
+    texts: List[str], metadatas: List[dict], previous: Dict[str, NamedTuple]
+) -> List[Optional[List[float]]]:
+    """The stored embedding of each node whose text is unchanged, None for the nodes
+    to embed."""
+    embeddings: List[Optional[List[float]]] = []
+    for text, metadata in zip(texts, metadatas):
+        row = previous.get(metadata.get(CONTENT_ID))
+        unchanged = row is not None and row.text_content == text
+        if unchanged and row.text_embedding is not None:
+            embeddings.append(list(row.text_embedding))
+        else:
+            embeddings.append(None)
+    return embeddings
+
+
+def _prepare_nodes(
+    texts: List[str],
+    text_embeddings: List[List[float]],
+    metadatas: List[dict],
+    previous: Optional[Dict[str, NamedTuple]] = None,
+) -> _PreparedNodes:
+    """Prepare the writes of a batch of nodes.
+
+    Nodes are diffed against their `previous` rows, if any: unchanged nodes aren't
+    written, and only the link tags added or removed since need edges inserted or
+    deleted, except for the nodes whose embedding or metadata changed, as the edges
+    to them hold copies.
+    """
+    previous = previous or {}
+    prepared = _PreparedNodes(
+        ids=[],
+        inserts=[],
+        link_to_tags={},
+        link_from_tags={},
+        tag_to_sources={},
+        tag_to_targets={},
+        tag_to_new_sources={},
+        tag_to_new_targets={},
+        tag_to_removed_sources={},
+        tag_to_removed_targets={},
+    )
+    for text, text_embedding, metadata in zip(texts, text_embeddings, metadatas):
+        if CONTENT_ID not in metadata:
+            metadata[CONTENT_ID] = secrets.token_hex(8)
+        id = metadata[CONTENT_ID]
+        prepared.ids.append(id)
+
+        link_to_tags = set()  # link to these tags
+        link_from_tags = set()  # link from these tags
+        kinds = {}
+        for tag in get_link_tags(metadata):
+            tag_str = f"{tag.kind}:{tag.tag}"
+            kinds[tag_str] = tag.kind
+            if tag.direction == "incoming" or tag.direction == "bidir":
+                # An incoming link should be linked *from* nodes with the given tag.
+                link_from_tags.add(tag_str)
+            if tag.direction == "outgoing" or tag.direction == "bidir":
+                link_to_tags.add(tag_str)
+        metadata_blob, metadata_s = _metadata_columns(metadata)
+
+        row = previous.get(id)
+        previous_to_tags = set(row.link_to_tags or ()) if row else set()
+        previous_from_tags = set(row.link_from_tags or ()) if row else set()
+        target_changed = (
+            row is None or row.text_content != text or (row.metadata_s or {}) != metadata_s
         )
-        self.redundancy = 0.0
-        self.score = self.similarity_to_query - self.redundancy
-        self.distance = 0
 
-    def update_for_selection(
-        self, lambda_mult: float, selection_embedding: List[float]
-    ):
-        selected_r_sim = (1 - lambda_mult) * cosine_similarity(
-            selection_embedding, self.embedding
-        )[0]
-        if selected_r_sim > self.redundancy:
-            self.redundancy = selected_r_sim
-            self.score = self.similarity_to_query - selected_r_sim
+        prepared.link_to_tags[id] = link_to_tags
+        prepared.link_from_tags[id] = link_from_tags
+        for tag in link_to_tags:
+            source = (kinds[tag], id)
+            prepared.tag_to_sources.setdefault(tag, []).append(source)
+            if tag not in previous_to_tags:
+                prepared.tag_to_new_sources.setdefault(tag, []).append(source)
+        for tag in link_from_tags:
+            target = (kinds[tag], text_embedding, metadata_s)
+            prepared.tag_to_targets.setdefault(tag, {})[id] = target
+            if target_changed or tag not in previous_from_tags:
+                prepared.tag_to_new_targets.setdefault(tag, {})[id] = target
+        for tag in previous_to_tags - link_to_tags:
+            prepared.tag_to_removed_sources.setdefault(tag, []).append(id)
+        for tag in previous_from_tags - link_from_tags:
+            prepared.tag_to_removed_targets.setdefault(tag, []).append(id)
+
+        if (
+            target_changed
+            or row.metadata_blob != metadata_blob
+            or previous_to_tags != link_to_tags
+            or previous_from_tags != link_from_tags
+        ):
+            prepared.inserts.append(
+                (
+                    id,
+                    text,
+                    text_embedding,
+                    link_to_tags,
+                    link_from_tags,
+                    metadata_blob,
+                    metadata_s,
+                )
+            )
+    return prepared
+
+
+def _edges_for_sources(
+    source_rows: Iterable[NamedTuple],
+    target_embeddings: Dict[str, _Target],
+    id_set: Set[str],
+) -> Iterator[_Edge]:
+    """Edges from existing nodes linking to a tag to the new nodes linked from it."""
+    for source in source_rows:
+        if source.content_id in id_set:
+            # Source ID is in the batch, and anything in `target_embeddings` is too.
+            # Don't add here (handled by `_edges_between_batch_nodes`).
+            continue
+
+        for target_id, (kind, target_emb, target_md) in target_embeddings.items():
+            yield source.content_id, target_id, kind, target_emb, target_md
+
+
+def _edges_for_targets(
+    sources: Iterable[Tuple[str, str]],
+    target_rows: Iterable[NamedTuple],
+    id_set: Set[str],
+) -> Iterator[_Edge]:
+    """Edges from the new nodes linking to a tag to existing nodes linked from it."""
+    for target in target_rows:
+        if target.content_id in id_set:
+            # Target ID is in the batch, and anything in `sources` is too.
+            # Don't add here (handled by `_edges_between_batch_nodes`).
+            continue
+
+        for kind, source_id in sources:
+            yield (
+                source_id,
+                target.content_id,
+                kind,
+                target.text_embedding,
+                target.metadata_s,
+            )
+
+
+def _edges_between_batch_nodes(prepared: _PreparedNodes) -> Iterator[_Edge]:
+    """Edges between nodes of the batch, from the new sources of each tag to all its
+    targets, and from all its sources to the new targets."""
+    edges: Dict[Tuple[str, str], _Target] = {}
+
+    def link(sources: Iterable[Tuple[str, str]], targets: Dict[str, _Target]) -> None:
+        for kind, source_id in sources:
+            for target_id, target in targets.items():
+                # Don't add self-cycles (could happen with bidirectional tags).
+                if target[0] == kind and source_id != target_id:
+                    edges[(source_id, target_id)] = target
+
+    for tag, new_sources in prepared.tag_to_new_sources.items():
+        link(new_sources, prepared.tag_to_targets.get(tag, {}))
+    for tag, new_targets in prepared.tag_to_new_targets.items():
+        link(prepared.tag_to_sources.get(tag, ()), new_targets)
+
+    for (source_id, target_id), (kind, target_emb, target_md) in edges.items():
+        yield source_id, target_id, kind, target_emb, target_md
+
+
+def _stale_edges_from(
+    source_ids: Iterable[str], target_rows: Iterable[NamedTuple], prepared: _PreparedNodes
+) -> Iterator[Tuple[str, str]]:
+    """Edges from the nodes of the batch which no longer link to a tag to the nodes
+    linked from it, unless another tag still links them."""
+    for target in target_rows:
+        target_tags = prepared.link_from_tags.get(target.content_id, target.link_from_tags)
+        for source_id in source_ids:
+            source_tags = prepared.link_to_tags[source_id]
+            if source_id != target.content_id and source_tags.isdisjoint(target_tags or ()):
+                yield source_id, target.content_id
+
+
+def _stale_edges_to(
+    source_rows: Iterable[NamedTuple], target_ids: Iterable[str], prepared: _PreparedNodes
+) -> Iterator[Tuple[str, str]]:
+    """Edges to the nodes of the batch which are no longer linked from a tag from the
+    nodes linking to it, unless another tag still links them."""
+    for source in source_rows:
+        source_tags = prepared.link_to_tags.get(source.content_id, source.link_to_tags)
+        for target_id in target_ids:
+            target_tags = prepared.link_from_tags[target_id]
+            if source.content_id != target_id and target_tags.isdisjoint(source_tags or ()):
+                yield source.content_id, target_id
 
 
 class GraphStore:
@@ -123,6 +484,11 @@ class GraphStore:
         keyspace: Optional[str] = None,
         setup_mode: SetupMode = SetupMode.SYNC,
         concurrency: int = 20,
+        max_concurrency: Optional[int] = None,
+        max_retries: int = 3,
+        adjacency_prefetch: int = 4,
+        tag_cache_size: int = 0,
+        node_cache_size: int = 0,
     ):
         """A hybrid vector-and-graph store backed by Cassandra.
 
@@ -131,14 +497,44 @@ class GraphStore:
 
         Args:
             embedding: The embeddings to use for the document content.
-            concurrency: Maximum number of queries to have concurrently executing.
+            concurrency: Initial number of queries to have concurrently executing. The
+                limit is adapted to the latency of the queries, and decreased on
+                timeouts and overload errors.
+            max_concurrency: Maximum number of queries to have concurrently
+                executing. Defaults to 4 times `concurrency`. Set it to `concurrency`
+                for a fixed limit.
+            max_retries: Maximum number of retries of a query failing with a timeout
+                or an overload error. Defaults to 3.
             setup_mode: Mode used to create the Cassandra table (SYNC,
                 ASYNC or OFF).
+            adjacency_prefetch: Number of likely next selections whose edges are
+                fetched in the background during an MMR-traversal search. 0
+                disables the prefetch.
+            tag_cache_size: Maximum number of nodes kept in a cache of the nodes
+                linking to / linked from each tag, which saves the tag lookups of
+                `add_nodes` for the tags already seen. The cache is updated with the
+                nodes added by this store, but doesn't see the nodes written by
+                other processes: only enable it when this store is the only writer.
+                Defaults to 0 (disabled).
+            node_cache_size: Maximum number of nodes kept in a cache of the nodes
+                returned by the searches, which saves reading them again when later
+                searches return them. Nodes re-added by this store are invalidated,
+                but the cache doesn't see the nodes rewritten by other processes:
+                only enable it when this store is the only writer. Defaults to 0
+                (disabled).
         """
         session = check_resolve_session(session)
         keyspace = check_resolve_keyspace(keyspace)
 
-        self._concurrency = concurrency
+        self._executor = QueryExecutor(
+            session,
+            concurrency=concurrency,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+        )
+        self._adjacency_prefetch = adjacency_prefetch
+        self._tag_cache = TagCache(tag_cache_size) if tag_cache_size > 0 else None
+        self._node_cache = NodeCache(node_cache_size) if node_cache_size > 0 else None
         self._embedding = embedding
         self._node_table = node_table
         self._edge_table = edge_table
@@ -153,32 +549,67 @@ class GraphStore:
                 "Only SYNC and OFF are supported at the moment"
             )
 
-        # TODO: Metadata
         # TODO: Parent ID / source ID / etc.
         self._insert_passage = session.prepare(
             f"""
             INSERT INTO {keyspace}.{node_table} (
-                content_id, kind, text_content, text_embedding, link_to_tags, link_from_tags
-            ) VALUES (?, '{Kind.passage}', ?, ?, ?, ?)
+                content_id, kind, text_content, text_embedding, link_to_tags, link_from_tags,
+                metadata_blob, metadata_s
+            ) VALUES (?, '{Kind.passage}', ?, ?, ?, ?, ?, ?)
             """
         )
 
         self._insert_edge = session.prepare(
             f"""
             INSERT INTO {keyspace}.{edge_table} (
-                source_content_id, target_content_id, kind, target_text_embedding
-            ) VALUES (?, ?, ?, ?)
+                source_content_id, target_content_id, kind, target_text_embedding,
+                target_metadata_s
+            ) VALUES (?, ?, ?, ?, ?)
+            """
+        )
+
+        self._delete_edge = session.prepare(
+            f"""
+            DELETE FROM {keyspace}.{edge_table}
+            WHERE source_content_id = ? AND target_content_id = ?
             """
         )
 
         self._query_by_id = session.prepare(
             f"""
-            SELECT content_id, kind, text_content
+            SELECT content_id, kind, text_content, metadata_blob
+            FROM {keyspace}.{node_table}
+            WHERE content_id = ?
+            """
+        )
+
+        self._query_by_ids_in = session.prepare(
+            f"""
+            SELECT content_id, kind, text_content, metadata_blob
+            FROM {keyspace}.{node_table}
+            WHERE content_id IN ?
+            """
+        )
+
+        # The stored state of the nodes being re-added, diffed by `add_nodes`.
+        self._query_previous_by_id = session.prepare(
+            f"""
+            SELECT content_id, text_content, text_embedding, link_to_tags, link_from_tags,
+                metadata_blob, metadata_s
             FROM {keyspace}.{node_table}
             WHERE content_id = ?
             """
         )
 
+        self._query_previous_by_ids_in = session.prepare(
+            f"""
+            SELECT content_id, text_content, text_embedding, link_to_tags, link_from_tags,
+                metadata_blob, metadata_s
+            FROM {keyspace}.{node_table}
+            WHERE content_id IN ?
+            """
+        )
+
         self._query_embedding_by_id = session.prepare(
             f"""
             SELECT content_id, text_embedding
@@ -187,51 +618,72 @@ class GraphStore:
             """
         )
 
-        self._query_by_embedding = session.prepare(
+        # The similarity and edge queries take metadata filters: the conditions on
+        # `metadata_s` (of the target node, for edges) are bound before the
+        # embedding of ANN queries, and after the source of edge queries.
+        def node_query(query: str) -> _FilteredQuery:
+            return _FilteredQuery(
+                session,
+                query,
+                column="metadata_s",
+                prefix="WHERE",
+                consistency_level=ConsistencyLevel.QUORUM,
+            )
+
+        def edge_query(query: str) -> _FilteredQuery:
+            return _FilteredQuery(session, query, column="target_metadata_s", prefix="AND")
+
+        self._query_by_embedding = node_query(
             f"""
-            SELECT content_id, kind, text_content
+            SELECT content_id, kind, text_content, metadata_blob
             FROM {keyspace}.{node_table}
+            {{conditions}}
             ORDER BY text_embedding ANN OF ?
             LIMIT ?
             """
         )
-        self._query_by_embedding.consistency_level = ConsistencyLevel.QUORUM
 
-        self._query_ids_by_embedding = session.prepare(
+        self._query_ids_by_embedding = node_query(
             f"""
             SELECT content_id
             FROM {keyspace}.{node_table}
+            {{conditions}}
             ORDER BY text_embedding ANN OF ?
             LIMIT ?
             """
         )
-        self._query_ids_by_embedding.consistency_level = ConsistencyLevel.QUORUM
 
-        self._query_ids_and_embedding_by_embedding = session.prepare(
+        self._query_ids_and_embedding_by_embedding = node_query(
             f"""
             SELECT content_id, text_embedding
             FROM {keyspace}.{node_table}
+            {{conditions}}
             ORDER BY text_embedding ANN OF ?
             LIMIT ?
             """
         )
-        self._query_ids_and_embedding_by_embedding.consistency_level = (
-            ConsistencyLevel.QUORUM
-        )
 
-        self._query_linked_ids = session.prepare(
+        self._query_linked_ids = edge_query(
             f"""
             SELECT target_content_id AS content_id
             FROM {keyspace}.{edge_table}
-            WHERE source_content_id = ?
+            WHERE source_content_id = ? {{conditions}}
             """
         )
 
-        self._query_edges_by_source = session.prepare(
+        self._query_linked_ids_and_embedding = edge_query(
+            f"""
+            SELECT target_content_id AS content_id, target_text_embedding
+            FROM {keyspace}.{edge_table}
+            WHERE source_content_id = ? {{conditions}}
+            """
+        )
+
+        self._query_edges_by_source = edge_query(
             f"""
             SELECT target_content_id, target_text_embedding
             FROM {keyspace}.{edge_table}
-            WHERE source_content_id = ?
+            WHERE source_content_id = ? {{conditions}}
             """
         )
 
@@ -253,12 +705,30 @@ class GraphStore:
 
         self._query_ids_and_embedding_by_link_from_tag = session.prepare(
             f"""
-            SELECT content_id, text_embedding
+            SELECT content_id, text_embedding, metadata_s
             FROM {keyspace}.{node_table}
             WHERE link_from_tags CONTAINS ?
             """
         )
 
+        # Lookups of the edges through the tags removed from re-added nodes, with the
+        # tags of the other end, which may still link them.
+        self._query_ids_and_link_from_tags_by_link_from_tag = session.prepare(
+            f"""
+            SELECT content_id, link_from_tags
+            FROM {keyspace}.{node_table}
+            WHERE link_from_tags CONTAINS ?
+            """
+        )
+
+        self._query_ids_and_link_to_tags_by_link_to_tag = session.prepare(
+            f"""
+            SELECT content_id, link_to_tags
+            FROM {keyspace}.{node_table}
+            WHERE link_to_tags CONTAINS ?
+            """
+        )
+
     def _apply_schema(self):
         """Apply the schema to the database."""
         embedding_dim = len(self._embedding.embed_query("Test Query"))
@@ -272,6 +742,9 @@ class GraphStore:
                 link_to_tags SET<TEXT>,
                 link_from_tags SET<TEXT>,
 
+                metadata_blob TEXT,
+                metadata_s MAP<TEXT, TEXT>,
+
                 PRIMARY KEY (content_id)
             )
             """
@@ -288,11 +761,19 @@ class GraphStore:
                 -- text_embedding of target node. allows MMR to be applied without fetching nodes.
                 target_text_embedding VECTOR<FLOAT, {embedding_dim}>,
 
+                -- metadata_s of target node. allows filtering edges without fetching nodes.
+                target_metadata_s MAP<TEXT, TEXT>,
+
                 PRIMARY KEY (source_content_id, target_content_id)
             )
             """
         )
 
+        # Tables created before the metadata was stored. The nodes and edges written
+        # before have no metadata, and don't match metadata filters until re-added.
+        self._add_columns(self._node_table, "metadata_blob TEXT, metadata_s MAP<TEXT, TEXT>")
+        self._add_columns(self._edge_table, "target_metadata_s MAP<TEXT, TEXT>")
+
         # Index on text_embedding (for similarity search)
         self._session.execute(
             f"""CREATE CUSTOM INDEX IF NOT EXISTS {self._node_table}_text_embedding_index
@@ -318,195 +799,591 @@ class GraphStore:
             """
         )
 
+        # Indices on metadata (for metadata filters)
+        self._session.execute(
+            f"""
+            CREATE CUSTOM INDEX IF NOT EXISTS {self._node_table}_metadata_s_index
+            ON {self._keyspace}.{self._node_table} (ENTRIES(metadata_s))
+            USING 'StorageAttachedIndex';
+            """
+        )
+
+        self._session.execute(
+            f"""
+            CREATE CUSTOM INDEX IF NOT EXISTS {self._edge_table}_target_metadata_s_index
+            ON {self._keyspace}.{self._edge_table} (ENTRIES(target_metadata_s))
+            USING 'StorageAttachedIndex';
+            """
+        )
+
+    def _add_columns(self, table: str, columns: str) -> None:
+        """Add columns to a table, unless they already exist."""
+        try:
+            self._session.execute(f"ALTER TABLE {self._keyspace}.{table} ADD ({columns})")
+        except InvalidRequest:
+            # Cassandra has no `ADD IF NOT EXISTS`: the columns are already there.
+            pass
+
     def _concurrent_queries(self) -> ConcurrentQueries:
-        return ConcurrentQueries(self._session, concurrency=self._concurrency)
+        return ConcurrentQueries(self._executor)
+
+    @property
+    def query_metrics(self) -> Dict[str, float]:
+        """Concurrency limit, in-flight requests, throughput and latency of the
+        queries executed concurrently by this store."""
+        return self._executor.metrics
 
-    # TODO: Async (aadd_nodes)
     def add_nodes(
         self,
         nodes: Iterable[Node] = None,
-    ) -> Iterable[str]:
-        texts = []
-        metadatas = []
-        for node in nodes:
-            if not isinstance(node, TextNode):
-                raise ValueError("Only adding TextNode is supported at the moment")
-            texts.append(node.text)
-            metadatas.append(node.metadata)
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> List[str]:
+        """Add nodes to the graph store.
+
+        The nodes are consumed, embedded and written `batch_size` at a time, so the
+        memory used doesn't depend on the number of nodes. The next batch is
+        embedded in a background thread while the current one is written. Edges
+        between nodes of different batches are created like edges to the nodes
+        already in the store.
+
+        Nodes whose content ID is already stored are upserted: their stored text,
+        link tags and metadata are read first, so that unchanged texts aren't
+        embedded again, unchanged nodes aren't written, and only the edges of the
+        link tags added or removed since are inserted or deleted. The edges to a
+        node are rewritten when its text or metadata change.
+
+        All the nodes are added before this returns. Use `add_nodes_streaming` to
+        get the IDs of each batch as soon as it is written.
+
+        Args:
+            nodes: The nodes to add.
+            batch_size: Number of nodes embedded and written together. Defaults
+                to 256.
+
+        Returns:
+            The IDs of the added nodes.
+        """
+        return list(self.add_nodes_streaming(nodes, batch_size=batch_size))
+
+    def add_nodes_streaming(
+        self,
+        nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[str]:
+        """Add nodes to the graph store, yielding their IDs as they are written.
 
-        text_embeddings = self._embedding.embed_texts(texts)
+        Runs the same batches as `add_nodes`, but lazily: a batch is read from
+        `nodes` and written as the returned iterator is consumed. The nodes of the
+        batches not consumed are not added.
 
-        ids = []
+        Args:
+            nodes: The nodes to add.
+            batch_size: Number of nodes embedded and written together. Defaults
+                to 256.
 
-        tag_to_new_sources: Dict[str, List[Tuple[str, str]]] = {}
-        tag_to_new_targets: Dict[str, Dict[str, Tuple[str, List[float]]]] = {}
+        Returns:
+            An iterator over the IDs of the added nodes, yielding each batch once
+            it is written.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        return self._add_batches(nodes, batch_size)
 
-        # Step 1: Add the nodes, collecting the tags and new sources / targets.
+    def _previous_rows(self, metadatas: List[dict]) -> Dict[str, NamedTuple]:
+        """The stored rows of the nodes of a batch already in the store, by ID."""
+        rows: Dict[str, NamedTuple] = {}
+        with self._concurrent_queries() as cq:
+            for query, parameters in self._queries_by_ids(
+                _given_ids(metadatas),
+                self._query_previous_by_id,
+                self._query_previous_by_ids_in,
+            ):
+                cq.execute(
+                    query,
+                    parameters=parameters,
+                    callback=lambda page: rows.update((row.content_id, row) for row in page),
+                )
+        return rows
+
+    async def _aprevious_rows(self, metadatas: List[dict]) -> Dict[str, NamedTuple]:
+        results = await asyncio.gather(
+            *(
+                self._executor.aexecute(query, parameters)
+                for query, parameters in self._queries_by_ids(
+                    _given_ids(metadatas),
+                    self._query_previous_by_id,
+                    self._query_previous_by_ids_in,
+                )
+            )
+        )
+        return {row.content_id: row for result in results for row in result}
+
+    def _embed_batch(
+        self, texts: List[str], metadatas: List[dict]
+    ) -> Tuple[Dict[str, NamedTuple], List[List[float]]]:
+        """The previous rows of the nodes of a batch, and the embeddings of their
+        texts. Only the texts which aren't stored already are embedded."""
+        previous = self._previous_rows(metadatas)
+        embeddings = _previous_embeddings(texts, metadatas, previous)
+        to_embed = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if to_embed:
+            embedded = self._embedding.embed_texts([texts[i] for i in to_embed])
+            for i, embedding in zip(to_embed, embedded):
+                embeddings[i] = embedding
+        return previous, embeddings
+
+    async def _aembed_batch(
+        self, texts: List[str], metadatas: List[dict]
+    ) -> Tuple[Dict[str, NamedTuple], List[List[float]]]:
+        previous = await self._aprevious_rows(metadatas)
+        embeddings = _previous_embeddings(texts, metadatas, previous)
+        to_embed = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if to_embed:
+            embedded = await self._embedding.aembed_texts([texts[i] for i in to_embed])
+            for i, embedding in zip(to_embed, embedded):
+                embeddings[i] = embedding
+        return previous, embeddings
+
+    def _add_batches(self, nodes: Iterable[Node], batch_size: int) -> Iterator[str]:
+        batches = _batches(nodes, batch_size)
+        with ThreadPoolExecutor(max_workers=1) as embedder:
+
+            def embed_next():
+                batch = next(batches, None)
+                if batch is None:
+                    return None
+                texts, metadatas = batch
+                return texts, metadatas, embedder.submit(self._embed_batch, texts, metadatas)
+
+            pending = embed_next()
+            written: Set[str] = set()
+            while pending is not None:
+                texts, metadatas, embedded = pending
+                previous, text_embeddings = embedded.result()
+                if not written.isdisjoint(_given_ids(metadatas)):
+                    # Read while the previous batch, which re-added some of the nodes,
+                    # was written.
+                    previous, text_embeddings = self._embed_batch(texts, metadatas)
+                # Embed the next batch while this one is written.
+                pending = embed_next()
+                ids = self._add_batch(texts, text_embeddings, metadatas, previous)
+                written = set(ids)
+                yield from ids
+
+    def _delete_stale_edges(self, prepared: _PreparedNodes) -> None:
+        """Delete the edges through the link tags removed from the nodes of a batch.
+
+        Runs before the nodes are written, so that the lookups find the nodes of the
+        batch linked through their previous tags.
+        """
         with self._concurrent_queries() as cq:
-            tuples = zip(texts, text_embeddings, metadatas)
-            for text, text_embedding, metadata in tuples:
-                if CONTENT_ID not in metadata:
-                    metadata[CONTENT_ID] = secrets.token_hex(8)
-                id = metadata[CONTENT_ID]
-                ids.append(id)
-
-                link_to_tags = set()  # link to these tags
-                link_from_tags = set()  # link from these tags
-
-                for tag in get_link_tags(metadata):
-                    tag_str = f"{tag.kind}:{tag.tag}"
-                    if tag.direction == "incoming" or tag.direction == "bidir":
-                        # An incom`ing link should be linked *from* nodes with the given tag.
-                        link_from_tags.add(tag_str)
-                        tag_to_new_targets.setdefault(tag_str, dict())[id] = (
-                            tag.kind,
-                            text_embedding,
-                        )
-                    if tag.direction == "outgoing" or tag.direction == "bidir":
-                        link_to_tags.add(tag_str)
-                        tag_to_new_sources.setdefault(tag_str, list()).append(
-                            (tag.kind, id)
-                        )
 
+            def delete_edges(edges: Iterable[Tuple[str, str]]):
+                for edge in edges:
+                    cq.execute(self._delete_edge, edge)
+
+            for tag, source_ids in prepared.tag_to_removed_sources.items():
                 cq.execute(
-                    self._insert_passage,
-                    (id, text, text_embedding, link_to_tags, link_from_tags),
+                    self._query_ids_and_link_from_tags_by_link_from_tag,
+                    parameters=(tag,),
+                    callback=lambda targets, sources=source_ids: delete_edges(
+                        _stale_edges_from(sources, targets, prepared)
+                    ),
                 )
 
-        # Step 2: Query information about those tags to determine the edges to add.
-        # Add edges as needed.
-        id_set = set(ids)
-        with self._concurrent_queries() as cq:
-            edges = []
+            for tag, target_ids in prepared.tag_to_removed_targets.items():
+                cq.execute(
+                    self._query_ids_and_link_to_tags_by_link_to_tag,
+                    parameters=(tag,),
+                    callback=lambda sources, targets=target_ids: delete_edges(
+                        _stale_edges_to(sources, targets, prepared)
+                    ),
+                )
 
-            def add_edge(source_id, target_id, kind, target_embedding):
-                nonlocal added_edges
-                if source_id == target_id:
-                    # Don't add self-cycles (could happen with bidirectional tags).
-                    return
+    async def _adelete_stale_edges(self, prepared: _PreparedNodes) -> None:
+        async def delete_edges(edges: Iterable[Tuple[str, str]]):
+            await asyncio.gather(
+                *(self._executor.aexecute(self._delete_edge, edge) for edge in edges)
+            )
 
-                edges.append((source_id, target_id, kind, target_embedding))
+        async def unlink_targets(tag, source_ids):
+            targets = await self._executor.aexecute(
+                self._query_ids_and_link_from_tags_by_link_from_tag, (tag,)
+            )
+            await delete_edges(_stale_edges_from(source_ids, targets, prepared))
 
-                # TODO: Would be good to be able to execute these... but
-                # may cause problems if we can't execute it right away
-                # (because of a pending query) and we can't complete
-                # the pending queries (because we can't finish the callback).
+        async def unlink_sources(tag, target_ids):
+            sources = await self._executor.aexecute(
+                self._query_ids_and_link_to_tags_by_link_to_tag, (tag,)
+            )
+            await delete_edges(_stale_edges_to(sources, target_ids, prepared))
+
+        await asyncio.gather(
+            *(
+                unlink_targets(tag, source_ids)
+                for tag, source_ids in prepared.tag_to_removed_sources.items()
+            ),
+            *(
+                unlink_sources(tag, target_ids)
+                for tag, target_ids in prepared.tag_to_removed_targets.items()
+            ),
+        )
 
-                # cq.execute(
-                #     self._insert_edge,
-                #     (source_id, target_id, kind, target_embedding),
-                # )
+    def _add_batch(
+        self,
+        texts: List[str],
+        text_embeddings: List[List[float]],
+        metadatas: List[dict],
+        previous: Dict[str, NamedTuple],
+    ) -> List[str]:
+        prepared = _prepare_nodes(texts, text_embeddings, metadatas, previous)
+        id_set = set(prepared.ids)
+
+        if prepared.tag_to_removed_sources or prepared.tag_to_removed_targets:
+            self._delete_stale_edges(prepared)
+
+        # Complete results of the tag lookups, cached once all their pages are in.
+        lookups: Dict[Tuple[str, str], List[NamedTuple]] = {}
+
+        # The node inserts, the tag lookups and the edge inserts run in one pipeline:
+        # the edges found by a lookup are inserted as soon as it returns.
+        with self._concurrent_queries() as cq:
 
-            def add_edges_for_sources(
-                source_rows,
-                target_embeddings: Dict[(str, List[float])],
-            ):
-                for source_id in source_rows:
-                    if source_id in id_set:
-                        # Source ID is new, and anything in `target_embeddings` is too.
-                        # Don't add here.
-                        continue
+            def insert_edges(edges: Iterable[_Edge]):
+                for edge in edges:
+                    cq.execute(self._insert_edge, edge)
 
-                    for target_id, (kind, target_emb) in target_embeddings.items():
-                        add_edge(source_id.content_id, target_id, kind, target_emb)
+            def lookup(direction: str, tag: str, query: PreparedStatement, add_edges):
+                cached = self._tag_cache.get(direction, tag) if self._tag_cache else None
+                if cached is not None:
+                    add_edges(cached)
+                    return
 
-            def add_edges_for_targets(
-                sources: Iterable[Tuple[str, str]],
-                target_rows,
-            ):
-                for target in target_rows:
-                    if target.content_id in id_set:
-                        # Target ID is new, and anything in `sources` is too.
-                        # Don't add here (will be handled later).
-                        continue
+                rows = lookups.setdefault((direction, tag), [])
 
-                    for kind, source_id in sources:
-                        add_edge(
-                            source_id, target.content_id, kind, target.text_embedding
-                        )
+                def callback(page):
+                    rows.extend(page)
+                    add_edges(page)
 
-            for tag, new_target_embs in tag_to_new_targets.items():
+                cq.execute(query, parameters=(tag,), callback=callback)
+
+            for insert in prepared.inserts:
+                cq.execute(self._insert_passage, insert)
+
+            for tag, new_target_embs in prepared.tag_to_new_targets.items():
                 # For each new node with a `link_from_tag`, find the source
                 # nodes with that `link_to_tag`` and create the edges.
-                cq.execute(
+                lookup(
+                    "to",
+                    tag,
                     self._query_ids_by_link_to_tag,
-                    parameters=(tag,),
-                    callback=lambda sources, targets=new_target_embs: add_edges_for_sources(
-                        sources, targets
+                    lambda sources, targets=new_target_embs: insert_edges(
+                        _edges_for_sources(sources, targets, id_set)
                     ),
                 )
 
-            for tag, new_sources in tag_to_new_sources.items():
+            for tag, new_sources in prepared.tag_to_new_sources.items():
                 # For each new node with a `link_to_tag`, find the target
                 # nodes with that `link_from_tag` tag and create the edges.
-                cq.execute(
+                lookup(
+                    "from",
+                    tag,
                     self._query_ids_and_embedding_by_link_from_tag,
-                    parameters=(tag,),
-                    callback=lambda targets, sources=new_sources: add_edges_for_targets(
-                        sources, targets
+                    lambda targets, sources=new_sources: insert_edges(
+                        _edges_for_targets(sources, targets, id_set)
                     ),
                 )
 
-        # Step 3: Add edges.
-        # TODO: Combine steps, ideally to a single set of concurrent queries.
-        # This should be possible, but will require some form of queueing, since
-        # we need to be able to handle a result set, and that may require us to queue
-        # more than |max concurency| edges.
-        added_edges = 0
-        with self._concurrent_queries() as cq:
-            # Add edges from query results (should be one new node and one old node)
-            for edge in edges:
-                added_edges += 1
-                cq.execute(self._insert_edge, edge)
-
-            # Add edges for new nodes
-            for tag, new_sources in tag_to_new_sources.items():
-                for kind, source_id in new_sources:
-                    new_targets = tag_to_new_targets.get(tag, None)
-                    if new_targets is None:
-                        continue
+            # Edges between nodes of the batch don't need a lookup.
+            insert_edges(_edges_between_batch_nodes(prepared))
 
-                    for target_id, (
-                        target_kind,
-                        target_embedding,
-                    ) in new_targets.items():
-                        # TODO: Improve the structures so this can be a lookup?
-                        if target_kind == kind and source_id != target_id:
-                            added_edges += 1
-                            cq.execute(
-                                self._insert_edge,
-                                (source_id, target_id, kind, target_embedding),
-                            )
+        self._update_caches(prepared, lookups)
+        return prepared.ids
+
+    async def aadd_nodes(
+        self,
+        nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> List[str]:
+        """Add nodes to the graph store without blocking the event loop.
+
+        Runs the same batches as `add_nodes`, with the queries executed
+        concurrently on the event loop, and the next batch embedded while the
+        current one is written. Nodes already stored are upserted like by
+        `add_nodes`.
+
+        All the nodes are added before this returns. Use `aadd_nodes_streaming` to
+        get the IDs of each batch as soon as it is written.
+
+        Args:
+            nodes: The nodes to add.
+            batch_size: Number of nodes embedded and written together. Defaults
+                to 256.
+
+        Returns:
+            The IDs of the added nodes.
+        """
+        return [id async for id in self.aadd_nodes_streaming(nodes, batch_size=batch_size)]
+
+    async def aadd_nodes_streaming(
+        self,
+        nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> AsyncIterator[str]:
+        """Add nodes to the graph store, yielding their IDs as they are written.
+
+        Runs the same batches as `aadd_nodes`, but lazily, like
+        `add_nodes_streaming`: the nodes of the batches not consumed are not added.
+
+        Args:
+            nodes: The nodes to add.
+            batch_size: Number of nodes embedded and written together. Defaults
+                to 256.
+
+        Returns:
+            An async iterator over the IDs of the added nodes, yielding each batch
+            once it is written.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+        batches = _batches(nodes, batch_size)
+
+        def embed_next():
+            batch = next(batches, None)
+            if batch is None:
+                return None
+            texts, metadatas = batch
+            return (
+                texts,
+                metadatas,
+                asyncio.ensure_future(self._aembed_batch(texts, metadatas)),
+            )
+
+        pending = embed_next()
+        written: Set[str] = set()
+        try:
+            while pending is not None:
+                texts, metadatas, embedded = pending
+                previous, text_embeddings = await embedded
+                if not written.isdisjoint(_given_ids(metadatas)):
+                    # Read while the previous batch, which re-added some of the nodes,
+                    # was written.
+                    previous, text_embeddings = await self._aembed_batch(texts, metadatas)
+                # Embed the next batch while this one is written.
+                pending = embed_next()
+                ids = await self._aadd_batch(texts, text_embeddings, metadatas, previous)
+                written = set(ids)
+                for id in ids:
+                    yield id
+        finally:
+            if pending is not None:
+                pending[2].cancel()
+
+    async def _aadd_batch(
+        self,
+        texts: List[str],
+        text_embeddings: List[List[float]],
+        metadatas: List[dict],
+        previous: Dict[str, NamedTuple],
+    ) -> List[str]:
+        prepared = _prepare_nodes(texts, text_embeddings, metadatas, previous)
+        id_set = set(prepared.ids)
+
+        if prepared.tag_to_removed_sources or prepared.tag_to_removed_targets:
+            await self._adelete_stale_edges(prepared)
+
+        async def insert_edges(edges: Iterable[_Edge]):
+            await asyncio.gather(
+                *(self._executor.aexecute(self._insert_edge, edge) for edge in edges)
+            )
+
+        lookups: Dict[Tuple[str, str], List[NamedTuple]] = {}
+
+        async def lookup(direction: str, tag: str, query: PreparedStatement):
+            cached = self._tag_cache.get(direction, tag) if self._tag_cache else None
+            if cached is not None:
+                return cached
+            rows = await self._executor.aexecute(query, (tag,))
+            lookups[(direction, tag)] = rows
+            return rows
+
+        async def link_sources(tag, new_target_embs):
+            sources = await lookup("to", tag, self._query_ids_by_link_to_tag)
+            await insert_edges(_edges_for_sources(sources, new_target_embs, id_set))
+
+        async def link_targets(tag, new_sources):
+            targets = await lookup(
+                "from", tag, self._query_ids_and_embedding_by_link_from_tag
+            )
+            await insert_edges(_edges_for_targets(new_sources, targets, id_set))
+
+        await asyncio.gather(
+            *(
+                self._executor.aexecute(self._insert_passage, insert)
+                for insert in prepared.inserts
+            ),
+            *(
+                link_sources(tag, new_target_embs)
+                for tag, new_target_embs in prepared.tag_to_new_targets.items()
+            ),
+            *(
+                link_targets(tag, new_sources)
+                for tag, new_sources in prepared.tag_to_new_sources.items()
+            ),
+            insert_edges(_edges_between_batch_nodes(prepared)),
+        )
+
+        self._update_caches(prepared, lookups)
+        return prepared.ids
+
+    def _update_caches(
+        self,
+        prepared: _PreparedNodes,
+        lookups: Dict[Tuple[str, str], List[NamedTuple]],
+    ) -> None:
+        if self._node_cache is not None:
+            self._node_cache.discard(insert[0] for insert in prepared.inserts)
+
+        if self._tag_cache is None:
+            return
+
+        for (direction, tag), rows in lookups.items():
+            self._tag_cache.put(direction, tag, rows)
+
+        # The nodes no longer linking to / linked from a tag, which the lookups may
+        # have read before they were written.
+        for tag, source_ids in prepared.tag_to_removed_sources.items():
+            self._tag_cache.discard("to", tag, source_ids)
+        for tag, target_ids in prepared.tag_to_removed_targets.items():
+            self._tag_cache.discard("from", tag, target_ids)
+
+        # Write-through: the new nodes are part of the cached tags, and the changed
+        # ones replace their previous embedding and metadata.
+        for tag, new_sources in prepared.tag_to_new_sources.items():
+            for _, source_id in new_sources:
+                self._tag_cache.add("to", tag, TagRow(source_id))
+        for tag, new_targets in prepared.tag_to_new_targets.items():
+            for target_id, (_, target_embedding, target_md) in new_targets.items():
+                self._tag_cache.add(
+                    "from", tag, TagRow(target_id, target_embedding, target_md)
+                )
+
+    @property
+    def tag_cache_stats(self) -> Optional[Dict[str, float]]:
+        """Hits, misses, hit rate and size of the tag cache, or None if it is disabled."""
+        return self._tag_cache.stats if self._tag_cache else None
+
+    @property
+    def node_cache_stats(self) -> Optional[Dict[str, float]]:
+        """Hits, misses, hit rate and size of the node cache, or None if it is
+        disabled."""
+        return self._node_cache.stats if self._node_cache else None
+
+    def _queries_by_ids(
+        self,
+        ids: Iterable[str],
+        query_by_id: PreparedStatement,
+        query_by_ids_in: PreparedStatement,
+    ) -> Iterator[Tuple[Any, Any]]:
+        """The queries (and their parameters) fetching the nodes with the given IDs,
+        by `query_by_id` or `query_by_ids_in`.
+
+        The IDs are grouped by replicas, and each group is fetched by `IN` queries
+        routed to its replicas, so the coordinator reads them locally. The IDs are
+        not grouped if the token map isn't known.
+        """
+        metadata = self._session.cluster.metadata
+        groups: Dict[frozenset, List[str]] = {}
+        for id in ids:
+            # The routing key of the (single, text) partition key.
+            replicas = metadata.get_replicas(self._keyspace, id.encode("utf-8"))
+            groups.setdefault(frozenset(replicas), []).append(id)
+
+        for replicas, group in groups.items():
+            for start in range(0, len(group), _MAX_IDS_PER_QUERY):
+                batch = group[start : start + _MAX_IDS_PER_QUERY]
+                if len(batch) == 1:
+                    # Routed by the driver.
+                    yield query_by_id, (batch[0],)
+                elif not replicas:
+                    yield query_by_ids_in, (batch,)
+                else:
+                    statement = _RoutedStatement(
+                        query_by_ids_in, routing_key=batch[0].encode("utf-8")
+                    )
+                    yield statement.bind((batch,)), None
 
-        return ids
+    def _cached_rows(self, ids: List[str]) -> Dict[str, NamedTuple]:
+        return self._node_cache.get_many(ids) if self._node_cache else {}
+
+    def _cache_rows(self, rows: Iterable[NamedTuple]) -> None:
+        if self._node_cache is not None:
+            self._node_cache.put_many(rows)
 
     def _query_by_ids(
         self,
         ids: Iterable[str],
     ) -> List[TextNode]:
-        results = []
+        ids = list(ids)
+        rows = self._cached_rows(ids)
+        fetched: List[NamedTuple] = []
         with self._concurrent_queries() as cq:
+            for query, parameters in self._queries_by_ids(
+                [id for id in ids if id not in rows],
+                self._query_by_id,
+                self._query_by_ids_in,
+            ):
+                cq.execute(query, parameters=parameters, callback=fetched.extend)
 
-            def add_documents(rows, index):
-                results.extend([(index, _row_to_node(row)) for row in rows])
+        self._cache_rows(fetched)
+        rows.update((row.content_id, row) for row in fetched)
+        return [_row_to_node(rows[id]) for id in ids if id in rows]
 
-            for idx, id in enumerate(ids):
-                cq.execute(
+    async def _aquery_by_ids(
+        self,
+        ids: Iterable[str],
+    ) -> List[TextNode]:
+        ids = list(ids)
+        rows = self._cached_rows(ids)
+        results = await asyncio.gather(
+            *(
+                self._executor.aexecute(query, parameters)
+                for query, parameters in self._queries_by_ids(
+                    [id for id in ids if id not in rows],
                     self._query_by_id,
-                    parameters=(id,),
-                    callback=lambda rows, index=idx: add_documents(rows, index),
+                    self._query_by_ids_in,
                 )
+            )
+        )
 
-        results.sort(key=lambda tuple: tuple[0])
-        return [doc for _, doc in results]
+        fetched = [row for result in results for row in result]
+        self._cache_rows(fetched)
+        rows.update((row.content_id, row) for row in fetched)
+        return [_row_to_node(rows[id]) for id in ids if id in rows]
 
     def _linked_ids(
         self,
         source_id: str,
     ) -> Iterable[str]:
-        results = self._session.execute(self._query_linked_ids, (source_id,))
+        results = self._session.execute(self._query_linked_ids.prepared(()), (source_id,))
         return _results_to_ids(results)
 
+    def _adjacency_prefetch_ids(
+        self, helper: MmrHelper, k: int, depth: int, score_threshold: float
+    ) -> List[str]:
+        """The candidates whose edges should be prefetched: the most likely next
+        selections, among those whose edges will be traversed if selected."""
+        return helper.best_candidates(
+            min(self._adjacency_prefetch, k - len(helper.selected_ids)),
+            score_threshold=score_threshold,
+            max_distance=depth - 2,
+        )
+
     def mmr_traversal_search(
         self,
         query: str,
@@ -516,6 +1393,8 @@ class GraphStore:
         fetch_k: int = 100,
         lambda_mult: float = 0.5,
         score_threshold: float = float("-inf"),
+        fan_out: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
     ) -> Iterable[TextNode]:
         """Retrieve documents from this graph store using MMR-traversal.
 
@@ -539,84 +1418,160 @@ class GraphStore:
                 diversity and 1 to minimum diversity. Defaults to 0.5.
             score_threshold: Only documents with a score greater than or equal
                 this threshold will be chosen. Defaults to -infinity.
+            fan_out: Maximum number of edges of a selected document whose targets
+                become candidates. The targets most similar to the query are kept.
+                Defaults to None (all the edges).
+            metadata_filter: Metadata entries the documents must have. Only the
+                matching documents are fetched by similarity, and only the edges to
+                matching documents are followed. Defaults to None (no filter).
         """
-        selected_ids = []
-        selected_set = set()
-
-        selected_embeddings = (
-            []
-        )  # selected embeddings. saved to compute redundancy of new nodes.
-
+        conditions = _metadata_conditions(metadata_filter)
+        query_edges = self._query_edges_by_source.prepared(conditions)
         query_embedding = self._embedding.embed_query(query)
         fetched = self._session.execute(
-            self._query_ids_and_embedding_by_embedding,
-            (query_embedding, fetch_k),
-        )
-
-        query_embedding = emb_to_ndarray(query_embedding)
-        unselected = {
-            row.content_id: _Candidate(row.text_embedding, lambda_mult, query_embedding)
-            for row in fetched
-        }
-        best_score, next_id = max(
-            [(u.score, content_id) for (content_id, u) in unselected.items()]
-        )
-
-        while len(selected_ids) < k and next_id is not None:
-            if best_score < score_threshold:
-                break
-            selected_id = next_id
-            selected_set.add(next_id)
-            selected_ids.append(next_id)
-
-            next_selected = unselected.pop(selected_id)
-            selected_embedding = next_selected.embedding
-            selected_embeddings.append(selected_embedding)
-
-            best_score = float("-inf")
-            next_id = None
-
-            # Update unselected scores.
-            for content_id, candidate in unselected.items():
-                candidate.update_for_selection(lambda_mult, selected_embedding)
-                if candidate.score > best_score:
-                    best_score = candidate.score
-                    next_id = content_id
-
-            # Add unselected edges if reached nodes are within `depth`:
-            next_depth = next_selected.distance + 1
-            if next_depth < depth:
-                adjacents = self._session.execute(
-                    self._query_edges_by_source, (selected_id,)
+            self._query_ids_and_embedding_by_embedding.prepared(conditions),
+            (*conditions, query_embedding, fetch_k),
+        )
+
+        helper = MmrHelper(query_embedding, lambda_mult)
+        helper.add_candidates(((row.content_id, row.text_embedding) for row in fetched), 0)
+
+        # Edges of the candidates, fetched in the background. Fetching edges does not
+        # change the selection, so the results are the same as without prefetch.
+        adjacents: Dict[str, Future] = {}
+
+        def fetch_adjacents(ids: Iterable[str]) -> None:
+            for content_id in ids:
+                if content_id not in adjacents:
+                    adjacents[content_id] = self._executor.submit(
+                        query_edges, (content_id, *conditions)
+                    )
+
+        try:
+            while len(helper.selected_ids) < k:
+                fetch_adjacents(
+                    self._adjacency_prefetch_ids(helper, k, depth, score_threshold)
                 )
-                for row in adjacents:
-                    target_id = row.target_content_id
-                    if target_id in selected_set:
-                        # The adjacent node is already included.
-                        continue
+                selected = helper.select_next(score_threshold)
+                if selected is None:
+                    break
+                selected_id, distance = selected
+
+                # Add unselected edges if reached nodes are within `depth`:
+                next_depth = distance + 1
+                if next_depth < depth:
+                    fetch_adjacents([selected_id])
+                    helper.add_candidates(
+                        (
+                            (row.target_content_id, row.target_text_embedding)
+                            for row in _followed_edges(
+                                adjacents[selected_id].result(), query_embedding, fan_out
+                            )
+                        ),
+                        next_depth,
+                    )
+        finally:
+            # The edges of candidates that were not selected aren't needed.
+            for future in adjacents.values():
+                future.cancel()
 
-                    if target_id in unselected:
-                        # The adjancent node is already in the pending set.
-                        # Update the distance if we found a shorter path to it.
-                        if next_depth < unselected[target_id].distance:
-                            unselected[target_id].distance = next_depth
-                        continue
+        return self._query_by_ids(helper.selected_ids)
+
+    async def ammr_traversal_search(
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 2,
+        fetch_k: int = 100,
+        lambda_mult: float = 0.5,
+        score_threshold: float = float("-inf"),
+        fan_out: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        """Retrieve documents from this graph store using MMR-traversal.
+
+        Async version of `mmr_traversal_search`, returning the same documents.
 
-                    adjacent = _Candidate(
-                        row.target_text_embedding, lambda_mult, query_embedding
+        Args:
+            query: The query string to search for.
+            k: Number of Documents to return. Defaults to 4.
+            fetch_k: Number of Documents to fetch via similarity.
+                Defaults to 10.
+            depth: Maximum depth of a node (number of edges) from a node
+                retrieved via similarity. Defaults to 2.
+            lambda_mult: Number between 0 and 1 that determines the degree
+                of diversity among the results with 0 corresponding to maximum
+                diversity and 1 to minimum diversity. Defaults to 0.5.
+            score_threshold: Only documents with a score greater than or equal
+                this threshold will be chosen. Defaults to -infinity.
+            fan_out: Maximum number of edges of a selected document whose targets
+                become candidates. The targets most similar to the query are kept.
+                Defaults to None (all the edges).
+            metadata_filter: Metadata entries the documents must have. Only the
+                matching documents are fetched by similarity, and only the edges to
+                matching documents are followed. Defaults to None (no filter).
+        """
+        conditions = _metadata_conditions(metadata_filter)
+        query_edges = self._query_edges_by_source.prepared(conditions)
+        query_embedding = await self._embedding.aembed_query(query)
+        fetched = await self._executor.aexecute(
+            self._query_ids_and_embedding_by_embedding.prepared(conditions),
+            (*conditions, query_embedding, fetch_k),
+        )
+
+        helper = MmrHelper(query_embedding, lambda_mult)
+        helper.add_candidates(((row.content_id, row.text_embedding) for row in fetched), 0)
+
+        # Edges of the candidates, fetched in the background.
+        adjacents: Dict[str, asyncio.Task] = {}
+
+        def fetch_adjacents(ids: Iterable[str]) -> None:
+            for content_id in ids:
+                if content_id not in adjacents:
+                    adjacents[content_id] = asyncio.ensure_future(
+                        self._executor.aexecute(query_edges, (content_id, *conditions))
                     )
-                    for selected_embedding in selected_embeddings:
-                        adjacent.update_for_selection(lambda_mult, selected_embedding)
 
-                    unselected[target_id] = adjacent
-                    if adjacent.score > best_score:
-                        best_score = adjacent.score
-                        next_id = row.target_content_id
+        try:
+            while len(helper.selected_ids) < k:
+                fetch_adjacents(
+                    self._adjacency_prefetch_ids(helper, k, depth, score_threshold)
+                )
+                selected = helper.select_next(score_threshold)
+                if selected is None:
+                    break
+                selected_id, distance = selected
+
+                # Add unselected edges if reached nodes are within `depth`:
+                next_depth = distance + 1
+                if next_depth < depth:
+                    fetch_adjacents([selected_id])
+                    helper.add_candidates(
+                        (
+                            (row.target_content_id, row.target_text_embedding)
+                            for row in _followed_edges(
+                                await adjacents[selected_id], query_embedding, fan_out
+                            )
+                        ),
+                        next_depth,
+                    )
+        finally:
+            # The edges of candidates that were not selected aren't needed.
+            for task in adjacents.values():
+                task.cancel()
 
-        return self._query_by_ids(selected_ids)
+        return await self._aquery_by_ids(helper.selected_ids)
 
     def traversal_search(
-        self, query: str, *, k: int = 4, depth: int = 1
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 1,
+        fan_out: Optional[int] = None,
+        max_visited: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
     ) -> Iterable[TextNode]:
         """Retrieve documents from this graph store.
 
@@ -629,39 +1584,158 @@ class GraphStore:
             k: The number of Documents to return from the initial vector search.
                 Defaults to 4.
             depth: The maximum depth of edges to traverse. Defaults to 1.
+            fan_out: Maximum number of edges followed from each node. For nodes
+                with more edges, the edges to the targets most similar to the query
+                are followed. Defaults to None (all the edges).
+            max_visited: Maximum number of nodes to visit (and return). Once
+                reached, no more nodes are discovered. Defaults to None (no limit).
+            metadata_filter: Metadata entries the documents must have. Only the
+                matching documents are retrieved by the vector search, and only the
+                edges to matching documents are traversed. Defaults to None (no
+                filter).
         Returns:
             Collection of retrieved documents.
         """
+        conditions = _metadata_conditions(metadata_filter)
+        query_linked_ids = self._query_linked_ids.prepared(conditions)
+        query_linked_ids_and_embedding = self._query_linked_ids_and_embedding.prepared(
+            conditions
+        )
+        query_embedding = self._embedding.embed_query(query)
         with self._concurrent_queries() as cq:
             visited = {}
 
-            def visit(d: int, nodes: Sequence[NamedTuple]):
+            def visit(d: int, nodes: Iterable[NamedTuple]):
                 nonlocal visited
                 for node in nodes:
                     content_id = node.content_id
+                    if content_id not in visited and _budget_spent(visited, max_visited):
+                        continue
                     if d <= visited.get(content_id, depth):
                         visited[content_id] = d
                         # We discovered this for the first time, or at a shorter depth.
-                        if d + 1 <= depth:
-                            cq.execute(
-                                self._query_linked_ids,
-                                parameters=(content_id,),
-                                callback=lambda n, _d=d: visit(_d + 1, n),
-                            )
+                        if d + 1 <= depth and not _budget_spent(visited, max_visited):
+                            visit_linked(d + 1, content_id)
+
+            def visit_linked(d: int, content_id: str):
+                if fan_out is None:
+                    cq.execute(
+                        query_linked_ids,
+                        parameters=(content_id, *conditions),
+                        callback=lambda nodes: visit(d, nodes),
+                    )
+                else:
+                    # The edges are ranked once all of them are fetched.
+                    cq.execute(
+                        query_linked_ids_and_embedding,
+                        parameters=(content_id, *conditions),
+                        callback=lambda rows: visit(
+                            d, _followed_edges(rows, query_embedding, fan_out)
+                        ),
+                        all_pages=True,
+                    )
 
-            query_embedding = self._embedding.embed_query(query)
             cq.execute(
-                self._query_ids_by_embedding,
-                parameters=(query_embedding, k),
+                self._query_ids_by_embedding.prepared(conditions),
+                parameters=(*conditions, query_embedding, k),
                 callback=lambda nodes: visit(0, nodes),
             )
 
         return self._query_by_ids(visited.keys())
 
+    async def atraversal_search(
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 1,
+        fan_out: Optional[int] = None,
+        max_visited: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        """Retrieve documents from this graph store.
+
+        Async version of `traversal_search`: the edges of the nodes discovered at
+        each depth are queried concurrently on the event loop.
+
+        Args:
+            query: The query string.
+            k: The number of Documents to return from the initial vector search.
+                Defaults to 4.
+            depth: The maximum depth of edges to traverse. Defaults to 1.
+            fan_out: Maximum number of edges followed from each node. For nodes
+                with more edges, the edges to the targets most similar to the query
+                are followed. Defaults to None (all the edges).
+            max_visited: Maximum number of nodes to visit (and return). Once
+                reached, no more nodes are discovered. Defaults to None (no limit).
+            metadata_filter: Metadata entries the documents must have. Only the
+                matching documents are retrieved by the vector search, and only the
+                edges to matching documents are traversed. Defaults to None (no
+                filter).
+        Returns:
+            Collection of retrieved documents.
+        """
+        conditions = _metadata_conditions(metadata_filter)
+        query_linked_ids = self._query_linked_ids.prepared(conditions)
+        query_linked_ids_and_embedding = self._query_linked_ids_and_embedding.prepared(
+            conditions
+        )
+        visited = {}
+
+        async def visit(d: int, nodes: Iterable[NamedTuple]):
+            linked = []
+            for node in nodes:
+                content_id = node.content_id
+                if content_id not in visited and _budget_spent(visited, max_visited):
+                    continue
+                if d <= visited.get(content_id, depth):
+                    visited[content_id] = d
+                    # We discovered this for the first time, or at a shorter depth.
+                    if d + 1 <= depth and not _budget_spent(visited, max_visited):
+                        linked.append(visit_linked(d + 1, content_id))
+            await asyncio.gather(*linked)
+
+        async def visit_linked(d: int, content_id: str):
+            if fan_out is None:
+                nodes = await self._executor.aexecute(
+                    query_linked_ids, (content_id, *conditions)
+                )
+            else:
+                rows = await self._executor.aexecute(
+                    query_linked_ids_and_embedding, (content_id, *conditions)
+                )
+                nodes = _followed_edges(rows, query_embedding, fan_out)
+            await visit(d, nodes)
+
+        query_embedding = await self._embedding.aembed_query(query)
+        nodes = await self._executor.aexecute(
+            self._query_ids_by_embedding.prepared(conditions),
+            (*conditions, query_embedding, k),
+        )
+        await visit(0, nodes)
+
+        return await self._aquery_by_ids(visited.keys())
+
     def similarity_search(
         self,
         embedding: List[float],
         k: int = 4,
+        metadata_filter: Optional[Dict[str, Any]] = None,
     ) -> Iterable[TextNode]:
-        for row in self._session.execute(self._query_by_embedding, (embedding, k)):
+        conditions = _metadata_conditions(metadata_filter)
+        for row in self._session.execute(
+            self._query_by_embedding.prepared(conditions), (*conditions, embedding, k)
+        ):
             yield _row_to_node(row)
+
+    async def asimilarity_search(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        conditions = _metadata_conditions(metadata_filter)
+        rows = await self._executor.aexecute(
+            self._query_by_embedding.prepared(conditions), (*conditions, embedding, k)
+        )
+        return [_row_to_node(row) for row in rows]
@@ -0,0 +1,598 @@
+import json
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+
+from ._mmr_helper import MmrHelper, _normalize, top_k_indices
+from .content import Kind
+from .embedding_model import EmbeddingModel
+from .graph_store import (
+    CONTENT_ID,
+    DEFAULT_BATCH_SIZE,
+    Node,
+    TextNode,
+    _batches,
+    _metadata_conditions,
+    _prepare_nodes,
+)
+
+# Initial capacity of the embedding matrix, doubled as needed.
+_INITIAL_CAPACITY = 128
+
+# The kind of the nodes, as written by `GraphStore`.
+_PASSAGE = f"{Kind.passage}"
+
+
+class _Snapshot(NamedTuple):
+    """The nodes and edges of the store when a search started.
+
+    Searches read the snapshot without the lock: nodes added since are beyond
+    `size`, and the nodes overwritten since are in new lists and matrices.
+    """
+
+    size: int
+    ids: List[str]
+    texts: List[str]
+    metadata: List[Tuple[str, Dict[str, str]]]
+    embeddings: np.ndarray
+    indptr: np.ndarray
+    """With `indices`, the CSR arrays of the edges: the targets of the node at
+    `position` are `indices[indptr[position]:indptr[position + 1]]`."""
+    indices: np.ndarray
+
+
+class InMemoryGraphStore:
+    def __init__(self, embedding: EmbeddingModel):
+        """A graph store keeping the nodes and edges in memory.
+
+        Implements the operations of `GraphStore`, with the same link-tag edge
+        semantics, without a Cassandra cluster: for tests, benchmarks and small
+        corpora. Nothing is persisted.
+
+        The normalized embeddings are kept in one contiguous matrix, the nodes
+        linking to / linked from each tag in inverted indexes, and the edges in
+        compressed sparse row (CSR) arrays, rebuilt after nodes are added.
+
+        The store can be searched while nodes are added from other threads: each
+        search reads the nodes and edges as they were when it started.
+
+        Args:
+            embedding: The embeddings to use for the document content.
+        """
+        self._embedding = embedding
+        self._lock = threading.Lock()
+
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        """Position of each node in the arrays."""
+        self._texts: List[str] = []
+        self._embeddings: Optional[np.ndarray] = None
+        """Normalized embeddings of the nodes, one row each."""
+        self._tags: List[Tuple[Set[str], Set[str]]] = []
+        """`(link_to_tags, link_from_tags)` of each node."""
+        self._metadata: List[Tuple[str, Dict[str, str]]] = []
+        """`(metadata_blob, metadata_s)` of each node, as stored by `GraphStore`."""
+
+        self._nodes_linking_to: Dict[str, Set[int]] = {}
+        self._nodes_linked_from: Dict[str, Set[int]] = {}
+
+        self._edges: Set[Tuple[int, int]] = set()
+        """`(source, target)` positions of the edges."""
+        self._csr: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        """`(indptr, indices)` of the edges, or None if nodes were added since."""
+
+    def _reserve(self, size: int, dim: int) -> None:
+        if self._embeddings is None:
+            self._embeddings = np.zeros((max(_INITIAL_CAPACITY, size), dim), np.float32)
+            return
+
+        capacity = len(self._embeddings)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        grown = np.zeros((capacity, dim), dtype=np.float32)
+        grown[: len(self._ids)] = self._embeddings[: len(self._ids)]
+        self._embeddings = grown
+
+    def add_nodes(
+        self,
+        nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> List[str]:
+        """Add nodes to the graph store.
+
+        Like `GraphStore.add_nodes`, the nodes are embedded `batch_size` at a time.
+
+        Args:
+            nodes: The nodes to add.
+            batch_size: Number of nodes embedded together. Defaults to 256.
+
+        Returns:
+            The IDs of the added nodes.
+        """
+        return list(self.add_nodes_streaming(nodes, batch_size=batch_size))
+
+    def add_nodes_streaming(
+        self,
+        nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[str]:
+        """Add nodes to the graph store, as the returned iterator is consumed.
+
+        Like `GraphStore.add_nodes_streaming`, the nodes of the batches not consumed
+        are not added.
+
+        Args:
+            nodes: The nodes to add.
+            batch_size: Number of nodes embedded together. Defaults to 256.
+
+        Returns:
+            An iterator over the IDs of the added nodes.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        return self._add_batches(nodes, batch_size)
+
+    def _add_batches(self, nodes: Iterable[Node], batch_size: int) -> Iterator[str]:
+        for texts, metadatas in _batches(nodes, batch_size):
+            text_embeddings = self._embedding.embed_texts(texts)
+            yield from self._add_batch(texts, text_embeddings, metadatas)
+
+    async def aadd_nodes(
+        self,
+        nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> List[str]:
+        """Add nodes to the graph store, embedding them asynchronously.
+
+        Args:
+            nodes: The nodes to add.
+            batch_size: Number of nodes embedded together. Defaults to 256.
+
+        Returns:
+            The IDs of the added nodes.
+        """
+        return [id async for id in self.aadd_nodes_streaming(nodes, batch_size=batch_size)]
+
+    async def aadd_nodes_streaming(
+        self,
+        nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> AsyncIterator[str]:
+        """Add nodes to the graph store, as the returned async iterator is consumed.
+
+        Args:
+            nodes: The nodes to add.
+            batch_size: Number of nodes embedded together. Defaults to 256.
+
+        Returns:
+            An async iterator over the IDs of the added nodes.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        for texts, metadatas in _batches(nodes, batch_size):
+            text_embeddings = await self._embedding.aembed_texts(texts)
+            for id in self._add_batch(texts, text_embeddings, metadatas):
+                yield id
+
+    def _add_batch(
+        self,
+        texts: List[str],
+        text_embeddings: List[List[float]],
+        metadatas: List[dict],
+    ) -> List[str]:
+        prepared = _prepare_nodes(texts, text_embeddings, metadatas)
+        with self._lock:
+            overwritten = {
+                self._positions[insert[0]]
+                for insert in prepared.inserts
+                if insert[0] in self._positions
+            }
+            if overwritten:
+                # Copied, rather than changed in place under the searches reading
+                # a snapshot.
+                self._texts = list(self._texts)
+                self._metadata = list(self._metadata)
+                self._embeddings = self._embeddings.copy()
+                # Upserted like by `GraphStore`: the edges of the previous tags are
+                # removed, and the edges of the current ones linked again.
+                self._edges = {
+                    (source, target)
+                    for source, target in self._edges
+                    if source not in overwritten and target not in overwritten
+                }
+            positions = [self._put_node(*insert) for insert in prepared.inserts]
+            # Linked once all the new nodes are indexed, so the edges between new
+            # nodes are found like the edges to existing nodes.
+            for position in positions:
+                self._link(position)
+            self._csr = None
+        return prepared.ids
+
+    def _put_node(
+        self,
+        id: str,
+        text: str,
+        text_embedding: List[float],
+        link_to_tags: Set[str],
+        link_from_tags: Set[str],
+        metadata_blob: str,
+        metadata_s: Dict[str, str],
+    ) -> int:
+        embedding = _normalize(np.asarray([text_embedding], dtype=np.float32))[0]
+        position = self._positions.get(id)
+        if position is None:
+            position = len(self._ids)
+            self._reserve(position + 1, len(embedding))
+            self._positions[id] = position
+            self._ids.append(id)
+            self._texts.append(text)
+            self._tags.append((link_to_tags, link_from_tags))
+            self._metadata.append((metadata_blob, metadata_s))
+        else:
+            # The node is overwritten: its previous tags no longer match.
+            previous_to_tags, previous_from_tags = self._tags[position]
+            for tag in previous_to_tags:
+                self._nodes_linking_to[tag].discard(position)
+            for tag in previous_from_tags:
+                self._nodes_linked_from[tag].discard(position)
+            self._texts[position] = text
+            self._tags[position] = (link_to_tags, link_from_tags)
+            self._metadata[position] = (metadata_blob, metadata_s)
+
+        self._embeddings[position] = embedding
+        for tag in link_to_tags:
+            self._nodes_linking_to.setdefault(tag, set()).add(position)
+        for tag in link_from_tags:
+            self._nodes_linked_from.setdefault(tag, set()).add(position)
+        return position
+
+    def _link(self, position: int) -> None:
+        link_to_tags, link_from_tags = self._tags[position]
+        for tag in link_from_tags:
+            for source in self._nodes_linking_to.get(tag, ()):
+                # Don't add self-cycles (could happen with bidirectional tags).
+                if source != position:
+                    self._edges.add((source, position))
+        for tag in link_to_tags:
+            for target in self._nodes_linked_from.get(tag, ()):
+                if target != position:
+                    self._edges.add((position, target))
+
+    def _snapshot(self) -> _Snapshot:
+        """The current nodes and edges, rebuilding the CSR arrays if needed."""
+        with self._lock:
+            size = len(self._ids)
+            if self._csr is None:
+                # Targets in the order of their IDs, like the rows of the edge table.
+                edges = sorted(self._edges, key=lambda edge: (edge[0], self._ids[edge[1]]))
+                edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+                indptr = np.zeros(size + 1, dtype=np.int64)
+                np.cumsum(np.bincount(edges[:, 0], minlength=size), out=indptr[1:])
+                self._csr = indptr, edges[:, 1].copy()
+            embeddings = self._embeddings
+            if embeddings is None:
+                embeddings = np.empty((0, 0), dtype=np.float32)
+            return _Snapshot(
+                size, self._ids, self._texts, self._metadata, embeddings, *self._csr
+            )
+
+    @staticmethod
+    def _node(snapshot: _Snapshot, position: int) -> TextNode:
+        metadata = json.loads(snapshot.metadata[position][0])
+        metadata[CONTENT_ID] = snapshot.ids[position]
+        metadata["kind"] = _PASSAGE
+        return TextNode(text=snapshot.texts[position], metadata=metadata)
+
+    @staticmethod
+    def _matching(
+        snapshot: _Snapshot, metadata_filter: Optional[Dict[str, Any]]
+    ) -> Optional[np.ndarray]:
+        """Mask of the nodes matching the metadata filter, or None if there is no
+        filter."""
+        conditions = _metadata_conditions(metadata_filter)
+        if not conditions:
+            return None
+        entries = list(zip(conditions[::2], conditions[1::2]))
+        return np.array(
+            [
+                all(metadata_s.get(key) == value for key, value in entries)
+                for _, metadata_s in snapshot.metadata[: snapshot.size]
+            ],
+            dtype=bool,
+        )
+
+    @staticmethod
+    def _similar(
+        snapshot: _Snapshot,
+        embedding: List[float],
+        k: int,
+        matching: Optional[np.ndarray],
+    ) -> np.ndarray:
+        """Positions of the (at most) `k` matching nodes most similar to the
+        embedding."""
+        query = _normalize(np.asarray([embedding], dtype=np.float32))[0]
+        if matching is None:
+            if snapshot.size == 0:
+                return np.empty(0, dtype=np.int64)
+            return top_k_indices(snapshot.embeddings[: snapshot.size] @ query, k)
+
+        candidates = np.flatnonzero(matching)
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64)
+        return candidates[top_k_indices(snapshot.embeddings[candidates] @ query, k)]
+
+    @staticmethod
+    def _followed_edges(
+        snapshot: _Snapshot,
+        position: int,
+        query_embedding: List[float],
+        fan_out: Optional[int],
+        matching: Optional[np.ndarray],
+    ) -> np.ndarray:
+        """The targets of the edges to follow from the node at `position`: all the
+        matching ones, or the `fan_out` most similar to the query."""
+        targets = snapshot.indices[snapshot.indptr[position] : snapshot.indptr[position + 1]]
+        if matching is not None:
+            targets = targets[matching[targets]]
+        if fan_out is None or len(targets) <= fan_out:
+            return targets
+        query = _normalize(np.asarray([query_embedding], dtype=np.float32))[0]
+        return targets[top_k_indices(snapshot.embeddings[targets] @ query, fan_out)]
+
+    def similarity_search(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        snapshot = self._snapshot()
+        matching = self._matching(snapshot, metadata_filter)
+        return [
+            self._node(snapshot, position)
+            for position in self._similar(snapshot, embedding, k, matching)
+        ]
+
+    async def asimilarity_search(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        return self.similarity_search(embedding, k, metadata_filter)
+
+    def traversal_search(
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 1,
+        fan_out: Optional[int] = None,
+        max_visited: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        """Retrieve documents from this graph store.
+
+        First, `k` nodes are retrieved using a vector search for the `query` string.
+        Then, additional nodes are discovered up to the given `depth` from those
+        starting nodes.
+
+        Args:
+            query: The query string.
+            k: The number of Documents to return from the initial vector search.
+                Defaults to 4.
+            depth: The maximum depth of edges to traverse. Defaults to 1.
+            fan_out: Maximum number of edges followed from each node. For nodes
+                with more edges, the edges to the targets most similar to the query
+                are followed. Defaults to None (all the edges).
+            max_visited: Maximum number of nodes to visit (and return). Once
+                reached, no more nodes are discovered. Defaults to None (no limit).
+            metadata_filter: Metadata entries the documents must have. Only the
+                matching documents are retrieved and traversed. Defaults to None
+                (no filter).
+        Returns:
+            Collection of retrieved documents, in breadth-first order.
+        """
+        return self._traverse(
+            self._embedding.embed_query(query),
+            k,
+            depth,
+            fan_out,
+            max_visited,
+            metadata_filter,
+        )
+
+    async def atraversal_search(
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 1,
+        fan_out: Optional[int] = None,
+        max_visited: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        """Async version of `traversal_search`."""
+        return self._traverse(
+            await self._embedding.aembed_query(query),
+            k,
+            depth,
+            fan_out,
+            max_visited,
+            metadata_filter,
+        )
+
+    def _traverse(
+        self,
+        query_embedding: List[float],
+        k: int,
+        depth: int,
+        fan_out: Optional[int],
+        max_visited: Optional[int],
+        metadata_filter: Optional[Dict[str, Any]],
+    ) -> List[TextNode]:
+        snapshot = self._snapshot()
+        matching = self._matching(snapshot, metadata_filter)
+        visited = np.zeros(snapshot.size, dtype=bool)
+        budget = snapshot.size if max_visited is None else max_visited
+
+        frontier = self._similar(snapshot, query_embedding, min(k, budget), matching)
+        visited[frontier] = True
+        budget -= len(frontier)
+        order = [frontier]
+        for _ in range(depth):
+            if len(frontier) == 0 or budget <= 0:
+                break
+            linked = np.concatenate(
+                [
+                    self._followed_edges(
+                        snapshot, position, query_embedding, fan_out, matching
+                    )
+                    for position in frontier
+                ]
+            )
+            linked = linked[~visited[linked]]
+            # Unique, in order of discovery.
+            _, first = np.unique(linked, return_index=True)
+            frontier = linked[np.sort(first)][:budget]
+            visited[frontier] = True
+            budget -= len(frontier)
+            order.append(frontier)
+
+        return [self._node(snapshot, position) for position in np.concatenate(order)]
+
+    def mmr_traversal_search(
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 2,
+        fetch_k: int = 100,
+        lambda_mult: float = 0.5,
+        score_threshold: float = float("-inf"),
+        fan_out: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        """Retrieve documents from this graph store using MMR-traversal.
+
+        Selects the same documents as `GraphStore.mmr_traversal_search`.
+
+        Args:
+            query: The query string to search for.
+            k: Number of Documents to return. Defaults to 4.
+            fetch_k: Number of Documents to fetch via similarity.
+                Defaults to 100.
+            depth: Maximum depth of a node (number of edges) from a node
+                retrieved via similarity. Defaults to 2.
+            lambda_mult: Number between 0 and 1 that determines the degree
+                of diversity among the results with 0 corresponding to maximum
+                diversity and 1 to minimum diversity. Defaults to 0.5.
+            score_threshold: Only documents with a score greater than or equal
+                this threshold will be chosen. Defaults to -infinity.
+            fan_out: Maximum number of edges of a selected document whose targets
+                become candidates. The targets most similar to the query are kept.
+                Defaults to None (all the edges).
+            metadata_filter: Metadata entries the documents must have. Only the
+                matching documents become candidates. Defaults to None (no filter).
+        """
+        return self._mmr_traverse(
+            self._embedding.embed_query(query),
+            k=k,
+            depth=depth,
+            fetch_k=fetch_k,
+            lambda_mult=lambda_mult,
+            score_threshold=score_threshold,
+            fan_out=fan_out,
+            metadata_filter=metadata_filter,
+        )
+
+    async def ammr_traversal_search(
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 2,
+        fetch_k: int = 100,
+        lambda_mult: float = 0.5,
+        score_threshold: float = float("-inf"),
+        fan_out: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[TextNode]:
+        """Async version of `mmr_traversal_search`."""
+        return self._mmr_traverse(
+            await self._embedding.aembed_query(query),
+            k=k,
+            depth=depth,
+            fetch_k=fetch_k,
+            lambda_mult=lambda_mult,
+            score_threshold=score_threshold,
+            fan_out=fan_out,
+            metadata_filter=metadata_filter,
+        )
+
+    def _mmr_traverse(
+        self,
+        query_embedding: List[float],
+        *,
+        k: int,
+        depth: int,
+        fetch_k: int,
+        lambda_mult: float,
+        score_threshold: float,
+        fan_out: Optional[int],
+        metadata_filter: Optional[Dict[str, Any]],
+    ) -> List[TextNode]:
+        snapshot = self._snapshot()
+        matching = self._matching(snapshot, metadata_filter)
+        positions: Dict[str, int] = {}
+
+        def candidates(reached: np.ndarray) -> Iterator[Tuple[str, np.ndarray]]:
+            for position in reached:
+                positions[snapshot.ids[position]] = position
+                yield snapshot.ids[position], snapshot.embeddings[position]
+
+        helper = MmrHelper(query_embedding, lambda_mult)
+        helper.add_candidates(
+            candidates(self._similar(snapshot, query_embedding, fetch_k, matching)), 0
+        )
+
+        while len(helper.selected_ids) < k:
+            selected = helper.select_next(score_threshold)
+            if selected is None:
+                break
+            selected_id, distance = selected
+
+            # Add unselected edges if reached nodes are within `depth`:
+            next_depth = distance + 1
+            if next_depth < depth:
+                helper.add_candidates(
+                    candidates(
+                        self._followed_edges(
+                            snapshot,
+                            positions[selected_id],
+                            query_embedding,
+                            fan_out,
+                            matching,
+                        )
+                    ),
+                    next_depth,
+                )
+
+        return [self._node(snapshot, positions[id]) for id in helper.selected_ids]
@@ -0,0 +1,385 @@
+"""
+An in-process stand-in for the Cassandra `Session` used by the benchmark suite.
+
+It interprets the subset of CQL issued by the `GraphStore` (table and index creation,
+added columns, inserts, deletes by primary key, key / `IN` / `CONTAINS` / map entry
+lookups and `ANN OF` queries) over in-memory tables.
+Every statement completes on a single background thread, like the callbacks of the
+driver's event loop, after a configurable latency plus jitter, so that the benchmarks
+reproduce the round-trip profile of a remote cluster without needing one.
+"""
+
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from cassandra import InvalidRequest
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE IF NOT EXISTS (\S+) \((.*)\)$", re.IGNORECASE)
+_ALTER_TABLE_ADD = re.compile(r"ALTER TABLE (\S+) ADD \((.*)\)$", re.IGNORECASE)
+_INSERT = re.compile(r"INSERT INTO (\S+) \((.*?)\) VALUES \((.*)\)$", re.IGNORECASE)
+_DELETE = re.compile(r"DELETE FROM (\S+) WHERE (.*)$", re.IGNORECASE)
+_SELECT = re.compile(
+    r"SELECT (.*?) FROM (\S+)(?: WHERE (.*?))?(?: ORDER BY (\w+) ANN OF \?)?"
+    r"(?: LIMIT (\?|\d+))?$",
+    re.IGNORECASE,
+)
+_EQ = re.compile(r"(\w+) = \?")
+_IN = re.compile(r"(\w+) IN \?", re.IGNORECASE)
+_CONTAINS = re.compile(r"(\w+) CONTAINS \?", re.IGNORECASE)
+_ENTRY = re.compile(r"(\w+)\[\?\] = \?")
+
+
+def _normalize(query: str) -> str:
+    query = re.sub(r"--[^\n]*", "", query)
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Splits on the commas which are not nested in (), <> or []."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char in "(<[":
+            depth += 1
+        elif char in ")>]":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current).strip())
+    return parts
+
+
+def _table_name(name: str) -> str:
+    return name.split(".")[-1]
+
+
+class FakeStatement:
+    """A prepared statement of the `FakeSession`."""
+
+    def __init__(self, query: str):
+        self.query_string = query
+        self.normalized = _normalize(query)
+        self.consistency_level = None
+
+
+class _Table:
+    def __init__(self, columns: List[str], primary_key: List[str]):
+        self.columns = columns
+        self.primary_key = primary_key
+        # Rows by partition key, then by full primary key.
+        self.partitions: Dict[Any, Dict[Tuple, Dict[str, Any]]] = {}
+
+    @property
+    def partition_key(self) -> str:
+        return self.primary_key[0]
+
+    def put(self, row: Dict[str, Any]) -> None:
+        partition = self.partitions.setdefault(row[self.partition_key], {})
+        key = tuple(row[column] for column in self.primary_key)
+        partition.setdefault(key, {}).update(row)
+
+    def delete(self, key: Tuple) -> None:
+        partition = self.partitions.get(key[0], {})
+        partition.pop(key, None)
+        if not partition:
+            self.partitions.pop(key[0], None)
+
+    def scan(self, partition_keys: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        if partition_keys is None:
+            partitions = list(self.partitions.values())
+        else:
+            partitions = [self.partitions.get(key, {}) for key in partition_keys]
+        return [row for partition in partitions for row in partition.values()]
+
+
+class FakeResponseFuture:
+    """The subset of `ResponseFuture` used by the `GraphStore`. Results have a single
+    page."""
+
+    has_more_pages = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._rows: Optional[List[Any]] = None
+        self._error: Optional[BaseException] = None
+        self._callbacks: List[Tuple[Callable, Tuple, Dict]] = []
+        self._errbacks: List[Tuple[Callable, Tuple, Dict]] = []
+
+    def _complete(self, rows: Optional[List[Any]], error: Optional[BaseException]) -> None:
+        with self._lock:
+            self._rows, self._error = rows, error
+            self._done.set()
+            callbacks = self._callbacks if error is None else self._errbacks
+        for fn, args, kwargs in callbacks:
+            fn(rows if error is None else error, *args, **kwargs)
+
+    def add_callback(self, fn, *args, **kwargs) -> None:
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append((fn, args, kwargs))
+                return
+        if self._error is None:
+            fn(self._rows, *args, **kwargs)
+
+    def add_errback(self, fn, *args, **kwargs) -> None:
+        with self._lock:
+            if not self._done.is_set():
+                self._errbacks.append((fn, args, kwargs))
+                return
+        if self._error is not None:
+            fn(self._error, *args, **kwargs)
+
+    def add_callbacks(
+        self,
+        callback,
+        errback,
+        callback_args=(),
+        callback_kwargs=None,
+        errback_args=(),
+        errback_kwargs=None,
+    ) -> None:
+        self.add_callback(callback, *callback_args, **(callback_kwargs or {}))
+        self.add_errback(errback, *errback_args, **(errback_kwargs or {}))
+
+    def result(self) -> List[Any]:
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._rows
+
+    def start_fetching_next_page(self) -> None:
+        raise RuntimeError("no more pages")
+
+
+class FakeSession:
+    """
+    An in-memory implementation of the `Session` methods used by the `GraphStore`.
+
+    Each statement waits for `latency_ms` plus an exponentially distributed jitter
+    with mean `jitter_ms`, which gives the long right tail of real network round
+    trips. Executed statements are counted by kind (`insert`, `delete`,
+    `select:<table>`, `ann:<table>` and `ddl`) in `calls`. Like Cassandra, adding a
+    column that exists fails with `InvalidRequest`.
+
+    There is no token map, so `cluster.metadata.get_replicas` finds no replicas,
+    like the driver when token metadata is disabled.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 42):
+        """
+        Initializes an empty fake session.
+
+        Args:
+            latency_ms: Fixed latency of every statement, in milliseconds.
+            jitter_ms: Mean of the exponential jitter added to every statement, in
+                milliseconds.
+            seed: Seed of the jitter random generator.
+        """
+        self._latency = latency_ms / 1000.0
+        self._jitter = jitter_ms / 1000.0
+        self._random = random.Random(seed)
+        self._tables: Dict[str, _Table] = {}
+        self._data_lock = threading.Lock()
+
+        self._queue: List[Tuple[float, int, Callable[[], None]]] = []
+        self._sequence = itertools.count()
+        self._queue_cond = threading.Condition()
+        self._worker = threading.Thread(target=self._run, daemon=True, name="fake-session")
+        self._worker.start()
+
+        self.cluster = SimpleNamespace(
+            metadata=SimpleNamespace(get_replicas=lambda keyspace, key: [])
+        )
+        self.calls: Counter = Counter()
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        """Copies of the rows of a table."""
+        with self._data_lock:
+            return [dict(row) for row in self._tables[table].scan()]
+
+    def prepare(self, query: str) -> FakeStatement:
+        return FakeStatement(query)
+
+    def execute(self, query, parameters: Optional[Sequence[Any]] = None) -> List[Any]:
+        return self.execute_async(query, parameters).result()
+
+    def execute_async(
+        self, query, parameters: Optional[Sequence[Any]] = None
+    ) -> FakeResponseFuture:
+        statement = query if isinstance(query, FakeStatement) else FakeStatement(query)
+        future = FakeResponseFuture()
+
+        def complete() -> None:
+            try:
+                rows = self._execute(statement.normalized, list(parameters or ()))
+            except Exception as e:  # noqa: BLE001
+                future._complete(None, e)
+            else:
+                future._complete(rows, None)
+
+        with self._queue_cond:
+            delay = self._latency
+            if self._jitter > 0:
+                delay += self._random.expovariate(1.0 / self._jitter)
+            due = time.monotonic() + delay
+            heapq.heappush(self._queue, (due, next(self._sequence), complete))
+            self._queue_cond.notify()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            with self._queue_cond:
+                while not self._queue:
+                    self._queue_cond.wait()
+                due, _, complete = self._queue[0]
+                now = time.monotonic()
+                if due > now:
+                    self._queue_cond.wait(due - now)
+                    continue
+                heapq.heappop(self._queue)
+            complete()
+
+    def _execute(self, query: str, params: List[Any]) -> List[Any]:
+        keyword = query.split(" ", 1)[0].upper()
+        with self._data_lock:
+            if keyword == "CREATE":
+                self.calls["ddl"] += 1
+                return self._create(query)
+            if keyword == "ALTER":
+                self.calls["ddl"] += 1
+                return self._alter(query)
+            if keyword == "INSERT":
+                self.calls["insert"] += 1
+                return self._insert(query, params)
+            if keyword == "DELETE":
+                self.calls["delete"] += 1
+                return self._delete(query, params)
+            if keyword == "SELECT":
+                return self._select(query, params)
+        raise ValueError(f"unsupported query: {query}")
+
+    def _create(self, query: str) -> List[Any]:
+        match = _CREATE_TABLE.match(query)
+        if match is None:
+            # Indexes are implicit: every column can be filtered on.
+            return []
+        name = _table_name(match.group(1))
+        if name not in self._tables:
+            columns, primary_key = [], []
+            for definition in _split_top_level(match.group(2)):
+                if definition.upper().startswith("PRIMARY KEY"):
+                    primary_key = re.findall(r"\w+", definition)[2:]
+                elif definition:
+                    columns.append(definition.split(" ")[0])
+            self._tables[name] = _Table(columns, primary_key)
+        return []
+
+    def _alter(self, query: str) -> List[Any]:
+        match = _ALTER_TABLE_ADD.match(query)
+        if match is None:
+            raise ValueError(f"unsupported query: {query}")
+        table = self._tables[_table_name(match.group(1))]
+        columns = [definition.split(" ")[0] for definition in _split_top_level(match.group(2))]
+        for column in columns:
+            if column in table.columns:
+                raise InvalidRequest(f"Column with name '{column}' already exists")
+        table.columns.extend(columns)
+        return []
+
+    def _insert(self, query: str, params: List[Any]) -> List[Any]:
+        match = _INSERT.match(query)
+        table = self._tables[_table_name(match.group(1))]
+        columns = [column.strip() for column in match.group(2).split(",")]
+        values = [
+            params.pop(0) if value == "?" else value.strip("'")
+            for value in _split_top_level(match.group(3))
+        ]
+        table.put(dict(zip(columns, values)))
+        return []
+
+    def _delete(self, query: str, params: List[Any]) -> List[Any]:
+        match = _DELETE.match(query)
+        table = self._tables[_table_name(match.group(1))]
+        values = dict(zip(_EQ.findall(match.group(2)), params))
+        table.delete(tuple(values[column] for column in table.primary_key))
+        return []
+
+    def _filter(self, table: _Table, where: str, params: List[Any]) -> List[Dict[str, Any]]:
+        """The rows matching the conditions, read from the partitions they restrict
+        the partition key to, if any."""
+        partition_keys = None
+        predicates = []
+        for condition in re.split(r" AND ", where, flags=re.IGNORECASE):
+            match = _IN.fullmatch(condition)
+            if match:
+                column, values = match.group(1), set(params.pop(0))
+                if column == table.partition_key:
+                    partition_keys = values
+                predicates.append(lambda row, c=column, v=values: row.get(c) in v)
+                continue
+            match = _CONTAINS.fullmatch(condition)
+            if match:
+                column, value = match.group(1), params.pop(0)
+                predicates.append(lambda row, c=column, v=value: v in (row.get(c) or ()))
+                continue
+            match = _ENTRY.fullmatch(condition)
+            if match:
+                column, key, value = match.group(1), params.pop(0), params.pop(0)
+                predicates.append(
+                    lambda row, c=column, k=key, v=value: (row.get(c) or {}).get(k) == v
+                )
+                continue
+            match = _EQ.fullmatch(condition)
+            if match:
+                column, value = match.group(1), params.pop(0)
+                if column == table.partition_key:
+                    partition_keys = [value]
+                predicates.append(lambda row, c=column, v=value: row.get(c) == v)
+                continue
+            raise ValueError(f"unsupported condition: {condition}")
+        return [
+            row
+            for row in table.scan(partition_keys)
+            if all(predicate(row) for predicate in predicates)
+        ]
+
+    def _select(self, query: str, params: List[Any]) -> List[Any]:
+        match = _SELECT.match(query)
+        if match is None:
+            raise ValueError(f"unsupported query: {query}")
+        projection, table_name, where, ann_column, limit = match.groups()
+        name = _table_name(table_name)
+        table = self._tables[name]
+
+        rows = self._filter(table, where, params) if where else table.scan()
+        if ann_column:
+            self.calls[f"ann:{name}"] += 1
+            query_vector = np.asarray(params.pop(0), dtype=np.float32)
+            if rows:
+                vectors = np.asarray([row[ann_column] for row in rows], dtype=np.float32)
+                norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+                similarity = (vectors @ query_vector) / np.where(norms == 0, 1.0, norms)
+                rows = [rows[i] for i in np.argsort(-similarity, kind="stable")]
+        else:
+            self.calls[f"select:{name}"] += 1
+        if limit is not None:
+            rows = rows[: params.pop(0) if limit == "?" else int(limit)]
+
+        fields = []
+        for item in _split_top_level(projection):
+            parts = re.split(r" AS ", item, flags=re.IGNORECASE)
+            fields.append((parts[0], parts[-1]))
+        row_type = namedtuple("Row", [alias for _, alias in fields])
+        return [row_type(*(row.get(column) for column, _ in fields)) for row in rows]
@@ -0,0 +1,316 @@
+"""
+Reproducible, offline benchmarks for the ragstack_knowledge_store graph stores.
+
+Synthetic corpora with power-law link-tag popularity are added to an
+`InMemoryGraphStore` and to a `GraphStore` over a `FakeSession` with injected latency
+and jitter, then the traversal and MMR-traversal searches are exercised across their
+knobs. Results, including the number of round trips per operation, are written as
+JSON so that runs can be compared to track regressions.
+
+Usage (from `libs/knowledge-store`):
+
+    python -m tests.benchmarks.run_benchmarks \
+        --num-nodes 1000 10000 --tag-exponent 0 1.2 \
+        --k 4 10 --depth 1 2 --fetch-k 20 100 \
+        --latency-ms 2 --jitter-ms 1 \
+        --output benchmark_results.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ragstack_knowledge_store import GraphStore, InMemoryGraphStore, TextNode
+from ragstack_knowledge_store.graph_store import DEFAULT_BATCH_SIZE
+
+from .fake_session import FakeSession
+from .synthetic_graph import (
+    SyntheticEmbeddingModel,
+    SyntheticGraph,
+    generate_graph,
+    generate_queries,
+)
+
+RESULTS_SCHEMA_VERSION = 1
+
+BACKENDS = ("in_memory", "graph_store")
+
+_Store = Union[GraphStore, InMemoryGraphStore]
+
+
+@dataclass
+class BenchmarkConfig:
+    backends: List[str] = field(default_factory=lambda: list(BACKENDS))
+    num_nodes: List[int] = field(default_factory=lambda: [1_000])
+    tag_exponent: List[float] = field(default_factory=lambda: [0.0, 1.0])
+    k: List[int] = field(default_factory=lambda: [4, 10])
+    depth: List[int] = field(default_factory=lambda: [1, 2])
+    fetch_k: List[int] = field(default_factory=lambda: [20, 100])
+    num_queries: int = 20
+    warmup_queries: int = 2
+    num_topics: int = 20
+    num_link_tags: int = 200
+    tags_per_node: float = 2.0
+    bidir_fraction: float = 0.3
+    dim: int = 64
+    batch_size: int = DEFAULT_BATCH_SIZE
+    latency_ms: float = 1.0
+    jitter_ms: float = 0.5
+    seed: int = 42
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarizes samples with nearest-rank percentiles.
+    """
+    if len(samples) == 0:
+        return {}
+
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(ordered) - 1, int(round(p / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "min": ordered[0],
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "max": ordered[-1],
+    }
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+    }
+
+
+def _round_trips(session: Optional[FakeSession], before: Counter, count: int) -> Any:
+    """The statements executed by `session` since `before`, per kind and in total,
+    divided by `count`. None for the backends without a session."""
+    if session is None:
+        return None
+    executed = session.calls - before
+    per_kind = {kind: calls / count for kind, calls in sorted(executed.items())}
+    return {"total": sum(executed.values()) / count, **per_kind}
+
+
+def _create_store(
+    backend: str, config: BenchmarkConfig
+) -> Tuple[_Store, Optional[FakeSession]]:
+    embedding = SyntheticEmbeddingModel(dim=config.dim)
+    if backend == "in_memory":
+        return InMemoryGraphStore(embedding), None
+    if backend == "graph_store":
+        session = FakeSession(
+            latency_ms=config.latency_ms, jitter_ms=config.jitter_ms, seed=config.seed
+        )
+        return GraphStore(embedding, session=session, keyspace="benchmarks"), session
+    raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+
+
+def _num_edges(store: _Store, session: Optional[FakeSession]) -> int:
+    if session is None:
+        return len(store._edges)
+    return len(session.rows("graph_edges"))
+
+
+def _bench_add(
+    store: _Store,
+    session: Optional[FakeSession],
+    graph: SyntheticGraph,
+    batch_size: int,
+) -> Dict[str, Any]:
+    calls_before = Counter(session.calls) if session is not None else Counter()
+
+    start = time.perf_counter()
+    added = len(store.add_nodes(graph.nodes, batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "nodes": added,
+        "link_tags": graph.num_link_tags,
+        "edges": _num_edges(store, session),
+        "batch_size": batch_size,
+        "seconds": elapsed,
+        "nodes_per_second": added / elapsed,
+        "round_trips_per_node": _round_trips(session, calls_before, added),
+    }
+
+
+def _bench_search(
+    search: Callable[[str], List[TextNode]],
+    session: Optional[FakeSession],
+    queries: List[str],
+    warmup: int,
+) -> Dict[str, Any]:
+    for query in queries[:warmup]:
+        search(query)
+
+    calls_before = Counter(session.calls) if session is not None else Counter()
+    latencies = []
+    num_results = 0
+    for query in queries:
+        start = time.perf_counter()
+        results = search(query)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        num_results += len(results)
+
+    return {
+        "latency_ms": percentiles(latencies),
+        "qps": len(queries) / (sum(latencies) / 1000.0),
+        "mean_results": num_results / len(queries),
+        "round_trips_per_query": _round_trips(session, calls_before, len(queries)),
+    }
+
+
+def run_benchmarks(config: BenchmarkConfig) -> Dict[str, Any]:
+    """
+    Runs the benchmark matrix described by `config` and returns the results as a dict.
+    """
+    results: List[Dict[str, Any]] = []
+
+    for num_nodes in config.num_nodes:
+        for tag_exponent in config.tag_exponent:
+            graph = generate_graph(
+                num_nodes=num_nodes,
+                num_topics=config.num_topics,
+                num_link_tags=config.num_link_tags,
+                tags_per_node=config.tags_per_node,
+                tag_exponent=tag_exponent,
+                bidir_fraction=config.bidir_fraction,
+                seed=config.seed,
+            )
+            queries = generate_queries(
+                graph, num_queries=config.num_queries, seed=config.seed + 1
+            )
+
+            for backend in config.backends:
+                common = {
+                    "backend": backend,
+                    "num_nodes": num_nodes,
+                    "tag_exponent": tag_exponent,
+                }
+                store, session = _create_store(backend, config)
+
+                add = _bench_add(store, session, graph, config.batch_size)
+                results.append({"benchmark": "add_nodes", **common, **add})
+                logging.info(
+                    f"{backend}: added {num_nodes} nodes with {add['edges']} edges "
+                    f"(tag exponent {tag_exponent}) in {add['seconds']:.1f}s"
+                )
+
+                for k in config.k:
+                    for depth in config.depth:
+                        search = _bench_search(
+                            lambda query: store.traversal_search(query, k=k, depth=depth),
+                            session=session,
+                            queries=queries,
+                            warmup=config.warmup_queries,
+                        )
+                        results.append(
+                            {
+                                "benchmark": "traversal_search",
+                                **common,
+                                "k": k,
+                                "depth": depth,
+                                **search,
+                            }
+                        )
+
+                        for fetch_k in config.fetch_k:
+                            if fetch_k < k:
+                                continue
+                            search = _bench_search(
+                                lambda query: store.mmr_traversal_search(
+                                    query, k=k, depth=depth, fetch_k=fetch_k
+                                ),
+                                session=session,
+                                queries=queries,
+                                warmup=config.warmup_queries,
+                            )
+                            results.append(
+                                {
+                                    "benchmark": "mmr_traversal_search",
+                                    **common,
+                                    "k": k,
+                                    "depth": depth,
+                                    "fetch_k": fetch_k,
+                                    **search,
+                                }
+                            )
+
+    return {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "environment": environment(),
+        "config": asdict(config),
+        "results": results,
+    }
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> Tuple[BenchmarkConfig, Optional[str]]:
+    defaults = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--backends", type=str, nargs="+", choices=BACKENDS, default=defaults.backends
+    )
+    parser.add_argument("--num-nodes", type=int, nargs="+", default=defaults.num_nodes)
+    parser.add_argument(
+        "--tag-exponent",
+        type=float,
+        nargs="+",
+        default=defaults.tag_exponent,
+        help="exponent of the power-law popularity of the link tags (0 is uniform)",
+    )
+    parser.add_argument("--k", type=int, nargs="+", default=defaults.k)
+    parser.add_argument("--depth", type=int, nargs="+", default=defaults.depth)
+    parser.add_argument("--fetch-k", type=int, nargs="+", default=defaults.fetch_k)
+    parser.add_argument("--num-queries", type=int, default=defaults.num_queries)
+    parser.add_argument("--warmup-queries", type=int, default=defaults.warmup_queries)
+    parser.add_argument("--num-topics", type=int, default=defaults.num_topics)
+    parser.add_argument("--num-link-tags", type=int, default=defaults.num_link_tags)
+    parser.add_argument("--tags-per-node", type=float, default=defaults.tags_per_node)
+    parser.add_argument("--bidir-fraction", type=float, default=defaults.bidir_fraction)
+    parser.add_argument("--dim", type=int, default=defaults.dim)
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", type=str, default=None, help="path of the JSON results")
+
+    args = vars(parser.parse_args(argv))
+    output = args.pop("output")
+    return BenchmarkConfig(**args), output
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    config, output = _parse_args(argv)
+
+    report = run_benchmarks(config)
+    serialized = json.dumps(report, indent=2)
+
+    if output is None:
+        print(serialized)
+    else:
+        with open(output, "w") as f:
+            f.write(serialized)
+        logging.info(f"wrote benchmark results to {output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
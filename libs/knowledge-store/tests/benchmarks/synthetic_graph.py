@@ -0,0 +1,163 @@
+"""
+Generators for synthetic, reproducible graph-store corpora and queries.
+
+Every node belongs to one of a set of random "topics": its text names the topic twice
+and the node once, and the `SyntheticEmbeddingModel` embeds texts as the normalized
+mean of fixed random word vectors, so nodes of the same topic are close to each other
+and to the queries about that topic.
+
+Link tags are drawn from a pool with power-law popularity, so that a few "hub" tags
+are shared by many nodes, like the navigation links of a web site, while most tags
+link a handful of nodes. A fraction of the tags are bidirectional (like keywords), the
+others are incoming or outgoing (like hyperlinks).
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from ragstack_knowledge_store import EmbeddingModel, TextNode
+from ragstack_knowledge_store.link_tag import (
+    BidirLinkTag,
+    IncomingLinkTag,
+    LinkTag,
+    OutgoingLinkTag,
+)
+
+
+class SyntheticEmbeddingModel(EmbeddingModel):
+    """
+    A deterministic embedding model that needs no model or API.
+
+    Each whitespace-separated word maps to a fixed random unit vector derived from its
+    hash, and a text is embedded as the normalized mean of its word vectors.
+    """
+
+    def __init__(self, dim: int = 64):
+        self._dim = dim
+        self._words: Dict[str, np.ndarray] = {}
+
+    def _embed_word(self, word: str) -> np.ndarray:
+        vector = self._words.get(word)
+        if vector is None:
+            digest = hashlib.sha256(word.encode("utf-8")).digest()
+            generator = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+            vector = generator.standard_normal(self._dim, dtype=np.float32)
+            self._words[word] = vector
+        return vector
+
+    def _embed(self, text: str) -> List[float]:
+        words = text.split() or [""]
+        vector = np.mean([self._embed_word(word) for word in words], axis=0)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_texts(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+@dataclass
+class SyntheticGraph:
+    """A corpus of linked nodes."""
+
+    nodes: List[TextNode]
+
+    num_topics: int
+
+    @property
+    def num_link_tags(self) -> int:
+        return sum(len(node.metadata["link_tags"]) for node in self.nodes)
+
+    @property
+    def num_edges(self) -> int:
+        """The number of (source, target) pairs linked by at least one tag."""
+        sources: Dict[Tuple[str, str], Set[str]] = {}
+        targets: Dict[Tuple[str, str], Set[str]] = {}
+        for node in self.nodes:
+            content_id = node.metadata["content_id"]
+            for tag in node.metadata["link_tags"]:
+                key = (tag.kind, tag.tag)
+                if tag.direction in ("outgoing", "bidir"):
+                    sources.setdefault(key, set()).add(content_id)
+                if tag.direction in ("incoming", "bidir"):
+                    targets.setdefault(key, set()).add(content_id)
+
+        edges = set()
+        for key, tag_sources in sources.items():
+            for target in targets.get(key, ()):
+                edges.update((source, target) for source in tag_sources if source != target)
+        return len(edges)
+
+
+def generate_graph(
+    num_nodes: int,
+    num_topics: int = 20,
+    num_link_tags: int = 200,
+    tags_per_node: float = 2.0,
+    tag_exponent: float = 1.0,
+    bidir_fraction: float = 0.3,
+    seed: int = 42,
+) -> SyntheticGraph:
+    """
+    Generates a reproducible corpus of `num_nodes` linked nodes.
+
+    Args:
+        num_nodes: Number of nodes to generate.
+        num_topics: Number of topics the nodes are spread over.
+        num_link_tags: Size of the pool of link tags.
+        tags_per_node: Mean number of link tags per node (Poisson distributed).
+        tag_exponent: Exponent of the power-law popularity of the link tags: the
+            tag of rank `r` is drawn with a weight of `1 / r ** tag_exponent`. 0 draws
+            the tags uniformly, larger values concentrate the links on a few hubs.
+        bidir_fraction: Fraction of the link tags which are bidirectional. The
+            other tags are incoming or outgoing with equal probability.
+        seed: Seed of the random generator.
+
+    Returns:
+        The generated corpus.
+    """
+    generator = np.random.default_rng(seed)
+
+    weights = 1.0 / np.arange(1, num_link_tags + 1) ** tag_exponent
+    weights /= weights.sum()
+    bidir = generator.random(num_link_tags) < bidir_fraction
+
+    topics = generator.integers(0, num_topics, num_nodes)
+    tag_counts = generator.poisson(tags_per_node, num_nodes)
+
+    nodes = []
+    for i in range(num_nodes):
+        link_tags: Set[LinkTag] = set()
+        for tag in generator.choice(num_link_tags, size=tag_counts[i], p=weights):
+            if bidir[tag]:
+                link_tags.add(BidirLinkTag(kind="keyword", tag=f"kw{tag}"))
+            elif generator.random() < 0.5:
+                link_tags.add(IncomingLinkTag(kind="hyperlink", tag=f"url{tag}"))
+            else:
+                link_tags.add(OutgoingLinkTag(kind="hyperlink", tag=f"url{tag}"))
+        nodes.append(
+            TextNode(
+                text=f"topic{topics[i]} topic{topics[i]} node{i}",
+                metadata={"content_id": f"n{i}", "link_tags": link_tags},
+            )
+        )
+    return SyntheticGraph(nodes=nodes, num_topics=num_topics)
+
+
+def generate_queries(graph: SyntheticGraph, num_queries: int, seed: int = 7) -> List[str]:
+    """
+    Generates query texts, each about a random topic of the corpus.
+    """
+    generator = np.random.default_rng(seed)
+    topics = generator.integers(0, graph.num_topics, num_queries)
+    return [f"topic{topic} query{i}" for i, topic in enumerate(topics)]
@@ -0,0 +1,59 @@
+import json
+
+from .run_benchmarks import BenchmarkConfig, percentiles, run_benchmarks
+from .synthetic_graph import SyntheticEmbeddingModel, generate_graph
+
+
+def test_percentiles():
+    stats = percentiles([float(i) for i in range(1, 101)])
+    assert stats["p50"] == 50.0
+    assert stats["p90"] == 90.0
+    assert stats["p99"] == 99.0
+    assert stats["max"] == 100.0
+
+
+def test_graph_is_reproducible():
+    graph_1 = generate_graph(num_nodes=200, seed=3)
+    graph_2 = generate_graph(num_nodes=200, seed=3)
+
+    assert [node.text for node in graph_1.nodes] == [node.text for node in graph_2.nodes]
+    assert [node.metadata for node in graph_1.nodes] == [
+        node.metadata for node in graph_2.nodes
+    ]
+    embedding_1, embedding_2 = SyntheticEmbeddingModel(), SyntheticEmbeddingModel()
+    assert embedding_1.embed_query("topic1 node2") == embedding_2.embed_query("topic1 node2")
+
+
+def test_tag_exponent_creates_hubs():
+    uniform = generate_graph(num_nodes=500, tag_exponent=0.0)
+    power_law = generate_graph(num_nodes=500, tag_exponent=1.5)
+    assert power_law.num_edges > 2 * uniform.num_edges
+
+
+def test_run_benchmarks_smoke():
+    config = BenchmarkConfig(
+        num_nodes=[100],
+        tag_exponent=[1.0],
+        k=[2],
+        depth=[1],
+        fetch_k=[1, 10],
+        num_queries=2,
+        warmup_queries=1,
+        latency_ms=0.0,
+        jitter_ms=0.0,
+    )
+    report = run_benchmarks(config)
+
+    assert {r["benchmark"] for r in report["results"]} == {
+        "add_nodes",
+        "traversal_search",
+        "mmr_traversal_search",
+    }
+    # fetch_k below k is skipped
+    assert len(report["results"]) == 2 * 3
+    searches = [r for r in report["results"] if r["benchmark"] == "traversal_search"]
+    assert set(searches[0]["latency_ms"]) >= {"p50", "p90", "p99"}
+    assert searches[0]["round_trips_per_query"] is None
+    assert searches[1]["round_trips_per_query"]["total"] > 0
+    # results must be machine readable
+    json.dumps(report)
@@ -0,0 +1,263 @@
+import asyncio
+import time
+from typing import Any, Callable, List, Optional
+
+import pytest
+from cassandra import OperationTimedOut
+
+from ragstack_knowledge_store.concurrency import ConcurrentQueries, QueryExecutor
+
+
+class ManualFuture:
+    """A `ResponseFuture` whose pages and errors are delivered by the test."""
+
+    def __init__(self, parameters: Any):
+        self.parameters = parameters
+        self.has_more_pages = False
+        self.next_pages_fetched = 0
+        self._callback: Optional[Callable] = None
+        self._errback: Optional[Callable] = None
+
+    def add_callbacks(self, callback: Callable, errback: Callable) -> None:
+        self._callback, self._errback = callback, errback
+
+    def start_fetching_next_page(self) -> None:
+        self.next_pages_fetched += 1
+
+    def page(self, rows: List[Any], more: bool = False) -> None:
+        self.has_more_pages = more
+        self._callback(rows)
+
+    def fail(self, error: BaseException) -> None:
+        self._errback(error)
+
+
+class ManualSession:
+    """Records the executed queries, which only complete when the test says so."""
+
+    def __init__(self):
+        self.futures: List[ManualFuture] = []
+        # Raised by `execute_async`, like a query whose parameters can't be bound.
+        self.error: Optional[BaseException] = None
+
+    def execute_async(self, query: Any, parameters: Any = None) -> ManualFuture:
+        if self.error is not None:
+            raise self.error
+        future = ManualFuture(parameters)
+        self.futures.append(future)
+        return future
+
+
+async def test_cancelled_after_grant_releases_slot() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, concurrency=1, max_concurrency=1)
+
+    first = asyncio.ensure_future(executor.aexecute("q", (1,)))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(executor.aexecute("q", (2,)))
+    await asyncio.sleep(0)
+    assert len(session.futures) == 1
+
+    # The slot of the first query is handed over to the second, which is cancelled
+    # before it resumes.
+    session.futures[0].page(["row"])
+    await asyncio.sleep(0)
+    second.cancel()
+
+    assert await first == ["row"]
+    with pytest.raises(asyncio.CancelledError):
+        await second
+    assert executor.metrics["in_flight"] == 0
+    assert len(session.futures) == 1
+
+
+def _start(executor: QueryExecutor, pages: List[Any], errors: List[Any]) -> None:
+    """Start a query in a slot, like `ConcurrentQueries`."""
+    executor._acquire()
+    executor._start("q", None, lambda rows, last: pages.append((rows, last)), errors.append)
+
+
+def test_overload_decreases_limit_once_per_window() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, concurrency=8, max_retries=0)
+    errors: List[Any] = []
+
+    for _ in range(8):
+        _start(executor, [], errors)
+    for future in session.futures:
+        future.fail(OperationTimedOut())
+
+    # The requests in flight when the limit decreases don't decrease it again.
+    assert executor.metrics["concurrency_limit"] == 4
+    assert executor.metrics["in_flight"] == 0
+    assert executor.metrics["failed"] == 8
+    assert len(errors) == 8
+
+    for _ in range(4):
+        _start(executor, [], errors)
+    for future in session.futures[8:]:
+        future.fail(OperationTimedOut())
+    assert executor.metrics["concurrency_limit"] == 2
+
+
+def test_limit_is_clamped() -> None:
+    session = ManualSession()
+    # A large latency tolerance, so that the latency of the tests doesn't matter.
+    executor = QueryExecutor(
+        session,
+        concurrency=2,
+        min_concurrency=1,
+        max_concurrency=3,
+        max_retries=0,
+        latency_tolerance=1e9,
+    )
+    pages: List[Any] = []
+
+    for _ in range(20):
+        _start(executor, pages, [])
+        session.futures[-1].page([])
+    assert executor.metrics["concurrency_limit"] == 3
+    assert executor.metrics["completed"] == 20
+
+    for _ in range(20):
+        _start(executor, [], [])
+        session.futures[-1].fail(OperationTimedOut())
+    assert executor.metrics["concurrency_limit"] == 1
+    assert executor.metrics["in_flight"] == 0
+
+
+def test_retry_on_overload() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, max_retries=1, retry_delay=0.0)
+    pages: List[Any] = []
+    errors: List[Any] = []
+
+    _start(executor, pages, errors)
+    session.futures[0].fail(OperationTimedOut())
+    deadline = time.monotonic() + 5
+    while len(session.futures) < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    session.futures[1].page(["row"])
+    assert pages == [(["row"], True)]
+    assert errors == []
+    assert executor.metrics["retries"] == 1
+    assert executor.metrics["in_flight"] == 0
+
+
+def test_no_retry_after_a_page() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, max_retries=3, retry_delay=0.0)
+    pages: List[Any] = []
+    errors: List[Any] = []
+
+    _start(executor, pages, errors)
+    session.futures[0].page(["row"], more=True)
+    assert session.futures[0].next_pages_fetched == 1
+    error = OperationTimedOut()
+    session.futures[0].fail(error)
+
+    # The first page was handed over: retrying would deliver it again.
+    assert pages == [(["row"], False)]
+    assert errors == [error]
+    time.sleep(0.01)
+    assert len(session.futures) == 1
+    assert executor.metrics["retries"] == 0
+    assert executor.metrics["in_flight"] == 0
+
+
+def test_release_on_error() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, concurrency=2, max_concurrency=2)
+    errors: List[Any] = []
+
+    error = ValueError("invalid query")
+    for _ in range(3):
+        _start(executor, [], errors)
+        session.futures[-1].fail(error)
+
+    # Not an overload error: neither retried nor decreasing the limit.
+    assert errors == [error] * 3
+    assert len(session.futures) == 3
+    assert executor.metrics["concurrency_limit"] == 2
+    assert executor.metrics["in_flight"] == 0
+    assert executor.metrics["failed"] == 3
+
+
+def test_submit() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, concurrency=1, max_concurrency=1)
+
+    result = executor.submit("q", (1,))
+    assert session.futures[0].parameters == (1,)
+    assert not result.done()
+
+    # The pages are collected until the last one.
+    session.futures[0].page(["a"], more=True)
+    session.futures[0].page(["b"])
+    assert result.result(timeout=0) == ["a", "b"]
+    assert executor.metrics["in_flight"] == 0
+
+    error = ValueError("invalid query")
+    failed = executor.submit("q", (2,))
+    session.futures[1].fail(error)
+    assert failed.exception(timeout=0) is error
+    assert executor.metrics["in_flight"] == 0
+
+
+def test_submit_waits_for_a_slot() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, concurrency=1, max_concurrency=1)
+
+    first = executor.submit("q", (1,))
+    cancelled = executor.submit("q", (2,))
+    queued = executor.submit("q", (3,))
+    # Not sent until the first query releases its slot.
+    assert len(session.futures) == 1
+    assert cancelled.cancel()
+
+    session.futures[0].page(["a"])
+    assert first.result(timeout=0) == ["a"]
+    # The cancelled query is never sent.
+    assert [future.parameters for future in session.futures] == [(1,), (3,)]
+    assert not queued.cancel()
+
+    session.futures[1].page(["b"])
+    assert queued.result(timeout=0) == ["b"]
+    assert executor.metrics["in_flight"] == 0
+
+
+async def test_release_when_not_sent() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, concurrency=2, max_concurrency=2)
+
+    session.error = TypeError("can't serialize")
+    for _ in range(2):
+        with pytest.raises(TypeError):
+            await executor.aexecute("q", (1,))
+    assert isinstance(executor.submit("q", (1,)).exception(timeout=0), TypeError)
+    assert executor.metrics["in_flight"] == 0
+    assert executor.metrics["failed"] == 3
+
+    session.error = None
+    result = asyncio.ensure_future(executor.aexecute("q", (2,)))
+    await asyncio.sleep(0)
+    session.futures[0].page(["row"])
+    assert await result == ["row"]
+
+
+def test_concurrent_queries_not_sent() -> None:
+    session = ManualSession()
+    executor = QueryExecutor(session, concurrency=2, max_concurrency=2)
+    pages: List[Any] = []
+
+    with pytest.raises(TypeError):
+        with ConcurrentQueries(executor) as cq:
+            cq.execute("q", (1,), pages.append)
+            session.futures[0].page(["row"])
+            session.error = TypeError("can't serialize")
+            cq.execute("q", (2,), pages.append)
+
+    # The query sent still completes, and nothing waits for the other.
+    assert pages == [["row"]]
+    assert executor.metrics["in_flight"] == 0
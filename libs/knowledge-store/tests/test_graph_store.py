@@ -0,0 +1,138 @@
+from collections import Counter
+from concurrent.futures import Future
+from typing import Iterable, List
+
+import pytest
+
+from ragstack_knowledge_store import GraphStore, InMemoryGraphStore, TextNode
+from ragstack_knowledge_store.graph_store import CONTENT_ID
+
+from .benchmarks.fake_session import FakeSession
+from .benchmarks.synthetic_graph import (
+    SyntheticEmbeddingModel,
+    SyntheticGraph,
+    generate_graph,
+    generate_queries,
+)
+
+
+def _ids(nodes: Iterable[TextNode]) -> List[str]:
+    return [node.metadata[CONTENT_ID] for node in nodes]
+
+
+@pytest.fixture
+def graph() -> SyntheticGraph:
+    return generate_graph(num_nodes=200)
+
+
+@pytest.fixture
+def session() -> FakeSession:
+    return FakeSession()
+
+
+@pytest.fixture
+def graph_store(session: FakeSession, graph: SyntheticGraph) -> GraphStore:
+    store = GraphStore(SyntheticEmbeddingModel(), session=session, keyspace="test")
+    store.add_nodes(graph.nodes, batch_size=64)
+    return store
+
+
+@pytest.fixture
+def in_memory(graph: SyntheticGraph) -> InMemoryGraphStore:
+    store = InMemoryGraphStore(SyntheticEmbeddingModel())
+    store.add_nodes(graph.nodes, batch_size=64)
+    return store
+
+
+def test_matches_in_memory_store(
+    session: FakeSession,
+    graph: SyntheticGraph,
+    graph_store: GraphStore,
+    in_memory: InMemoryGraphStore,
+) -> None:
+    assert len(session.rows("graph_edges")) == len(in_memory._edges) == graph.num_edges
+    for query in generate_queries(graph, num_queries=3):
+        assert sorted(_ids(graph_store.traversal_search(query, k=2, depth=1))) == sorted(
+            _ids(in_memory.traversal_search(query, k=2, depth=1))
+        )
+
+
+def test_mmr_edge_queries_go_through_the_executor(
+    session: FakeSession,
+    graph: SyntheticGraph,
+    graph_store: GraphStore,
+    in_memory: InMemoryGraphStore,
+) -> None:
+    for query in generate_queries(graph, num_queries=3):
+        calls = Counter(session.calls)
+        completed = graph_store.query_metrics["completed"]
+        results = graph_store.mmr_traversal_search(query, k=4, depth=2)
+        assert _ids(results) == _ids(in_memory.mmr_traversal_search(query, k=4, depth=2))
+
+        # Only the initial ANN query is executed outside of the executor.
+        calls = session.calls - calls
+        executed = calls["select:graph_edges"] + calls["select:graph_nodes"]
+        assert calls["select:graph_edges"] > 0
+        assert graph_store.query_metrics["completed"] - completed == executed
+
+
+def test_upsert_matches_fresh_store(
+    session: FakeSession, graph: SyntheticGraph, graph_store: GraphStore
+) -> None:
+    # Re-adding unchanged nodes only reads them.
+    calls = Counter(session.calls)
+    graph_store.add_nodes(graph.nodes, batch_size=64)
+    assert set(session.calls - calls) == {"select:graph_nodes"}
+
+    changed = generate_graph(num_nodes=200)
+    for node in changed.nodes[::10]:
+        node.metadata["link_tags"] = set()
+    for node in changed.nodes[5::10]:
+        node.text += " changed"
+    graph_store.add_nodes(changed.nodes, batch_size=64)
+
+    fresh_session = FakeSession()
+    fresh = GraphStore(SyntheticEmbeddingModel(), session=fresh_session, keyspace="test")
+    fresh.add_nodes(changed.nodes, batch_size=64)
+
+    def edges(rows) -> list:
+        return sorted(
+            (row["source_content_id"], row["target_content_id"], row["target_text_embedding"])
+            for row in rows
+        )
+
+    assert edges(session.rows("graph_edges")) == edges(fresh_session.rows("graph_edges"))
+    assert len(session.rows("graph_edges")) < graph.num_edges
+
+
+def test_mmr_cancels_unused_edge_queries(
+    session: FakeSession, graph: SyntheticGraph, graph_store: GraphStore
+) -> None:
+    submitted: List[Future] = []
+
+    class OnDemand(Future):
+        """Executes the query when its result is needed, like a query still waiting
+        for a slot."""
+
+        def __init__(self, query, parameters):
+            super().__init__()
+            self.query, self.parameters = query, parameters
+            submitted.append(self)
+
+        def result(self, timeout=None):
+            if self.set_running_or_notify_cancel():
+                self.set_result(list(session.execute(self.query, self.parameters)))
+            return super().result(timeout)
+
+    store = GraphStore(
+        SyntheticEmbeddingModel(), session=session, keyspace="test", adjacency_prefetch=8
+    )
+    store._executor.submit = OnDemand
+    query = generate_queries(graph, num_queries=1)[0]
+    results = store.mmr_traversal_search(query, k=10, depth=2)
+    assert _ids(results) == _ids(graph_store.mmr_traversal_search(query, k=10, depth=2))
+
+    # The edge queries whose results weren't needed are cancelled.
+    cancelled = [future for future in submitted if future.cancelled()]
+    assert cancelled
+    assert all(future.done() for future in submitted)
@@ -0,0 +1,371 @@
+import math
+import threading
+from typing import Iterable, List
+
+import pytest
+
+from ragstack_knowledge_store import EmbeddingModel, InMemoryGraphStore, TextNode
+from ragstack_knowledge_store.graph_store import CONTENT_ID
+from ragstack_knowledge_store.link_tag import (
+    BidirLinkTag,
+    IncomingLinkTag,
+    OutgoingLinkTag,
+)
+
+
+class AngularTwoDimensionalEmbeddings(EmbeddingModel):
+    """
+    From angles (as strings in units of pi) to unit embedding vectors on a circle.
+    """
+
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        try:
+            angle = float(text)
+            return [math.cos(angle * math.pi), math.sin(angle * math.pi)]
+        except ValueError:
+            return [0.0, 0.0]
+
+    async def aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_texts(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+
+def _result_ids(nodes: Iterable[TextNode]) -> List[str]:
+    return [node.metadata[CONTENT_ID] for node in nodes]
+
+
+def _linked_ids(store: InMemoryGraphStore, content_id: str) -> List[str]:
+    snapshot = store._snapshot()
+    position = store._positions[content_id]
+    targets = snapshot.indices[snapshot.indptr[position] : snapshot.indptr[position + 1]]
+    return sorted(snapshot.ids[i] for i in targets)
+
+
+def _mmr_nodes() -> List[TextNode]:
+    return [
+        TextNode(
+            text="-0.124",
+            metadata={
+                "content_id": "v0",
+                "link_tags": {OutgoingLinkTag(kind="explicit", tag="link")},
+            },
+        ),
+        TextNode(text="+0.127", metadata={"content_id": "v1"}),
+        TextNode(
+            text="+0.25",
+            metadata={
+                "content_id": "v2",
+                "link_tags": {IncomingLinkTag(kind="explicit", tag="link")},
+            },
+        ),
+        TextNode(
+            text="+1.0",
+            metadata={
+                "content_id": "v3",
+                "link_tags": {IncomingLinkTag(kind="explicit", tag="link")},
+            },
+        ),
+    ]
+
+
+@pytest.fixture
+def mmr_store() -> InMemoryGraphStore:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    store.add_nodes(_mmr_nodes())
+    return store
+
+
+def test_link_directed() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    ids = store.add_nodes(
+        [
+            TextNode(
+                text="0.1",
+                metadata={
+                    "content_id": "a",
+                    "link_tags": {IncomingLinkTag(kind="hyperlink", tag="http://a")},
+                },
+            ),
+            TextNode(
+                text="0.2",
+                metadata={
+                    "content_id": "b",
+                    "link_tags": {
+                        IncomingLinkTag(kind="hyperlink", tag="http://b"),
+                        OutgoingLinkTag(kind="hyperlink", tag="http://a"),
+                    },
+                },
+            ),
+            TextNode(
+                text="0.3",
+                metadata={
+                    "content_id": "c",
+                    "link_tags": {OutgoingLinkTag(kind="hyperlink", tag="http://a")},
+                },
+            ),
+            TextNode(
+                text="0.4",
+                metadata={
+                    "content_id": "d",
+                    "link_tags": {
+                        OutgoingLinkTag(kind="hyperlink", tag="http://a"),
+                        OutgoingLinkTag(kind="hyperlink", tag="http://b"),
+                    },
+                },
+            ),
+        ],
+        batch_size=1,
+    )
+    assert list(ids) == ["a", "b", "c", "d"]
+
+    assert _linked_ids(store, "a") == []
+    assert _linked_ids(store, "b") == ["a"]
+    assert _linked_ids(store, "c") == ["a"]
+    assert _linked_ids(store, "d") == ["a", "b"]
+
+
+def test_link_bidir_and_kinds() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    store.add_nodes(
+        [
+            TextNode(
+                text="0.1",
+                metadata={
+                    "content_id": "a",
+                    "link_tags": {BidirLinkTag(kind="kw", tag="x")},
+                },
+            ),
+            TextNode(
+                text="0.2",
+                metadata={
+                    "content_id": "b",
+                    "link_tags": {BidirLinkTag(kind="kw", tag="x")},
+                },
+            ),
+            TextNode(
+                text="0.3",
+                metadata={
+                    "content_id": "c",
+                    "link_tags": {IncomingLinkTag(kind="other", tag="x")},
+                },
+            ),
+        ]
+    )
+
+    # No self-cycles, and tags only match tags of the same kind.
+    assert _linked_ids(store, "a") == ["b"]
+    assert _linked_ids(store, "b") == ["a"]
+    assert _linked_ids(store, "c") == []
+
+
+def test_add_nodes_streaming_is_lazy() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    ids = store.add_nodes_streaming(_mmr_nodes(), batch_size=2)
+    assert store.similarity_search([1.0, 0.0]) == []
+    assert next(ids) == "v0"
+    assert len(store.similarity_search([1.0, 0.0])) == 2
+    assert list(ids) == ["v1", "v2", "v3"]
+
+    with pytest.raises(ValueError):
+        store.add_nodes_streaming(_mmr_nodes(), batch_size=0)
+
+
+def test_add_nodes_is_eager() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    # The nodes are added even if the IDs are ignored.
+    store.add_nodes(_mmr_nodes(), batch_size=3)
+    assert len(store.similarity_search([1.0, 0.0], k=10)) == 4
+
+    with pytest.raises(ValueError):
+        store.add_nodes(_mmr_nodes(), batch_size=0)
+
+
+def test_similarity_search(mmr_store: InMemoryGraphStore) -> None:
+    results = mmr_store.similarity_search([1.0, 0.0], k=2)
+    assert _result_ids(results) == ["v0", "v1"]
+    assert results[0].text == "-0.124"
+
+
+def test_traversal_search(mmr_store: InMemoryGraphStore) -> None:
+    assert _result_ids(mmr_store.traversal_search("0.0", k=1, depth=0)) == ["v0"]
+    assert _result_ids(mmr_store.traversal_search("0.0", k=1, depth=1)) == [
+        "v0",
+        "v2",
+        "v3",
+    ]
+    assert _result_ids(mmr_store.traversal_search("0.0", k=2, depth=1)) == [
+        "v0",
+        "v1",
+        "v2",
+        "v3",
+    ]
+
+
+def test_mmr_traversal(mmr_store: InMemoryGraphStore) -> None:
+    def result_ids(**kwargs) -> List[str]:
+        return _result_ids(mmr_store.mmr_traversal_search("0.0", **kwargs))
+
+    assert result_ids(k=2, fetch_k=2) == ["v0", "v2"]
+    assert result_ids(k=2, fetch_k=2, depth=0) == ["v0", "v1"]
+    assert result_ids(k=2, fetch_k=3, depth=0) == ["v0", "v2"]
+    assert result_ids(k=2, score_threshold=0.2) == ["v0"]
+    assert result_ids(k=4) == ["v0", "v2", "v1", "v3"]
+
+
+def test_traversal_caps() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    # A hub linking to nodes further and further from the query.
+    hub = TextNode(
+        text="0.0",
+        metadata={
+            "content_id": "hub",
+            "link_tags": {OutgoingLinkTag(kind="nav", tag="site")},
+        },
+    )
+    linked = [
+        TextNode(
+            text=f"0.{i}",
+            metadata={
+                "content_id": f"n{i}",
+                "link_tags": {IncomingLinkTag(kind="nav", tag="site")},
+            },
+        )
+        for i in range(5, 0, -1)
+    ]
+    store.add_nodes([hub, *linked])
+
+    assert len(store.traversal_search("0.0", k=1, depth=1)) == 6
+    results = store.traversal_search("0.0", k=1, depth=1, fan_out=2)
+    assert _result_ids(results) == ["hub", "n1", "n2"]
+    results = store.traversal_search("0.0", k=1, depth=1, max_visited=3)
+    assert len(results) == 3
+
+    results = store.mmr_traversal_search("0.0", k=3, fetch_k=1, fan_out=1)
+    assert _result_ids(results) == ["hub", "n1"]
+
+
+def test_overwrite_node() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    store.add_nodes(_mmr_nodes())
+    store.add_nodes([TextNode(text="0.5", metadata={"content_id": "v2"})])
+
+    assert _result_ids(store.similarity_search([0.0, 1.0], k=1)) == ["v2"]
+    # v2 no longer matches the tag, so its edge is removed.
+    assert _linked_ids(store, "v0") == ["v3"]
+    store.add_nodes(
+        [
+            TextNode(
+                text="0.6",
+                metadata={
+                    "content_id": "v4",
+                    "link_tags": {OutgoingLinkTag(kind="explicit", tag="link")},
+                },
+            )
+        ]
+    )
+    assert _linked_ids(store, "v4") == ["v3"]
+
+
+def test_snapshot_is_not_changed_by_writes() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    store.add_nodes(_mmr_nodes())
+    snapshot = store._snapshot()
+    embeddings = snapshot.embeddings[: snapshot.size].copy()
+
+    # Overwrite a node, and add enough nodes to grow the embedding matrix.
+    store.add_nodes([TextNode(text="0.5", metadata={"content_id": "v2", "a": "b"})])
+    store.add_nodes(
+        TextNode(text=f"0.{i}", metadata={"content_id": f"n{i}"}) for i in range(200)
+    )
+
+    assert snapshot.size == 4
+    assert snapshot.ids[:4] == ["v0", "v1", "v2", "v3"]
+    assert (snapshot.embeddings[:4] == embeddings).all()
+    assert store._node(snapshot, 2).text == "+0.25"
+    assert store._node(store._snapshot(), 2).text == "0.5"
+
+
+def test_search_while_adding_nodes() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    errors: List[BaseException] = []
+    done = threading.Event()
+
+    def add() -> None:
+        try:
+            for i in range(100):
+                tags = {BidirLinkTag(kind="kw", tag=str(i % 7))}
+                store.add_nodes(
+                    TextNode(
+                        text=f"0.{i}{j}",
+                        # Also overwrites the nodes of the previous rounds.
+                        metadata={"content_id": f"n{j * i % 50}", "link_tags": tags},
+                    )
+                    for j in range(10)
+                )
+        except BaseException as error:  # noqa: BLE001
+            errors.append(error)
+        finally:
+            done.set()
+
+    writer = threading.Thread(target=add)
+    writer.start()
+    try:
+        while not done.is_set():
+            store.similarity_search([1.0, 0.0], metadata_filter={"content_id": "n1"})
+            store.traversal_search("0.1", k=3, depth=2, metadata_filter={"a": "b"})
+            store.mmr_traversal_search("0.1", k=3, depth=2)
+    finally:
+        writer.join()
+    assert errors == []
+
+
+def test_metadata_filter() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    nodes = _mmr_nodes()
+    for node, tenant in zip(nodes, ["a", "a", "b", "a"]):
+        node.metadata.update(tenant=tenant, page=1, tags=["x"])
+    store.add_nodes(nodes)
+
+    results = store.similarity_search([1.0, 0.0], k=1)
+    assert results[0].metadata["tenant"] == "a"
+    assert results[0].metadata["tags"] == ["x"]
+
+    def result_ids(search, **kwargs) -> List[str]:
+        return _result_ids(search("0.0", **kwargs))
+
+    assert _result_ids(
+        store.similarity_search([1.0, 0.0], k=2, metadata_filter={"tenant": "b"})
+    ) == ["v2"]
+    # Numbers match regardless of their type.
+    assert _result_ids(
+        store.similarity_search([1.0, 0.0], k=2, metadata_filter={"page": 1.0})
+    ) == ["v0", "v1"]
+    # The edge to v2 isn't traversed.
+    assert result_ids(
+        store.traversal_search, k=1, depth=1, metadata_filter={"tenant": "a"}
+    ) == ["v0", "v3"]
+    assert result_ids(
+        store.mmr_traversal_search, k=4, metadata_filter={"tenant": "a"}
+    ) == ["v0", "v1", "v3"]
+
+    with pytest.raises(ValueError):
+        store.similarity_search([1.0, 0.0], metadata_filter={"tags": ["x"]})
+
+
+async def test_async() -> None:
+    store = InMemoryGraphStore(AngularTwoDimensionalEmbeddings())
+    assert await store.aadd_nodes(_mmr_nodes()) == ["v0", "v1", "v2", "v3"]
+    ids = [id async for id in store.aadd_nodes_streaming(_mmr_nodes(), batch_size=3)]
+    assert ids == ["v0", "v1", "v2", "v3"]
+
+    results = await store.ammr_traversal_search("0.0", k=2, fetch_k=2)
+    assert _result_ids(results) == ["v0", "v2"]
+    results = await store.atraversal_search("0.0", k=1, depth=1)
+    assert _result_ids(results) == ["v0", "v2", "v3"]
+    results = await store.asimilarity_search([1.0, 0.0], k=2)
+    assert _result_ids(results) == ["v0", "v1"]
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pytest
+
+from ragstack_knowledge_store._mmr_helper import MmrHelper, top_k_indices
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    norms = np.linalg.norm(a) * np.linalg.norm(b)
+    return 0.0 if norms == 0 else float(a @ b / norms)
+
+
+class ScalarMmr:
+    """The per-candidate MMR selection replaced by `MmrHelper`, as a reference."""
+
+    def __init__(self, query_embedding: List[float], lambda_mult: float):
+        self.lambda_mult = lambda_mult
+        self.query_embedding = np.asarray(query_embedding, dtype=np.float64)
+        self.selected_ids: List[str] = []
+        self.selected_embeddings: List[np.ndarray] = []
+        # content_id: [embedding, similarity_to_query, redundancy, distance]
+        self.unselected: Dict[str, list] = {}
+
+    def add_candidates(self, candidates: List[Tuple[str, List[float]]], distance: int):
+        for content_id, embedding in candidates:
+            if content_id in self.selected_ids:
+                continue
+            candidate = self.unselected.get(content_id)
+            if candidate is not None:
+                candidate[3] = min(candidate[3], distance)
+                continue
+
+            embedding = np.asarray(embedding, dtype=np.float64)
+            redundancy = 0.0
+            for selected in self.selected_embeddings:
+                redundancy = max(redundancy, _cosine(selected, embedding))
+            similarity = _cosine(self.query_embedding, embedding)
+            self.unselected[content_id] = [embedding, similarity, redundancy, distance]
+
+    def _score(self, candidate: list) -> float:
+        return self.lambda_mult * candidate[1] - (1 - self.lambda_mult) * candidate[2]
+
+    def select_next(self, score_threshold: float) -> Optional[Tuple[str, int]]:
+        best_score = float("-inf")
+        next_id = None
+        for content_id, candidate in self.unselected.items():
+            if self._score(candidate) > best_score:
+                best_score = self._score(candidate)
+                next_id = content_id
+        if next_id is None or best_score < score_threshold:
+            return None
+
+        embedding, _, _, distance = self.unselected.pop(next_id)
+        self.selected_ids.append(next_id)
+        self.selected_embeddings.append(embedding)
+        for candidate in self.unselected.values():
+            candidate[2] = max(candidate[2], _cosine(embedding, candidate[0]))
+        return next_id, distance
+
+
+def _selections(mmr, blocks, k: int, score_threshold: float) -> List[Tuple[str, int]]:
+    """Alternately add a block of candidates and select up to `k` of them."""
+    selected = []
+    for distance, block in enumerate(blocks):
+        mmr.add_candidates(block, distance)
+        for _ in range(k):
+            selection = mmr.select_next(score_threshold)
+            if selection is None:
+                break
+            selected.append(selection)
+    return selected
+
+
+def _blocks(seed: int, dim: int = 8) -> List[List[Tuple[str, List[float]]]]:
+    generator = np.random.default_rng(seed)
+    vectors = generator.standard_normal((40, dim))
+    # Zero vectors, and exact duplicates (ties).
+    vectors[3] = 0
+    vectors[17] = 0
+    vectors[10] = vectors[2]
+    vectors[25] = vectors[11]
+    ids = [f"n{i}" for i in range(len(vectors))]
+    candidates = list(zip(ids, vectors.tolist()))
+    # Overlapping blocks: some candidates are reached again, further away.
+    return [candidates[:15], candidates[10:30] + candidates[:5], candidates[25:]]
+
+
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.3, 0.5, 1.0])
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("k", [1, 4, 100])
+def test_mmr_helper_matches_scalar_selection(lambda_mult: float, seed: int, k: int):
+    blocks = _blocks(seed)
+    query = np.random.default_rng(seed + 100).standard_normal(8).tolist()
+
+    for score_threshold in [float("-inf"), 0.0]:
+        expected = _selections(ScalarMmr(query, lambda_mult), blocks, k, score_threshold)
+        actual = _selections(MmrHelper(query, lambda_mult), blocks, k, score_threshold)
+        assert actual == expected
+
+
+def test_ties_and_zero_vectors():
+    # A zero query has a similarity of 0 to everything: the first added wins.
+    helper = MmrHelper([0.0, 0.0], lambda_mult=1.0)
+    helper.add_candidates([("a", [1.0, 0.0]), ("b", [0.0, 0.0]), ("c", [1.0, 0.0])], 0)
+    assert [helper.select_next(float("-inf"))[0] for _ in range(3)] == ["a", "b", "c"]
+    assert helper.select_next(float("-inf")) is None
+
+    helper = MmrHelper([1.0, 0.0], lambda_mult=1.0)
+    helper.add_candidates([("a", [0.0, 1.0]), ("b", [2.0, 0.0]), ("c", [1.0, 0.0])], 0)
+    assert helper.best_candidates(5, float("-inf"), max_distance=0) == ["b", "c", "a"]
+
+
+def test_top_k_indices():
+    scores = np.array([0.5, 0.9, 0.1, 0.9])
+    assert top_k_indices(scores, 2).tolist() == [1, 3]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 0, 2]
+    assert top_k_indices(scores, 0).tolist() == []
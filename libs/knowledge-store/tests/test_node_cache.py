@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+from typing import List
+
+from cassandra.cqltypes import ListType, UTF8Type
+from cassandra.query import PreparedStatement
+
+from ragstack_knowledge_store import GraphStore, TextNode
+from ragstack_knowledge_store._node_cache import NodeCache
+from ragstack_knowledge_store.graph_store import _MAX_IDS_PER_QUERY, _RoutedStatement
+
+from .benchmarks.fake_session import FakeSession
+from .benchmarks.synthetic_graph import SyntheticEmbeddingModel
+
+
+def _row(content_id: str, text: str = "") -> SimpleNamespace:
+    return SimpleNamespace(content_id=content_id, text_content=text)
+
+
+def test_node_cache() -> None:
+    cache = NodeCache(max_size=2)
+    cache.put_many([_row("a"), _row("b")])
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "b"}
+    assert cache.stats == {"hits": 2, "misses": 1, "hit_rate": 2 / 3, "size": 2}
+
+    # "a" was read after "b", so "b" is the least recently used.
+    cache.get_many(["a"])
+    cache.put_many([_row("c")])
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+    cache.put_many([_row("a", "changed")])
+    assert cache.get_many(["a"])["a"].text_content == "changed"
+
+    cache.discard(["a", "unknown"])
+    assert set(cache.get_many(["a", "c"])) == {"c"}
+    assert cache.stats["size"] == 1
+
+
+def _prepared(query: str, cql_type) -> PreparedStatement:
+    column = SimpleNamespace(
+        keyspace_name="test", table_name="graph_nodes", name="content_id", type=cql_type
+    )
+    return PreparedStatement([column], b"id", None, query, "test", 4, None, None)
+
+
+def _queries_by_ids(session: FakeSession, ids: List[str]) -> list:
+    store = GraphStore(SyntheticEmbeddingModel(), session=session, keyspace="test")
+    query_by_id = _prepared("SELECT ... WHERE content_id = ?", UTF8Type)
+    query_by_ids_in = _prepared(
+        "SELECT ... WHERE content_id IN ?", ListType.apply_parameters([UTF8Type])
+    )
+    return [
+        (query, parameters, query is query_by_id)
+        for query, parameters in store._queries_by_ids(ids, query_by_id, query_by_ids_in)
+    ]
+
+
+def test_queries_by_ids_are_grouped_by_replicas() -> None:
+    session = FakeSession()
+    replicas = {"a": ["h1", "h2"], "b": ["h2", "h3"], "c": ["h3", "h1"]}
+
+    def get_replicas(keyspace: str, key: bytes) -> List[str]:
+        assert keyspace == "test"
+        return replicas[key.decode("utf-8")[0]]
+
+    session.cluster.metadata.get_replicas = get_replicas
+    ids = [f"a{i}" for i in range(_MAX_IDS_PER_QUERY + 5)] + ["b0", "b1", "c0"]
+    queries = _queries_by_ids(session, ids)
+
+    fetched = []
+    for query, parameters, by_id in queries:
+        if by_id:
+            # A group of one ID is routed by the driver.
+            assert parameters == ("c0",)
+            fetched.append("c0")
+            continue
+        assert isinstance(query, _RoutedStatement)
+        assert parameters is None
+        group = query.raw_values[0]
+        assert len(group) <= _MAX_IDS_PER_QUERY
+        # Every ID of a query has the replicas of its routing key.
+        routing_replicas = get_replicas("test", query.routing_key)
+        assert all(get_replicas("test", id.encode("utf-8")) == routing_replicas for id in group)
+        fetched.extend(group)
+
+    assert sorted(fetched) == sorted(ids)
+    # The 25 "a" IDs need two queries, the "b" IDs one, and "c0" its own.
+    assert len(queries) == 4
+
+
+def test_queries_by_ids_without_token_map() -> None:
+    # The fake session has no token map, like the driver with token metadata
+    # disabled: the IDs are fetched by plain `IN` queries.
+    ids = [f"n{i}" for i in range(_MAX_IDS_PER_QUERY + 1)]
+    queries = _queries_by_ids(FakeSession(), ids)
+
+    assert [parameters for _, parameters, _ in queries] == [
+        (ids[:_MAX_IDS_PER_QUERY],),
+        (ids[-1],),
+    ]
+    assert [by_id for _, _, by_id in queries] == [False, True]
+    assert not any(isinstance(query, _RoutedStatement) for query, _, _ in queries)
+
+
+def test_readded_node_is_not_served_stale() -> None:
+    session = FakeSession()
+    store = GraphStore(
+        SyntheticEmbeddingModel(), session=session, keyspace="test", node_cache_size=10
+    )
+    nodes = [
+        TextNode(text=f"topic{i} node", metadata={"content_id": f"n{i}", "tenant": "a"})
+        for i in range(3)
+    ]
+    store.add_nodes(nodes)
+
+    def search() -> List[TextNode]:
+        # Traversals read the nodes by ID, through the cache.
+        return store.traversal_search("topic1 node", k=3, depth=0)
+
+    assert {node.metadata["tenant"] for node in search()} == {"a"}
+    assert store.node_cache_stats["size"] == 3
+
+    readded = TextNode(text="topic1 node", metadata={"content_id": "n1", "tenant": "b"})
+    store.add_nodes([readded])
+    results = {node.metadata["content_id"]: node for node in search()}
+    assert results["n1"].metadata["tenant"] == "b"
+    assert results["n0"].metadata["tenant"] == "a"
+    # Only the re-added node was read again.
+    assert store.node_cache_stats["hits"] == 2
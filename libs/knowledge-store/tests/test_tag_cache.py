@@ -0,0 +1,100 @@
+from ragstack_knowledge_store import GraphStore, TextNode
+from ragstack_knowledge_store._tag_cache import TagCache, TagRow
+from ragstack_knowledge_store.link_tag import IncomingLinkTag, OutgoingLinkTag
+
+from .benchmarks.fake_session import FakeSession
+from .benchmarks.synthetic_graph import SyntheticEmbeddingModel
+
+
+def _ids(rows) -> list:
+    return sorted(row.content_id for row in rows)
+
+
+def test_hits_and_misses() -> None:
+    cache = TagCache(max_size=10)
+    assert cache.get("to", "kw:a") is None
+
+    cache.put("to", "kw:a", [TagRow("x"), TagRow("y")])
+    assert _ids(cache.get("to", "kw:a")) == ["x", "y"]
+    # Directions are cached separately.
+    assert cache.get("from", "kw:a") is None
+
+    assert cache.stats == {"hits": 1, "misses": 2, "hit_rate": 1 / 3, "size": 2}
+
+
+def test_write_through_and_invalidation() -> None:
+    cache = TagCache(max_size=10)
+    # Uncached tags aren't created by writes.
+    cache.add("from", "kw:a", TagRow("x", [1.0], {}))
+    assert cache.get("from", "kw:a") is None
+
+    cache.put("from", "kw:a", [TagRow("x", [1.0], {})])
+    cache.add("from", "kw:a", TagRow("y", [2.0], {}))
+    # A changed node replaces its previous row.
+    cache.add("from", "kw:a", TagRow("x", [3.0], {"a": "b"}))
+    rows = {row.content_id: row for row in cache.get("from", "kw:a")}
+    assert rows["x"] == TagRow("x", [3.0], {"a": "b"})
+    assert cache.stats["size"] == 2
+
+    cache.discard("from", "kw:a", ["x", "unknown"])
+    assert _ids(cache.get("from", "kw:a")) == ["y"]
+    assert cache.stats["size"] == 1
+
+
+def test_put_keeps_nodes_added_during_the_lookup() -> None:
+    cache = TagCache(max_size=10)
+    cache.put("to", "kw:a", [TagRow("x")])
+    cache.add("to", "kw:a", TagRow("y"))
+    # The result of a lookup started before "y" was added.
+    cache.put("to", "kw:a", [TagRow("x"), TagRow("z")])
+    assert _ids(cache.get("to", "kw:a")) == ["x", "y", "z"]
+
+
+def test_bounded_size() -> None:
+    cache = TagCache(max_size=3)
+    # Tags with more nodes than the cache holds aren't cached.
+    cache.put("to", "kw:big", [TagRow(f"n{i}") for i in range(4)])
+    assert cache.get("to", "kw:big") is None
+
+    cache.put("to", "kw:a", [TagRow("a1"), TagRow("a2")])
+    cache.put("to", "kw:b", [TagRow("b1")])
+    assert cache.get("to", "kw:a") is not None
+
+    # The least recently used tag is evicted.
+    cache.put("to", "kw:c", [TagRow("c1")])
+    assert cache.get("to", "kw:b") is None
+    assert _ids(cache.get("to", "kw:a")) == ["a1", "a2"]
+    assert cache.stats["size"] == 3
+
+    cache.add("to", "kw:c", TagRow("c2"))
+    assert cache.stats["size"] <= 3
+
+
+def test_graph_store_cache_follows_tag_changes() -> None:
+    session = FakeSession()
+    store = GraphStore(
+        SyntheticEmbeddingModel(), session=session, keyspace="test", tag_cache_size=100
+    )
+
+    def node(content_id: str, *tags) -> TextNode:
+        metadata = {"content_id": content_id, "link_tags": set(tags)}
+        return TextNode(text=content_id, metadata=metadata)
+
+    def edges() -> list:
+        rows = session.rows("graph_edges")
+        return sorted((row["source_content_id"], row["target_content_id"]) for row in rows)
+
+    link_to = OutgoingLinkTag(kind="hyperlink", tag="a")
+    linked_from = IncomingLinkTag(kind="hyperlink", tag="a")
+    store.add_nodes([node("t1", linked_from), node("s1", link_to)])
+    assert edges() == [("s1", "t1")]
+
+    # t1 is no longer linked from the tag: the cached lookup must not return it.
+    store.add_nodes([node("t1")])
+    store.add_nodes([node("s2", link_to)])
+    assert edges() == []
+
+    store.add_nodes([node("t2", linked_from)])
+    store.add_nodes([node("s3", link_to)])
+    assert edges() == [("s1", "t2"), ("s2", "t2"), ("s3", "t2")]
+    assert store.tag_cache_stats["hits"] > 0
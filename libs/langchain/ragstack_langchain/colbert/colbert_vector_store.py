@@ -1,4 +1,4 @@
-from typing import Any, Iterable, List, Optional, Tuple, Type, TypeVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, TypeVar
 
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
@@ -124,11 +124,12 @@ class ColbertVectorStore(VectorStore):
         query: str,
         k: Optional[int] = 5,
         query_maxlen: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
         **kwargs: Any,
     ) -> List[Document]:
         """Return docs most similar to query."""
         chunk_scores: List[Tuple[Chunk, float]] = self._retriever.text_search(
-            query_text=query, k=k, query_maxlen=query_maxlen
+            query_text=query, k=k, query_maxlen=query_maxlen, metadata_filter=filter
         )
 
         return [
@@ -141,11 +142,12 @@ class ColbertVectorStore(VectorStore):
         query: str,
         k: Optional[int] = 5,
         query_maxlen: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
         **kwargs: Any,
     ) -> List[Tuple[Document, float]]:
         """Run similarity search with distance."""
         chunk_scores: List[Tuple[Chunk, float]] = self._retriever.text_search(
-            query_text=query, k=k, query_maxlen=query_maxlen
+            query_text=query, k=k, query_maxlen=query_maxlen, metadata_filter=filter
         )
 
         return [
@@ -158,11 +160,12 @@ class ColbertVectorStore(VectorStore):
         query: str,
         k: Optional[int] = 5,
         query_maxlen: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
         **kwargs: Any,
     ) -> List[Document]:
         """Return docs most similar to query."""
         chunk_scores: List[Tuple[Chunk, float]] = await self._retriever.atext_search(
-            query_text=query, k=k, query_maxlen=query_maxlen
+            query_text=query, k=k, query_maxlen=query_maxlen, metadata_filter=filter
         )
 
         return [
@@ -175,11 +178,12 @@ class ColbertVectorStore(VectorStore):
         query: str,
         k: Optional[int] = 5,
         query_maxlen: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
         **kwargs: Any,
     ) -> List[Tuple[Document, float]]:
         """Run similarity search with distance."""
         chunk_scores: List[Tuple[Chunk, float]] = await self._retriever.atext_search(
-            query_text=query, k=k, query_maxlen=query_maxlen
+            query_text=query, k=k, query_maxlen=query_maxlen, metadata_filter=filter
         )
 
         return [
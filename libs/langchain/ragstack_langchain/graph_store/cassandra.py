@@ -1,6 +1,9 @@
 from typing import (
     Any,
+    AsyncIterable,
+    Dict,
     Iterable,
+    Iterator,
     List,
     Optional,
     Type,
@@ -42,6 +45,20 @@ def _row_to_document(row) -> Document:
     )
 
 
+def _node_to_document(node: graph_store.TextNode) -> Document:
+    return Document(
+        page_content=node.text,
+        metadata=node.metadata,
+    )
+
+
+def _to_graph_store_nodes(nodes: Iterable[Node]) -> Iterator[graph_store.TextNode]:
+    for node in nodes:
+        if not isinstance(node, TextNode):
+            raise ValueError("Only adding TextNode is supported at the moment")
+        yield graph_store.TextNode(id=node.id, text=node.text, metadata=node.metadata)
+
+
 def _results_to_documents(results: Optional[ResponseFuture]) -> Iterable[Document]:
     if results:
         for row in results:
@@ -94,16 +111,50 @@ class CassandraGraphStore(GraphStore):
     def add_nodes(
         self,
         nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = graph_store.DEFAULT_BATCH_SIZE,
         **kwargs: Any,
-    ):
-        _nodes = []
-        for node in nodes:
-            if not isinstance(node, TextNode):
-                raise ValueError("Only adding TextNode is supported at the moment")
-            _nodes.append(
-                graph_store.TextNode(id=node.id, text=node.text, metadata=node.metadata)
-            )
-        return self.store.add_nodes(_nodes)
+    ) -> List[str]:
+        """Add nodes to the graph store.
+
+        Behaviour change: the nodes are consumed, embedded and written
+        `batch_size` at a time, instead of all at once. If a node is invalid, or
+        embedding a batch fails, the nodes of the earlier batches are already
+        stored. All the nodes are written before this returns: use
+        `self.store.add_nodes_streaming` to get the IDs of each batch as soon as
+        it is written.
+
+        Args:
+            nodes: the nodes to add.
+            batch_size: number of nodes embedded and written together.
+
+        Returns:
+            The IDs of the added nodes.
+        """
+        return self.store.add_nodes(
+            _to_graph_store_nodes(nodes), batch_size=batch_size
+        )
+
+    async def aadd_nodes(
+        self,
+        nodes: Iterable[Node] = None,
+        *,
+        batch_size: int = graph_store.DEFAULT_BATCH_SIZE,
+        **kwargs: Any,
+    ) -> AsyncIterable[str]:
+        """Add nodes to the graph store, yielding their IDs as they are written.
+
+        The nodes are written `batch_size` at a time, as the returned iterator is
+        consumed, like by `add_nodes`.
+
+        Args:
+            nodes: the nodes to add.
+            batch_size: number of nodes embedded and written together.
+        """
+        async for id in self.store.aadd_nodes_streaming(
+            _to_graph_store_nodes(nodes), batch_size=batch_size
+        ):
+            yield id
 
     @classmethod
     def from_texts(
@@ -133,22 +184,54 @@ class CassandraGraphStore(GraphStore):
         return store
 
     def similarity_search(
-        self, query: str, k: int = 4, **kwargs: Any
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
     ) -> List[Document]:
         embedding_vector = self._embedding.embed_query(query)
         return self.similarity_search_by_vector(
             embedding_vector,
             k=k,
+            filter=filter,
         )
 
     def similarity_search_by_vector(
-        self, embedding: List[float], k: int = 4, **kwargs: Any
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        nodes = self.store.similarity_search(embedding, k=k, metadata_filter=filter)
+        return [_node_to_document(node) for node in nodes]
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        embedding_vector = await self._embedding.aembed_query(query)
+        return await self.asimilarity_search_by_vector(
+            embedding_vector,
+            k=k,
+            filter=filter,
+        )
+
+    async def asimilarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
     ) -> List[Document]:
-        for node in self.store.similarity_search(embedding, k=k):
-            yield Document(
-                page_content=node.text,
-                metadata=node.metadata,
-            )
+        nodes = await self.store.asimilarity_search(
+            embedding, k=k, metadata_filter=filter
+        )
+        return [_node_to_document(node) for node in nodes]
 
     def traversal_search(
         self,
@@ -156,13 +239,41 @@ class CassandraGraphStore(GraphStore):
         *,
         k: int = 4,
         depth: int = 1,
+        fan_out: Optional[int] = None,
+        max_visited: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
         **kwargs: Any,
     ) -> Iterable[Document]:
-        for node in self.store.traversal_search(query, k=k, depth=depth):
-            yield Document(
-                page_content=node.text,
-                metadata=node.metadata,
-            )
+        for node in self.store.traversal_search(
+            query,
+            k=k,
+            depth=depth,
+            fan_out=fan_out,
+            max_visited=max_visited,
+            metadata_filter=filter,
+        ):
+            yield _node_to_document(node)
+
+    async def atraversal_search(
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 1,
+        fan_out: Optional[int] = None,
+        max_visited: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterable[Document]:
+        for node in await self.store.atraversal_search(
+            query,
+            k=k,
+            depth=depth,
+            fan_out=fan_out,
+            max_visited=max_visited,
+            metadata_filter=filter,
+        ):
+            yield _node_to_document(node)
 
     def mmr_traversal_search(
         self,
@@ -173,6 +284,8 @@ class CassandraGraphStore(GraphStore):
         fetch_k: int = 100,
         lambda_mult: float = 0.5,
         score_threshold: float = float("-inf"),
+        fan_out: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
         **kwargs: Any,
     ) -> Iterable[Document]:
         for node in self.store.mmr_traversal_search(
@@ -182,8 +295,32 @@ class CassandraGraphStore(GraphStore):
             fetch_k=fetch_k,
             lambda_mult=lambda_mult,
             score_threshold=score_threshold,
+            fan_out=fan_out,
+            metadata_filter=filter,
+        ):
+            yield _node_to_document(node)
+
+    async def ammr_traversal_search(
+        self,
+        query: str,
+        *,
+        k: int = 4,
+        depth: int = 2,
+        fetch_k: int = 100,
+        lambda_mult: float = 0.5,
+        score_threshold: float = float("-inf"),
+        fan_out: Optional[int] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterable[Document]:
+        for node in await self.store.ammr_traversal_search(
+            query,
+            k=k,
+            depth=depth,
+            fetch_k=fetch_k,
+            lambda_mult=lambda_mult,
+            score_threshold=score_threshold,
+            fan_out=fan_out,
+            metadata_filter=filter,
         ):
-            yield Document(
-                page_content=node.text,
-                metadata=node.metadata,
-            )
+            yield _node_to_document(node)
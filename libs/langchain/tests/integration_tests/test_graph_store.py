@@ -166,32 +166,30 @@ def test_link_directed(cassandra: GraphStoreFactory) -> None:
     assert sorted(store.store._linked_ids("d")) == ["a", "b"]
 
 
-@pytest.mark.parametrize("gs_factory", ["cassandra", "astra_db"])
-def test_mmr_traversal(request, gs_factory: str):
-    """
-    Test end to end construction and MMR search.
-    The embedding function used here ensures `texts` become
-    the following vectors on a circle (numbered v0 through v3):
+def test_add_nodes_batched(cassandra: GraphStoreFactory) -> None:
+    def documents():
+        for i in range(5):
+            yield Document(
+                page_content=str(i),
+                metadata={
+                    "content_id": f"n{i}",
+                    "link_tags": {
+                        IncomingLinkTag(kind="hyperlink", tag=f"http://{i}"),
+                        OutgoingLinkTag(kind="hyperlink", tag=f"http://{(i + 1) % 5}"),
+                    },
+                },
+            )
 
-           ______ v2
-          /      \
-         /        |  v1
-    v3  |     .    | query
-         |        /  v0
-          |______/                 (N.B. very crude drawing)
+    store = cassandra.store()
+    ids = store.add_nodes(_documents_to_nodes(documents(), ids=None), batch_size=2)
+    assert ids == ["n0", "n1", "n2", "n3", "n4"]
 
-    With fetch_k==2 and k==2, when query is at (1, ),
-    one expects that v2 and v0 are returned (in some order)
-    because v1 is "too close" to v0 (and v0 is closer than v1)).
+    # Edges are created across batches, in both directions.
+    for i in range(5):
+        assert list(store.store._linked_ids(f"n{i}")) == [f"n{(i + 1) % 5}"]
 
-    Both v2 and v3 are reachable via edges from v0, so once it is
-    selected, those are both considered.
-    """
-    gs_factory = request.getfixturevalue(gs_factory)
-    store = gs_factory.store(
-        embedding=AngularTwoDimensionalEmbeddings(),
-    )
 
+def _mmr_documents() -> List[Document]:
     v0 = Document(
         page_content="-0.124",
         metadata={
@@ -225,7 +223,36 @@ def test_mmr_traversal(request, gs_factory: str):
             },
         },
     )
-    store.add_documents([v0, v1, v2, v3])
+    return [v0, v1, v2, v3]
+
+
+@pytest.mark.parametrize("gs_factory", ["cassandra", "astra_db"])
+def test_mmr_traversal(request, gs_factory: str):
+    """
+    Test end to end construction and MMR search.
+    The embedding function used here ensures `texts` become
+    the following vectors on a circle (numbered v0 through v3):
+
+           ______ v2
+          /      \
+         /        |  v1
+    v3  |     .    | query
+         |        /  v0
+          |______/                 (N.B. very crude drawing)
+
+    With fetch_k==2 and k==2, when query is at (1, ),
+    one expects that v2 and v0 are returned (in some order)
+    because v1 is "too close" to v0 (and v0 is closer than v1)).
+
+    Both v2 and v3 are reachable via edges from v0, so once it is
+    selected, those are both considered.
+    """
+    gs_factory = request.getfixturevalue(gs_factory)
+    store = gs_factory.store(
+        embedding=AngularTwoDimensionalEmbeddings(),
+    )
+
+    store.add_documents(_mmr_documents())
 
     results = store.mmr_traversal_search("0.0", k=2, fetch_k=2)
     assert _result_ids(results) == ["v0", "v2"]
@@ -248,6 +275,61 @@ def test_mmr_traversal(request, gs_factory: str):
     assert _result_ids(results) == ["v0", "v2", "v1", "v3"]
 
 
+@pytest.mark.parametrize("gs_factory", ["cassandra", "astra_db"])
+@pytest.mark.asyncio
+async def test_mmr_traversal_async(request, gs_factory: str):
+    gs_factory = request.getfixturevalue(gs_factory)
+    store = gs_factory.store(
+        embedding=AngularTwoDimensionalEmbeddings(),
+    )
+    await store.aadd_documents(_mmr_documents())
+
+    async def result_ids(**kwargs) -> List[str]:
+        return _result_ids(
+            [doc async for doc in store.ammr_traversal_search("0.0", **kwargs)]
+        )
+
+    assert await result_ids(k=2, fetch_k=2) == ["v0", "v2"]
+    assert await result_ids(k=2, fetch_k=2, depth=0) == ["v0", "v1"]
+    assert await result_ids(k=2, fetch_k=3, depth=0) == ["v0", "v2"]
+    assert await result_ids(k=2, score_threshold=0.2) == ["v0"]
+    assert await result_ids(k=4) == ["v0", "v2", "v1", "v3"]
+
+    results = [doc async for doc in store.atraversal_search("0.0", k=1, depth=1)]
+    assert _result_ids(results) == ["v0", "v2", "v3"]
+
+    results = await store.asimilarity_search("0.0", k=2)
+    assert _result_ids(results) == ["v0", "v1"]
+
+
+@pytest.mark.parametrize("gs_factory", ["cassandra", "astra_db"])
+def test_metadata_filter(request, gs_factory: str):
+    gs_factory = request.getfixturevalue(gs_factory)
+    store = gs_factory.store(
+        embedding=AngularTwoDimensionalEmbeddings(),
+    )
+    documents = _mmr_documents()
+    for document, tenant in zip(documents, ["a", "a", "b", "a"]):
+        document.metadata.update(tenant=tenant, page=1)
+    store.add_documents(documents)
+
+    results = store.similarity_search("0.0", k=1)
+    assert results[0].metadata["tenant"] == "a"
+    assert results[0].metadata["page"] == 1
+
+    results = store.similarity_search("0.0", k=2, filter={"tenant": "b"})
+    assert _result_ids(results) == ["v2"]
+    results = store.similarity_search("0.0", k=2, filter={"tenant": "a", "page": 1.0})
+    assert _result_ids(results) == ["v0", "v1"]
+
+    # The edge to v2 isn't traversed.
+    results = store.traversal_search("0.0", k=1, depth=1, filter={"tenant": "a"})
+    assert _result_ids(results) == ["v0", "v3"]
+
+    results = store.mmr_traversal_search("0.0", k=4, filter={"tenant": "a"})
+    assert sorted(_result_ids(results)) == ["v0", "v1", "v3"]
+
+
 @pytest.mark.parametrize("gs_factory", ["cassandra", "astra_db"])
 def test_write_retrieve_keywords(request, gs_factory: str):
     gs_factory = request.getfixturevalue(gs_factory)